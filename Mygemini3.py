@@ -34,6 +34,11 @@ except ValueError as e:
     print(f"클라이언트 초기화 오류: API 키가 잘못되었거나 누락되었습니다. {e}")
     sys.exit(1)
 
+# 🌟 스트리밍 모드: 응답을 청크 단위로 받아 lblAnswer에 바로 이어 붙입니다.
+STREAM_RESPONSES = True
+# 청크를 모아서 화면에 반영하는 주기(ms). 청크마다 다시 그리지 않도록 합칩니다.
+STREAM_FLUSH_INTERVAL_MS = 50
+
 
 # =================================================================
 # 2. Gemini API 호출을 위한 워커 스레드 (QThread)
@@ -45,31 +50,50 @@ class GeminiWorker(QtCore.QThread):
     response_ready = QtCore.pyqtSignal(str, str) 
     # error_occurred(error_type, error_message)
     error_occurred = QtCore.pyqtSignal(str, str) 
+    # 🌟 스트리밍 모드에서 부분 응답(청크)을 메인 스레드로 전달합니다.
+    chunk_ready = QtCore.pyqtSignal(str)
 
-    def __init__(self, client, model_name, chat_history, user_question):
+    def __init__(self, client, model_name, chat_history, user_question, stream=STREAM_RESPONSES):
         super().__init__()
         self.client = client
         self.model_name = model_name
         # 대화 기록은 참조로 전달되어, 스레드 내에서 업데이트됩니다.
         self.chat_history = chat_history 
         self.user_question = user_question
+        self.stream = stream
         
         # types.GenerateContentConfig 객체 생성
         self.config = types.GenerateContentConfig(
             system_instruction="You are a helpful assistant. Please answer all questions in Korean."
         )
 
+    def generate_streaming(self):
+        """generate_content_stream으로 응답을 받아 청크마다 시그널을 보내고, 전체 응답을 반환합니다."""
+        parts = []
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model_name,
+            contents=self.chat_history,
+            config=self.config
+        ):
+            text = chunk.text
+            if text:
+                parts.append(text)
+                self.chunk_ready.emit(text)
+        return "".join(parts)
+
     def run(self):
         """API 호출을 별도의 스레드에서 실행하여 GUI 멈춤을 방지합니다."""
         try:
             # API 호출: 전체 대화 기록을 전달합니다. (네트워크 블로킹 발생 지점)
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=self.chat_history,
-                config=self.config
-            )
-            
-            gemini_response = response.text
+            if self.stream:
+                gemini_response = self.generate_streaming()
+            else:
+                response = self.client.models.generate_content(
+                    model=self.model_name,
+                    contents=self.chat_history,
+                    config=self.config
+                )
+                gemini_response = response.text
             
             # 🌟 대화 기록 업데이트: API 응답 성공 시에만 모델 메시지를 chat_history에 추가합니다.
             self.chat_history.append({"role": "model", "parts": [{"text": gemini_response}]})
@@ -124,6 +148,14 @@ class GeminiApp(QtWidgets.QDialog):
         self.chat_history = []
         # 🌟 워커 스레드 인스턴스를 저장할 변수를 초기화합니다.
         self.gemini_worker = None 
+
+        # 🌟 스트리밍 청크 버퍼와 주기적 반영 타이머
+        self.stream_buffer = []
+        self.stream_start = None
+        self.stream_timer = QtCore.QTimer(self)
+        self.stream_timer.setInterval(STREAM_FLUSH_INTERVAL_MS)
+        self.stream_timer.setSingleShot(True)
+        self.stream_timer.timeout.connect(self.flush_stream_buffer)
         
         self.lblAnswer.setText("[Mygemini] 무엇을 도와드릴까요?")
 
@@ -159,6 +191,7 @@ class GeminiApp(QtWidgets.QDialog):
         
         # 워커 스레드의 시그널을 메인 스레드의 슬롯(메서드)에 연결
         self.gemini_worker.response_ready.connect(self.handle_response)
+        self.gemini_worker.chunk_ready.connect(self.handle_chunk)
         self.gemini_worker.error_occurred.connect(self.handle_error)
         
         # 스레드 시작 (GUI 멈춤 방지)
@@ -176,15 +209,19 @@ class GeminiApp(QtWidgets.QDialog):
         # 8. QTextEdit/QPlainTextEdit에 텍스트 설정 (스크롤 지원)
         # 로딩 메시지를 제거하고 최종 응답을 추가하는 과정:
         
-        # 8a. 마지막 줄 (로딩 메시지)을 제거합니다.
-        cursor = self.lblAnswer.textCursor()
-        # 🌟 수정: QTextCursor는 QtGui 모듈에 있습니다.
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
-        cursor.removeSelectedText()
-        
-        # 8b. 최종 응답을 추가합니다.
-        self.lblAnswer.append(formatted_output)
+        if self.stream_start is not None:
+            # 🌟 스트리밍으로 이미 표시된 응답: 남은 청크만 반영하고 줄을 마무리합니다.
+            self.finish_stream()
+        else:
+            # 8a. 마지막 줄 (로딩 메시지)을 제거합니다.
+            cursor = self.lblAnswer.textCursor()
+            # 🌟 수정: QTextCursor는 QtGui 모듈에 있습니다.
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
+            
+            # 8b. 최종 응답을 추가합니다.
+            self.lblAnswer.append(formatted_output)
 
         # 스레드 종료 및 정리
         self.gemini_worker.quit()
@@ -201,12 +238,15 @@ class GeminiApp(QtWidgets.QDialog):
         # 7. 오류 메시지 포맷팅
         formatted_output = f"[Mygemini] {error_type} 발생: {error_message}\n"
         
-        # 8. 로딩 메시지를 제거하고 오류 메시지를 추가하는 과정:
-        cursor = self.lblAnswer.textCursor()
-        # 🌟 수정: QTextCursor는 QtGui 모듈에 있습니다.
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
-        cursor.removeSelectedText()
+        # 8. 로딩 메시지(또는 스트리밍 도중의 부분 응답)를 제거하고 오류 메시지를 추가하는 과정:
+        if self.stream_start is not None:
+            self.discard_stream()
+        else:
+            cursor = self.lblAnswer.textCursor()
+            # 🌟 수정: QTextCursor는 QtGui 모듈에 있습니다.
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
         
         # 최종 오류 메시지를 추가합니다.
         self.lblAnswer.append(formatted_output)
@@ -215,6 +255,56 @@ class GeminiApp(QtWidgets.QDialog):
         self.gemini_worker.quit()
         self.gemini_worker.wait()
 
+    # =================================================================
+    # 🌟 스트리밍 응답 표시 (청크를 모아서 주기적으로 반영)
+    # =================================================================
+    def handle_chunk(self, text):
+        """워커가 보낸 청크를 버퍼에 모읍니다. 첫 청크는 로딩 메시지를 대신해 즉시 표시합니다."""
+        self.stream_buffer.append(text)
+
+        if self.stream_start is None:
+            cursor = self.lblAnswer.textCursor()
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
+            self.stream_start = cursor.position()
+            cursor.insertText("[Mygemini] ")
+            self.flush_stream_buffer()
+        elif not self.stream_timer.isActive():
+            self.stream_timer.start()
+
+    def flush_stream_buffer(self):
+        """모아 둔 청크를 한 번에 문서 끝에 이어 붙입니다."""
+        if not self.stream_buffer:
+            return
+        text = "".join(self.stream_buffer)
+        self.stream_buffer.clear()
+
+        cursor = self.lblAnswer.textCursor()
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+        scroll_bar = self.lblAnswer.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+
+    def finish_stream(self):
+        """남은 청크를 반영하고 스트리밍 응답 줄을 마무리합니다."""
+        self.stream_timer.stop()
+        self.flush_stream_buffer()
+        cursor = self.lblAnswer.textCursor()
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+        cursor.insertText("\n")
+        self.stream_start = None
+
+    def discard_stream(self):
+        """오류 발생 시 스트리밍 도중 표시된 부분 응답을 지웁니다."""
+        self.stream_timer.stop()
+        self.stream_buffer.clear()
+        cursor = self.lblAnswer.textCursor()
+        cursor.setPosition(self.stream_start)
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End, QtGui.QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        self.stream_start = None
+
 
 # =================================================================
 # 4. 프로그램 실행
@@ -3,11 +3,8 @@ from PyQt6 import QtWidgets, uic, QtCore, QtGui
 from google import genai
 from google.genai.errors import APIError
 from google.genai import types
-import os
-# playsound, gTTS, 임시 파일 처리를 위한 모듈을 가져옵니다.
-from gtts import gTTS
-from playsound import playsound
-import uuid # 고유한 임시 파일 이름을 위해 필요
+# 🌟 음성 합성/재생(gTTS + playsound)과 mp3 디스크 캐시는 mygemini_tts 모듈에서 처리합니다.
+from mygemini_tts import SpeechCache, SpeechPipeline, create_player, tts_config_from_env
 
 # =================================================================
 # 1. 설정 및 초기화
@@ -31,6 +28,13 @@ except ValueError as e:
     print(f"클라이언트 초기화 오류: API 키가 잘못되었거나 누락되었습니다. {e}")
     sys.exit(1)
 
+# 🌟 스트리밍 모드: 응답을 청크 단위로 받아 lblAnswer에 바로 이어 붙입니다.
+STREAM_RESPONSES = True
+# 청크를 모아서 화면에 반영하는 주기(ms). 청크마다 다시 그리지 않도록 합칩니다.
+STREAM_FLUSH_INTERVAL_MS = 50
+# 🌟 음성 캐시 설정 (TTS_CACHE, TTS_CACHE_DIR, TTS_CACHE_MAX_MB)
+TTS_CONFIG = tts_config_from_env()
+
 
 # =================================================================
 # 2. Gemini API 호출을 위한 워커 스레드 (QThread)
@@ -39,27 +43,46 @@ except ValueError as e:
 class GeminiWorker(QtCore.QThread):
     response_ready = QtCore.pyqtSignal(str, str) 
     error_occurred = QtCore.pyqtSignal(str, str) 
+    # 🌟 스트리밍 모드에서 부분 응답(청크)을 메인 스레드로 전달합니다.
+    chunk_ready = QtCore.pyqtSignal(str)
 
-    def __init__(self, client, model_name, chat_history, user_question):
+    def __init__(self, client, model_name, chat_history, user_question, stream=STREAM_RESPONSES):
         super().__init__()
         self.client = client
         self.model_name = model_name
         self.chat_history = chat_history 
         self.user_question = user_question
+        self.stream = stream
         
         self.config = types.GenerateContentConfig(
             system_instruction="You are a helpful assistant. Please answer all questions in Korean."
         )
 
+    def generate_streaming(self):
+        """generate_content_stream으로 응답을 받아 청크마다 시그널을 보내고, 전체 응답을 반환합니다."""
+        parts = []
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model_name,
+            contents=self.chat_history,
+            config=self.config
+        ):
+            text = chunk.text
+            if text:
+                parts.append(text)
+                self.chunk_ready.emit(text)
+        return "".join(parts)
+
     def run(self):
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=self.chat_history,
-                config=self.config
-            )
-            
-            gemini_response = response.text
+            if self.stream:
+                gemini_response = self.generate_streaming()
+            else:
+                response = self.client.models.generate_content(
+                    model=self.model_name,
+                    contents=self.chat_history,
+                    config=self.config
+                )
+                gemini_response = response.text
             
             self.chat_history.append({"role": "model", "parts": [{"text": gemini_response}]})
 
@@ -105,6 +128,28 @@ class GeminiApp(QtWidgets.QDialog):
 
         self.chat_history = []
         self.gemini_worker = None 
+
+        # 🌟 음성 캐시 (합성한 mp3를 디스크에 보관)
+        self.tts_cache = None
+        if TTS_CONFIG["enabled"]:
+            try:
+                self.tts_cache = SpeechCache(TTS_CONFIG["directory"], TTS_CONFIG["max_bytes"])
+            except OSError as e:
+                print(f"음성 캐시 초기화 실패 (캐시 없이 실행합니다): {e}")
+        self.speech_pipeline = SpeechPipeline(
+            self.tts_cache,
+            workers=TTS_CONFIG["workers"],
+            chunk_chars=TTS_CONFIG["chunk_chars"],
+            player=create_player(TTS_CONFIG["player"])
+        )
+
+        # 🌟 스트리밍 청크 버퍼와 주기적 반영 타이머
+        self.stream_buffer = []
+        self.stream_start = None
+        self.stream_timer = QtCore.QTimer(self)
+        self.stream_timer.setInterval(STREAM_FLUSH_INTERVAL_MS)
+        self.stream_timer.setSingleShot(True)
+        self.stream_timer.timeout.connect(self.flush_stream_buffer)
         
         self.lblAnswer.setText("[Mygemini] 무엇을 도와드릴까요?")
 
@@ -134,6 +179,7 @@ class GeminiApp(QtWidgets.QDialog):
         )
         
         self.gemini_worker.response_ready.connect(self.handle_response)
+        self.gemini_worker.chunk_ready.connect(self.handle_chunk)
         self.gemini_worker.error_occurred.connect(self.handle_error)
         
         self.gemini_worker.start()
@@ -145,14 +191,18 @@ class GeminiApp(QtWidgets.QDialog):
         
         formatted_output = f"[Mygemini] {gemini_response}\n"
         
-        # 로딩 메시지를 제거합니다.
-        cursor = self.lblAnswer.textCursor()
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
-        cursor.removeSelectedText()
-        
-        # 최종 응답을 추가합니다.
-        self.lblAnswer.append(formatted_output)
+        if self.stream_start is not None:
+            # 🌟 스트리밍으로 이미 표시된 응답: 남은 청크만 반영하고 줄을 마무리합니다.
+            self.finish_stream()
+        else:
+            # 로딩 메시지를 제거합니다.
+            cursor = self.lblAnswer.textCursor()
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
+            
+            # 최종 응답을 추가합니다.
+            self.lblAnswer.append(formatted_output)
         
         # 🌟 응답을 음성으로 출력합니다.
         self.text_to_speech(gemini_response)
@@ -169,11 +219,14 @@ class GeminiApp(QtWidgets.QDialog):
 
         formatted_output = f"[Mygemini] {error_type} 발생: {error_message}\n"
         
-        # 로딩 메시지를 제거하고 오류 메시지를 추가합니다.
-        cursor = self.lblAnswer.textCursor()
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
-        cursor.removeSelectedText()
+        # 로딩 메시지(또는 스트리밍 도중의 부분 응답)를 제거하고 오류 메시지를 추가합니다.
+        if self.stream_start is not None:
+            self.discard_stream()
+        else:
+            cursor = self.lblAnswer.textCursor()
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
         
         self.lblAnswer.append(formatted_output)
         
@@ -186,26 +239,66 @@ class GeminiApp(QtWidgets.QDialog):
         self.gemini_worker.wait()
 
     # =================================================================
-    # 🌟 수정된 음성 출력 메서드 (gTTS + playsound 사용, 임시 파일 사용)
+    # 🌟 스트리밍 응답 표시 (청크를 모아서 주기적으로 반영)
+    # =================================================================
+    def handle_chunk(self, text):
+        """워커가 보낸 청크를 버퍼에 모읍니다. 첫 청크는 로딩 메시지를 대신해 즉시 표시합니다."""
+        self.stream_buffer.append(text)
+
+        if self.stream_start is None:
+            cursor = self.lblAnswer.textCursor()
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
+            self.stream_start = cursor.position()
+            cursor.insertText("[Mygemini] ")
+            self.flush_stream_buffer()
+        elif not self.stream_timer.isActive():
+            self.stream_timer.start()
+
+    def flush_stream_buffer(self):
+        """모아 둔 청크를 한 번에 문서 끝에 이어 붙입니다."""
+        if not self.stream_buffer:
+            return
+        text = "".join(self.stream_buffer)
+        self.stream_buffer.clear()
+
+        cursor = self.lblAnswer.textCursor()
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+        scroll_bar = self.lblAnswer.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+
+    def finish_stream(self):
+        """남은 청크를 반영하고 스트리밍 응답 줄을 마무리합니다."""
+        self.stream_timer.stop()
+        self.flush_stream_buffer()
+        cursor = self.lblAnswer.textCursor()
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+        cursor.insertText("\n")
+        self.stream_start = None
+
+    def discard_stream(self):
+        """오류 발생 시 스트리밍 도중 표시된 부분 응답을 지웁니다."""
+        self.stream_timer.stop()
+        self.stream_buffer.clear()
+        cursor = self.lblAnswer.textCursor()
+        cursor.setPosition(self.stream_start)
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End, QtGui.QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        self.stream_start = None
+
+    # =================================================================
+    # 🌟 수정된 음성 출력 메서드 (gTTS + playsound 사용, 문장 단위 파이프라인)
     # =================================================================
     def text_to_speech(self, text):
-        """gTTS를 사용하여 텍스트를 음성으로 변환하고 playsound로 재생합니다."""
+        """텍스트를 문장 단위로 나눠 gTTS로 합성하고 순서대로 재생합니다. (임시 mp3 파일 없이 메모리에서 재생)"""
         
         try:
             print("음성 생성 및 재생 시작...")
-            # 임시 파일 이름 생성 (중복 방지)
-            filename = f"temp_speech_{uuid.uuid4().hex}.mp3"
-            
-            # 1. gTTS 객체 생성 (한국어 'ko' 설정) 및 파일로 저장
-            tts = gTTS(text=text, lang='ko')
-            tts.save(filename)
-            
-            # 2. playsound로 재생 (이 부분이 블로킹됩니다)
-            playsound(filename)
-            
-            # 3. 재생 후 파일 삭제 (클린업)
-            os.remove(filename)
-            print("음성 재생 완료 및 파일 삭제.")
+            # 🌟 첫 문장이 합성되면 바로 재생하고, 그동안 다음 문장들을 미리 합성합니다. (이 부분이 블로킹됩니다)
+            self.speech_pipeline.speak(text)
+            print("음성 재생 완료.")
             
         except Exception as e:
             # 음성 출력 중 오류가 발생해도 프로그램은 계속 실행되도록 예외 처리
@@ -217,14 +310,6 @@ class GeminiApp(QtWidgets.QDialog):
 # =================================================================
 
 if __name__ == '__main__':
-    # 🌟 프로그램 시작 시 남아있는 temp_speech_*.mp3 파일을 삭제합니다.
-    for f in os.listdir('.'):
-        if f.startswith('temp_speech_') and f.endswith('.mp3'):
-            try:
-                os.remove(f)
-            except OSError as e:
-                print(f"임시 파일 삭제 오류 {f}: {e}")
-                
     app = QtWidgets.QApplication(sys.argv)
     window = GeminiApp()
 
@@ -1,104 +1,463 @@
+import asyncio
 import sys
-from PyQt6 import QtWidgets, uic, QtCore, QtGui 
-from google import genai
-from google.genai.errors import APIError
-from google.genai import types
+from PyQt6 import QtWidgets, QtCore, QtGui, sip
 import os
-from gtts import gTTS
-from playsound import playsound
-import uuid 
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 from dotenv import load_dotenv 
 
 # =================================================================
 # 🌟 데이터베이스 관련 모듈 추가
 # =================================================================
-import pymysql
-from datetime import datetime
+from mygemini_db import (
+    DBConfigError, WriteBehindQueue, create_async_chat_store, create_mysql_pool, db_config_from_env, find_answer_by_hash,
+    search_chat_history
+)
+from mygemini_async import AsyncLoopThread, engine_config_from_env
+from mygemini_gemini import DEFAULT_MODEL, SYSTEM_INSTRUCTION, GeminiRequest, LazyClient, cancel_request, import_genai
+from mygemini_metrics import create_tracer, metrics_config_from_env, panel_text
+from mygemini_ui import load_ui, ui_config_from_env
+from mygemini_watchdog import SessionProfiler, StallWatchdog, watchdog_config_from_env
+from mygemini_cache import AnswerCache, question_hash
+from mygemini_context import ContextCacheManager, ConversationContext, summary_prompt
+from mygemini_ratelimit import RequestCancelled, RequestScheduler, ratelimit_config_from_env
+from mygemini_replica import LocalChatReplica, ReplicaChatStore, ReplicaSync, replica_config_from_env
+from mygemini_transcript import install_transcript, transcript_config_from_env
+from mygemini_tts import (
+    POLICY_DROP_STALE, PRIORITY_HIGH, PRIORITY_NORMAL, SpeechCache, SpeechPipeline, SpeechPrefetcher, SpeechScheduler,
+    create_player, tts_config_from_env
+)
 
 # =================================================================
 # 1. 설정 및 초기화
 # =================================================================
 
 load_dotenv() 
+# 🌟 시작 시간 측정 기준 (benchmarks/bench_startup.py가 프로세스 시작 시각을 넘겨 줍니다)
+STARTUP_T0 = float(os.environ.get("MYGEMINI_STARTUP_T0") or time.time())
 UI_FILE_NAME = "Mygemini.ui"
+# 🌟 .ui 파일을 파이썬 코드로 미리 변환해 두고 사용합니다. (UI_PRECOMPILED, UI_CACHE_DIR)
+UI_CONFIG = ui_config_from_env()
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY") 
+# 🌟 Gemini API 대신 같은 REST 형식의 서버에 요청합니다. (예: benchmarks/fake_gemini_server.py, 비우면 Gemini API)
+GEMINI_BASE_URL = os.environ.get("GEMINI_BASE_URL") or None
+
+# 🌟 DB 접속 정보는 .env(MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, ...)에서 읽습니다.
+try:
+    DB_CONFIG = db_config_from_env()
+except DBConfigError as e:
+    print(f"치명적 오류: {e}")
+    sys.exit(1)
+# 질문 전 DB 검색을 기다리는 최대 시간(ms). 넘으면 검색 결과를 기다리지 않고 Gemini에 질문합니다.
+DB_LOOKUP_TIMEOUT_MS = int(os.environ.get("DB_LOOKUP_TIMEOUT_MS", "1500"))
+# 🌟 Write-behind 저장 큐: 이 개수만큼 모이거나 이 시간(초)이 지나면 한 번에 저장합니다.
+DB_WRITE_BATCH_SIZE = int(os.environ.get("DB_WRITE_BATCH_SIZE", "20"))
+DB_WRITE_FLUSH_INTERVAL = float(os.environ.get("DB_WRITE_FLUSH_INTERVAL", "2.0"))
+# DB에 저장하지 못한 기록을 보관했다가 다음 실행 때 다시 저장하는 로컬 저널 파일
+DB_WRITE_JOURNAL = os.environ.get("DB_WRITE_JOURNAL", "chat_history_journal.jsonl")
+# 🌟 chat_history 로컬 복제본 (REPLICA, REPLICA_PATH, REPLICA_SYNC_INTERVAL, REPLICA_PUSH_DELAY, REPLICA_BATCH_SIZE)
+REPLICA_CONFIG = replica_config_from_env()
+# 🌟 같은 질문의 답변을 기억하는 메모리 캐시 (최대 항목 수, 유효 시간(초))
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "3600"))
+# 🌟 의미 유사 캐시 (SEMANTIC_CACHE, SEMANTIC_EMBEDDER, SEMANTIC_CACHE_PATH, SEMANTIC_THRESHOLD)
+#    NumPy 가져오기와 인덱스 로드가 시작을 늦추지 않도록, 설정은 창을 띄운 뒤 준비 작업(StartupWarmupWorker)에서 읽습니다.
+# 🌟 대화 맥락 토큰 예산: 넘으면 오래된 대화부터 빼고, 뺀 대화는 요약해서 맥락에 남깁니다.
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "8000"))
+# 예산과 관계없이 항상 보내는 처음 대화 수 (첫 질문에 주제/조건을 정해 두는 경우)
+CONTEXT_PIN_FIRST = int(os.environ.get("CONTEXT_PIN_FIRST", "1"))
+CONTEXT_SUMMARY = os.environ.get("CONTEXT_SUMMARY", "1") != "0"
+# 예산을 넘으면 예산의 이 비율만큼 한꺼번에 뺍니다. (요약과 컨텍스트 캐시가 매 턴 바뀌지 않도록)
+CONTEXT_EVICT_RATIO = float(os.environ.get("CONTEXT_EVICT_RATIO", "0.25"))
+# 🌟 컨텍스트 캐시: 시스템 지시문 + 고정 대화 + 요약을 서버에 캐시해 두고 이름으로 참조합니다.
+CONTEXT_CACHE = os.environ.get("CONTEXT_CACHE", "1") != "0"
+CONTEXT_CACHE_TTL = int(os.environ.get("CONTEXT_CACHE_TTL", "3600"))
+# 모델의 최소 캐시 크기보다 작은 맥락은 캐시하지 않습니다. (gemini-2.5-flash: 1024토큰)
+CONTEXT_CACHE_MIN_TOKENS = int(os.environ.get("CONTEXT_CACHE_MIN_TOKENS", "1024"))
+# 🌟 음성 캐시 (TTS_CACHE, TTS_CACHE_DIR, TTS_CACHE_MAX_MB): 같은 문장은 다시 합성하지 않습니다.
+TTS_CONFIG = tts_config_from_env()
+# 🌟 새 답변의 발화 정책: replace(이전 발화를 끊고 바로 재생), queue(순서대로), drop-stale(오래 기다리면 버림)
+TTS_POLICY = os.environ.get("TTS_POLICY", "replace")
+# 🌟 턴별 단계 지연 측정 (METRICS_LOG, METRICS_PROM, METRICS_EXPORT_INTERVAL, METRICS_PANEL)
+METRICS_CONFIG = metrics_config_from_env()
+# 🌟 GUI 멈춤 감시와 프로파일링 (STALL_WATCHDOG, STALL_THRESHOLD_MS, STALL_HEARTBEAT_MS, STALL_LOG, PROFILE, PROFILE_OUTPUT, ...)
+WATCHDOG_CONFIG = watchdog_config_from_env()
+# 🌟 대화 기록 뷰 (TRANSCRIPT_MAX_MESSAGES, TRANSCRIPT_PAGE_SIZE): 메모리에 보관할 메시지 수와 한 번에 올리는 메시지 수
+TRANSCRIPT_CONFIG = transcript_config_from_env()
 
 # 2. Gemini 클라이언트 초기화
 if not GEMINI_API_KEY:
     print("치명적 오류: GEMINI_API_KEY가 환경 변수나 .env 파일로 설정되지 않았습니다.")
     sys.exit(1)
     
-try:
-    client = genai.Client(api_key=GEMINI_API_KEY)
-    MODEL_NAME = "gemini-2.5-flash"
-except ValueError as e:
-    print(f"클라이언트 초기화 오류: API 키가 잘못되었거나 누락되었습니다. {e}")
-    sys.exit(1)
+# 🌟 google.genai는 가져오는 데만 0.5초 이상 걸리므로, 클라이언트는 처음 사용할 때(또는 창을 띄운 뒤 준비 작업에서) 만듭니다.
+client = LazyClient(GEMINI_API_KEY, GEMINI_BASE_URL)
+MODEL_NAME = DEFAULT_MODEL
+
+# 🌟 동시에 처리할 수 있는 Gemini 요청 수 (요청 스레드 풀 크기)
+GEMINI_MAX_CONCURRENT = int(os.environ.get("GEMINI_MAX_CONCURRENT", "4"))
+# 🌟 요청 속도 제한/재시도 (GEMINI_RPM, GEMINI_BURST, GEMINI_MAX_ATTEMPTS, GEMINI_BACKOFF_BASE, GEMINI_BACKOFF_MAX)
+RATELIMIT_CONFIG = ratelimit_config_from_env()
+# 🌟 새 질문을 보내면 아직 진행 중인 이전 요청을 취소합니다. (0이면 이전 요청과 동시에 처리)
+GEMINI_CANCEL_ON_NEW = os.environ.get("GEMINI_CANCEL_ON_NEW", "1") != "0"
+# 🌟 종료 시 취소한 요청 작업이 끝나기를 기다리는 최대 시간(ms). 넘으면 기다리지 않고 종료합니다.
+GEMINI_SHUTDOWN_WAIT_MS = int(os.environ.get("GEMINI_SHUTDOWN_WAIT_MS", "2000"))
+# 🌟 요청 엔진: thread(요청마다 스레드 풀 작업) 또는 asyncio(이벤트 루프 하나에서 client.aio로 처리)
+#    (GEMINI_ENGINE, GEMINI_TIMEOUT, GEMINI_CHUNK_TIMEOUT, ASYNC_DB_TIMEOUT, TTS_FETCH_TIMEOUT)
+ENGINE_CONFIG = engine_config_from_env()
+
+# 🌟 스트리밍 모드: 응답을 청크 단위로 받아 lblAnswer에 바로 이어 붙입니다.
+STREAM_RESPONSES = True
+# 청크를 모아서 화면에 반영하는 주기(ms). 청크마다 다시 그리지 않도록 합칩니다.
+STREAM_FLUSH_INTERVAL_MS = 50
+
+# 🌟 모든 Gemini 생성 호출(답변, 대화 요약)이 함께 쓰는 속도 제한/재시도 스케줄러 (할당량 공유)
+GEMINI_SCHEDULER = RequestScheduler(**RATELIMIT_CONFIG)
+
+
+def summarize_conversation(previous_summary, turns):
+    """맥락에서 빠진 대화를 이전 요약과 합쳐 새 요약을 만듭니다. (ConversationContext의 요약 스레드에서 호출)"""
+    response = GEMINI_SCHEDULER.call(lambda: client.models.generate_content(
+        model=MODEL_NAME,
+        contents=summary_prompt(previous_summary, turns)
+    ))
+    return response.text
 
 
 # =================================================================
 # 2. Gemini API 호출을 위한 워커 스레드 (QThread)
 # =================================================================
 
-class GeminiWorker(QtCore.QThread):
-    response_ready = QtCore.pyqtSignal(str, str) 
-    error_occurred = QtCore.pyqtSignal(str, str) 
+class GeminiWorkerSignals(QtCore.QObject):
+    """QRunnable은 시그널을 가질 수 없으므로 워커의 시그널을 따로 둡니다. 모든 시그널은 request_id를 함께 보냅니다."""
+    # (request_id, user_question, response)
+    response_ready = QtCore.pyqtSignal(int, str, str)
+    # (request_id, error_type, error_message)
+    error_occurred = QtCore.pyqtSignal(int, str, str)
+    # 🌟 스트리밍 모드에서 부분 응답(청크)을 메인 스레드로 전달합니다. (request_id, 청크)
+    chunk_ready = QtCore.pyqtSignal(int, str)
+    # 🌟 일시적인 오류(429/5xx)로 다시 시도하기 전에 알립니다. (request_id, 다음 시도 번호, 대기 시간(초))
+    retrying = QtCore.pyqtSignal(int, int, float)
 
-    def __init__(self, client, model_name, chat_history, user_question):
+
+class GeminiWorker(QtCore.QRunnable):
+    """
+    Gemini 요청 하나를 처리하는 작업입니다. QThreadPool의 스레드를 재사용해 여러 질문을 동시에 처리합니다.
+    대화 기록은 제출 시점의 복사본(contents)만 사용하고, 공유 기록은 건드리지 않습니다.
+    요청 처리(컨텍스트 캐시, 스트리밍, 재시도, 취소)는 Qt 없이 쓸 수 있는 GeminiRequest가 맡습니다.
+    """
+
+    def __init__(self, request_id, client, model_name, contents, user_question, stream=STREAM_RESPONSES, context_cache=None,
+                 scheduler=None):
         super().__init__()
-        self.client = client
-        self.model_name = model_name
-        self.chat_history = chat_history 
+        self.request_id = request_id
+        self.signals = GeminiWorkerSignals()
         self.user_question = user_question
-        
-        self.config = types.GenerateContentConfig(
-            system_instruction="You are a helpful assistant. Please answer all questions in Korean."
+        # 🌟 취소 요청 표시 (메인 스레드에서 cancel()로 설정, 워커 스레드에서 확인)
+        self.cancel_event = threading.Event()
+        # 🌟 요청 시점의 맥락 복사본(토큰 예산이 적용된 대화 기록 + 이번 질문)으로 요청합니다.
+        #    컨텍스트 캐시가 None이면 매번 전체 맥락을, 스케줄러가 None이면 한 번만 요청합니다.
+        self.request = GeminiRequest(
+            client, model_name, contents,
+            stream=stream,
+            context_cache=context_cache,
+            scheduler=scheduler,
+            on_chunk=lambda text: self.signals.chunk_ready.emit(self.request_id, text),
+            on_retry=lambda attempt, wait, error: self.signals.retrying.emit(self.request_id, attempt, wait),
+            cancel_event=self.cancel_event
         )
+        # 취소 시 메인 스레드가 풀에서 꺼낼 수 있도록 끝난 뒤에도 풀이 삭제하지 않습니다. (참조는 PendingRequest가 유지)
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        """요청을 취소합니다. 응답을 기다리는 중이면 HTTP 연결을 바로 끊고, 재시도 대기 중이면 바로 멈춥니다."""
+        cancel_request(self.cancel_event)
 
     def run(self):
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=self.chat_history,
-                config=self.config
-            )
-            
-            gemini_response = response.text
-            
-            self.chat_history.append({"role": "model", "parts": [{"text": gemini_response}]})
+        import_genai()  # 준비 작업이 아직 가져오는 중이면 끝날 때까지 기다립니다.
+        from google.genai.errors import APIError
 
-            self.response_ready.emit(self.user_question, gemini_response)
+        try:
+            gemini_response = self.request.run()
+            self.signals.response_ready.emit(self.request_id, self.user_question, gemini_response)
 
+        except RequestCancelled:
+            # 취소된 요청은 결과를 보내지 않습니다. (화면 정리는 메인 스레드가 취소할 때 이미 했습니다)
+            print(f"🛑 요청 #{self.request_id} 작업 중단")
         except APIError as e:
-            self.error_occurred.emit("API 오류", f"Gemini 서버에 연결할 수 없습니다. (오류: {e})")
+            self.signals.error_occurred.emit(self.request_id, "API 오류", f"Gemini 서버에 연결할 수 없습니다. (오류: {e})")
+        except Exception as e:
+            self.signals.error_occurred.emit(self.request_id, "예기치 않은 오류", str(e))
+
+
+class PendingRequest:
+    """진행 중인 Gemini 요청 하나의 상태입니다. (메인 스레드에서만 사용)"""
+
+    def __init__(self, request_id, user_question, message):
+        self.request_id = request_id
+        self.user_question = user_question
+        # 이 요청의 응답이 표시되는 대화 기록의 메시지 (처음에는 로딩 메시지)
+        self.message = message
+        self.stream_buffer = []
+        self.streaming = False
+        self.started_at = time.monotonic()
+        self.done = False
+        self.answer = None          # 성공하면 응답, 실패하면 None
+        self.signals = None
+        self.worker = None          # 취소할 때 사용하는 GeminiWorker (완료되면 None)
+        self.trace = None           # 턴 측정 (TurnTrace)
+        self.render_seconds = 0.0   # 이 요청의 응답을 lblAnswer에 쓰는 데 GUI 스레드가 쓴 시간
+
+# =================================================================
+# 🌟 2-2. DB 검색을 위한 워커 스레드 (QThread) - UI 스레드에서 DB I/O 제거
+# =================================================================
+
+class HistoryLookupWorker(QtCore.QThread):
+    """질문 전 과거 기록 검색을 별도 스레드에서 실행합니다.
+       같은 질문(정규화 해시 일치)의 답변이 있으면 그 답변을, 없으면 관련 기록을 찾습니다."""
+    # (request_id, user_question, answer)
+    exact_found = QtCore.pyqtSignal(int, str, str)
+    # (request_id, user_question, answer, matched_question, score)
+    similar_found = QtCore.pyqtSignal(int, str, str, str, float)
+    # (request_id, user_question, results)
+    lookup_done = QtCore.pyqtSignal(int, str, object)
+    # (request_id, user_question, error_message)
+    lookup_failed = QtCore.pyqtSignal(int, str, str)
+
+    def __init__(self, request_id, db_pool, user_question, semantic_cache=None, replica=None):
+        super().__init__()
+        self.request_id = request_id
+        self.db_pool = db_pool
+        self.user_question = user_question
+        self.semantic_cache = semantic_cache
+        # 로컬 복제본이 있으면 원격 DB 대신 로컬에서 찾습니다.
+        self.replica = replica
+
+    def run(self):
+        db_error = None
+        try:
+            if self.replica is not None:
+                row = self.replica.find_answer_by_hash(question_hash(self.user_question))
+            else:
+                row = find_answer_by_hash(self.db_pool, question_hash(self.user_question))
+            if row:
+                self.exact_found.emit(self.request_id, self.user_question, row['answer'])
+                return
         except Exception as e:
-            self.error_occurred.emit("예기치 않은 오류", str(e))
+            db_error = e
+
+        # 🌟 표현은 달라도 뜻이 같은 질문이 있으면 그 답변을 사용합니다. (임베딩 유사도, DB와 무관)
+        if self.semantic_cache is not None:
+            try:
+                match = self.semantic_cache.lookup(self.user_question)
+            except Exception as e:
+                print(f"❌ 의미 캐시 검색 실패: {e}")
+                match = None
+            if match:
+                answer, score, matched_question = match
+                self.similar_found.emit(self.request_id, self.user_question, answer, matched_question, score)
+                return
+
+        if db_error is not None:
+            self.lookup_failed.emit(self.request_id, self.user_question, str(db_error))
+            return
+        try:
+            if self.replica is not None:
+                results = self.replica.search(self.user_question)
+            else:
+                results = search_chat_history(self.db_pool, self.user_question)
+            self.lookup_done.emit(self.request_id, self.user_question, results)
+        except Exception as e:
+            self.lookup_failed.emit(self.request_id, self.user_question, str(e))
+
+
+class SemanticIndexWorker(QtCore.QThread):
+    """새 질문/답변을 임베딩해 의미 캐시에 추가합니다. (임베딩 API 호출이 UI를 막지 않도록)"""
+
+    def __init__(self, semantic_cache, question, answer):
+        super().__init__()
+        self.semantic_cache = semantic_cache
+        self.question = question
+        self.answer = answer
+
+    def run(self):
+        try:
+            self.semantic_cache.add(self.question, self.answer)
+        except Exception as e:
+            print(f"❌ 의미 캐시 추가 실패: {e}")
+
 
 # =================================================================
-# 🌟 2-2. TTS/Playsound 처리를 위한 워커 스레드 (QThread) - 블로킹 문제 해결
+# 🌟 2-3. asyncio 엔진 작업 (GEMINI_ENGINE=asyncio) - 스레드 대신 이벤트 루프의 코루틴
 # =================================================================
 
-class SpeechWorker(QtCore.QThread):
+class AsyncGeminiWorker:
     """
-    gTTS/playsound는 블로킹 작업이므로 별도 스레드에서 실행하여 UI 멈춤을 방지합니다.
+    GeminiWorker의 asyncio 버전입니다. client.aio로 요청하고, 같은 시그널(GeminiWorkerSignals)로 결과를 보냅니다.
+    요청 전체와 청크 사이 대기에 제한 시간을 걸고, 스트리밍되는 동안 완성된 문장을 미리 음성 합성합니다.
     """
-    def __init__(self, text):
+
+    def __init__(self, request_id, client, model_name, contents, user_question, stream=STREAM_RESPONSES, context_cache=None,
+                 scheduler=None, prefetcher=None):
+        self.request_id = request_id
+        self.signals = GeminiWorkerSignals()
+        self.user_question = user_question
+        # 🌟 음성 미리 합성 (None이면 하지 않음)
+        self.prefetcher = prefetcher
+        self.request = GeminiRequest(
+            client, model_name, contents,
+            stream=stream,
+            context_cache=context_cache,
+            scheduler=scheduler,
+            on_chunk=self.handle_chunk,
+            on_retry=lambda attempt, wait, error: self.signals.retrying.emit(self.request_id, attempt, wait)
+        )
+        self.future = None
+
+    def start(self, engine):
+        self.future = engine.submit(self.run())
+        return self
+
+    def cancel(self):
+        """태스크를 취소합니다. 기다리던 스트림/재시도 대기/미리 합성이 함께 취소됩니다."""
+        if self.future is not None:
+            self.future.cancel()
+
+    def handle_chunk(self, text):
+        self.signals.chunk_ready.emit(self.request_id, text)
+        if self.prefetcher is not None:
+            self.prefetcher.feed(text)
+
+    async def run(self):
+        # 준비 작업이 아직 가져오는 중이면 기다려야 하므로, 루프(다른 요청)를 막지 않도록 스레드에서 가져옵니다.
+        await asyncio.to_thread(import_genai)
+        from google.genai.errors import APIError
+
+        timeout = ENGINE_CONFIG["timeout"]
+        try:
+            gemini_response = await asyncio.wait_for(self.request.run_async(ENGINE_CONFIG["chunk_timeout"]), timeout)
+            self.signals.response_ready.emit(self.request_id, self.user_question, gemini_response)
+            if self.prefetcher is not None:
+                self.prefetcher.finish(gemini_response)
+                await self.prefetcher.wait()
+
+        except asyncio.CancelledError:
+            print(f"🛑 요청 #{self.request_id} 작업 중단")
+            raise
+        except asyncio.TimeoutError:
+            self.signals.error_occurred.emit(self.request_id, "시간 초과", f"{timeout:.0f}초 안에 응답을 받지 못했습니다.")
+        except APIError as e:
+            self.signals.error_occurred.emit(self.request_id, "API 오류", f"Gemini 서버에 연결할 수 없습니다. (오류: {e})")
+        except Exception as e:
+            self.signals.error_occurred.emit(self.request_id, "예기치 않은 오류", str(e))
+        finally:
+            # 요청 태스크가 끝나면 그 하위 작업(미리 합성)도 남기지 않습니다.
+            if self.prefetcher is not None:
+                self.prefetcher.cancel()
+
+
+class StartupWarmupWorker(QtCore.QThread):
+    """
+    창을 띄운 뒤 첫 답변에 필요한 것들을 미리 준비합니다. (Gemini 클라이언트 생성, DB 커넥션 하나 연결, 의미 캐시 로드)
+    준비가 끝나기 전에 질문해도 동작하며, 그 경우 필요한 것을 그 자리에서 만듭니다.
+    """
+    # (의미 캐시 또는 None, 단계별 소요 시간(ms))
+    warmed_up = QtCore.pyqtSignal(object, object)
+
+    def __init__(self, db_pool):
         super().__init__()
-        self.text = text
+        self.db_pool = db_pool
 
     def run(self):
+        timings = {}
+
+        started_at = time.monotonic()
         try:
-            print("음성 생성 및 재생 시작 (SpeechWorker 스레드)...")
-            filename = f"temp_speech_{uuid.uuid4().hex}.mp3"
-            
-            tts = gTTS(text=self.text, lang='ko')
-            tts.save(filename)
-            playsound(filename)
-            os.remove(filename)
-            print("음성 재생 완료 및 파일 삭제.")
-            
+            client.get()
         except Exception as e:
-            print(f"음성 출력 오류 (gTTS/playsound) (스레드): {e}")
+            print(f"클라이언트 초기화 오류: API 키가 잘못되었거나 누락되었습니다. {e}")
+        timings["client_ms"] = round((time.monotonic() - started_at) * 1000)
+
+        started_at = time.monotonic()
+        try:
+            with self.db_pool.connection():
+                pass
+        except Exception as e:
+            print(f"⚠️ DB 연결 준비 실패 (질문할 때 다시 연결합니다): {e}")
+        timings["db_ms"] = round((time.monotonic() - started_at) * 1000)
+
+        started_at = time.monotonic()
+        semantic_cache = None
+        from mygemini_semantic import SemanticCache, create_embedder, semantic_config_from_env
+        config = semantic_config_from_env()
+        if config["enabled"]:
+            try:
+                semantic_cache = SemanticCache(
+                    config["path"],
+                    create_embedder(config["embedder"], client),
+                    threshold=config["threshold"]
+                )
+            except Exception as e:
+                print(f"❌ 의미 캐시 초기화 실패 (의미 캐시 없이 실행합니다): {e}")
+        timings["semantic_ms"] = round((time.monotonic() - started_at) * 1000)
+
+        self.warmed_up.emit(semantic_cache, timings)
+
+
+class HistoryLookupSignals(QtCore.QObject):
+    """AsyncHistoryLookup의 시그널 (HistoryLookupWorker와 같은 시그널)"""
+    exact_found = QtCore.pyqtSignal(int, str, str)
+    similar_found = QtCore.pyqtSignal(int, str, str, str, float)
+    lookup_done = QtCore.pyqtSignal(int, str, object)
+    lookup_failed = QtCore.pyqtSignal(int, str, str)
+
+
+class AsyncHistoryLookup:
+    """HistoryLookupWorker의 asyncio 버전입니다. DB 조회는 비동기 드라이버(chat_store)로, 의미 캐시 검색은 스레드에서 실행합니다."""
+
+    def __init__(self, request_id, chat_store, user_question, semantic_cache=None):
+        self.request_id = request_id
+        self.signals = HistoryLookupSignals()
+        self.chat_store = chat_store
+        self.user_question = user_question
+        self.semantic_cache = semantic_cache
+
+    def start(self, engine):
+        self.future = engine.submit(self.run())
+        return self
+
+    async def run(self):
+        db_timeout = ENGINE_CONFIG["db_timeout"]
+        db_error = None
+        try:
+            row = await asyncio.wait_for(self.chat_store.find_answer_by_hash(question_hash(self.user_question)), db_timeout)
+            if row:
+                self.signals.exact_found.emit(self.request_id, self.user_question, row['answer'])
+                return
+        except Exception as e:
+            db_error = str(e) or type(e).__name__   # 시간 초과(TimeoutError)는 메시지가 비어 있습니다.
+
+        if self.semantic_cache is not None:
+            try:
+                match = await asyncio.to_thread(self.semantic_cache.lookup, self.user_question)
+            except Exception as e:
+                print(f"❌ 의미 캐시 검색 실패: {e}")
+                match = None
+            if match:
+                answer, score, matched_question = match
+                self.signals.similar_found.emit(self.request_id, self.user_question, answer, matched_question, score)
+                return
+
+        if db_error is not None:
+            self.signals.lookup_failed.emit(self.request_id, self.user_question, db_error)
+            return
+        try:
+            results = await asyncio.wait_for(self.chat_store.search(self.user_question), db_timeout)
+            self.signals.lookup_done.emit(self.request_id, self.user_question, results)
+        except Exception as e:
+            self.signals.lookup_failed.emit(self.request_id, self.user_question, str(e) or type(e).__name__)
 
 
 # =================================================================
@@ -106,11 +465,18 @@ class SpeechWorker(QtCore.QThread):
 # =================================================================
 
 class GeminiApp(QtWidgets.QDialog):
+    # 🌟 저장 큐가 기록을 저널로 넘겼을 때 (저장 스레드 → UI 스레드)
+    db_spilled = QtCore.pyqtSignal(int, str)
+
     def __init__(self):
         super().__init__()
         
         try:
-            uic.loadUi(UI_FILE_NAME, self)
+            if UI_CONFIG["precompiled"]:
+                load_ui(UI_FILE_NAME, self, UI_CONFIG["cache_dir"])
+            else:
+                from PyQt6 import uic
+                uic.loadUi(UI_FILE_NAME, self)
         except FileNotFoundError:
             print(f"오류: {UI_FILE_NAME} 파일을 찾을 수 없습니다. 경로를 확인해 주세요.")
             sys.exit(1)
@@ -127,6 +493,13 @@ class GeminiApp(QtWidgets.QDialog):
         if not self.btnSend or not self.lblAnswer or not self.lineEditMyQuestion:
             print("치명적 오류: UI 파일에서 필수 위젯을 찾을 수 없습니다.")
             sys.exit(1)
+        # 🌟 대화 기록은 QTextEdit 문서 대신 메시지 목록 뷰에 표시합니다. (보이는 메시지만 그리고, 오래된 기록은 페이지로)
+        self.lblAnswer = install_transcript(self.lblAnswer, TRANSCRIPT_CONFIG)
+        # 🌟 취소 버튼은 이 스크립트에서만 쓰므로 공유 UI 파일(Mygemini2~4도 사용) 대신 여기서 만듭니다. (전송 버튼 위)
+        self.btnCancel = QtWidgets.QPushButton("취소", self)
+        self.btnCancel.setObjectName("btnCancel")
+        self.btnCancel.setGeometry(310, 200, 81, 41)
+        self.btnCancel.setEnabled(False)
 
         # 🌟 UI에 검색 기능을 연결하기 위한 임시 버튼 생성 및 연결 (UI 파일에 버튼 추가가 필요합니다.)
         # self.btnSearch = self.findChild(QtWidgets.QPushButton, 'btnSearch') 
@@ -135,22 +508,161 @@ class GeminiApp(QtWidgets.QDialog):
         
         # 위젯 이벤트 연결 및 설정
         self.btnSend.clicked.connect(self.generate_response)
-        self.lblAnswer.setReadOnly(True)
+        self.btnCancel.clicked.connect(lambda: self.cancel_requests("사용자 취소"))
+
+        # 🌟 대화 기록은 토큰 예산을 지키는 맥락 객체가 관리합니다.
+        self.context = ConversationContext(
+            token_budget=CONTEXT_TOKEN_BUDGET,
+            pin_first=CONTEXT_PIN_FIRST,
+            summarize=summarize_conversation if CONTEXT_SUMMARY else None,
+            evict_ratio=CONTEXT_EVICT_RATIO
+        )
+        # 🌟 Gemini 요청 풀: 질문마다 스레드를 새로 만들지 않고 재사용하며, 여러 질문을 동시에 처리합니다.
+        self.request_pool = QtCore.QThreadPool(self)
+        self.request_pool.setMaxThreadCount(GEMINI_MAX_CONCURRENT)
+        self.request_seq = 0
+        self.requests = OrderedDict()   # request_id -> PendingRequest (제출 순서)
+        self.context_cache = None
+        if CONTEXT_CACHE:
+            self.context_cache = ContextCacheManager(
+                client, MODEL_NAME, SYSTEM_INSTRUCTION,
+                ttl=CONTEXT_CACHE_TTL,
+                min_tokens=CONTEXT_CACHE_MIN_TOKENS,
+                stable_prefix=self.context.stable_length
+            )
+
+        # 🌟 모든 DB 작업이 공유하는 커넥션 풀 (실제 접속은 첫 사용 시)
+        self.db_pool = create_mysql_pool(DB_CONFIG)
+        QtWidgets.QApplication.instance().aboutToQuit.connect(self.shutdown)
+
+        # 🌟 질문/답변 저장은 write-behind 큐가 백그라운드에서 배치로 처리합니다.
+        self.db_spilled.connect(self.handle_save_error)
+        self.write_queue = WriteBehindQueue(
+            self.db_pool,
+            DB_WRITE_JOURNAL,
+            batch_size=DB_WRITE_BATCH_SIZE,
+            flush_interval=DB_WRITE_FLUSH_INTERVAL,
+            on_spill=self.db_spilled.emit
+        ).start()
+
+        # 🌟 로컬 복제본: 기록 검색/저장은 로컬 SQLite에서 바로 하고, 원격 MySQL과는 백그라운드에서 동기화합니다.
+        self.replica = None
+        self.replica_sync = None
+        if REPLICA_CONFIG["enabled"]:
+            try:
+                self.replica = LocalChatReplica(REPLICA_CONFIG["path"])
+            except Exception as e:
+                print(f"❌ 로컬 복제본 초기화 실패 (원격 DB에서 바로 검색합니다): {e}")
+        if self.replica is not None:
+            self.replica_sync = ReplicaSync(
+                self.replica, self.db_pool,
+                interval=REPLICA_CONFIG["sync_interval"],
+                push_delay=REPLICA_CONFIG["push_delay"],
+                batch_size=REPLICA_CONFIG["batch_size"]
+            ).start()
+
+        # 🌟 asyncio 엔진: 이벤트 루프 스레드 하나에서 Gemini 호출, DB 조회/저장, 음성 미리 합성을 처리합니다.
+        self.async_engine = None
+        self.chat_store = None
+        if ENGINE_CONFIG["engine"] == "asyncio":
+            self.async_engine = AsyncLoopThread().start()
+            if self.replica is not None:
+                self.chat_store = ReplicaChatStore(self.replica, self.replica_sync)
+            else:
+                self.chat_store = create_async_chat_store(self.db_pool, DB_CONFIG)
+
+        # 🌟 DB 검색 단계: 결과를 기다리는 중인 검색(request_id -> 질문)과 실행 중인 DB 워커
+        self.lookup_seq = 0
+        self.pending_lookups = {}
+        self.background_workers = set()
+
+        # 🌟 턴별 단계 지연 측정 (메모리 히스토그램 + JSONL/Prometheus 파일로 내보내기)
+        self.tracer = create_tracer(METRICS_CONFIG)
+        self.stats_panel = None
+        if METRICS_CONFIG["panel"]:
+            self.create_stats_panel()
+
+        # 🌟 GUI 멈춤 감시: GUI 스레드 타이머가 하트비트를 보내고, 늦어지면 감시 스레드가 그 순간의 스택을 기록합니다.
+        self.watchdog = None
+        if WATCHDOG_CONFIG["enabled"]:
+            self.watchdog = StallWatchdog(
+                WATCHDOG_CONFIG["heartbeat_ms"], WATCHDOG_CONFIG["threshold_ms"], WATCHDOG_CONFIG["log_path"],
+                store=self.tracer.store
+            ).start()
+            self.heartbeat_timer = QtCore.QTimer(self)
+            self.heartbeat_timer.setInterval(WATCHDOG_CONFIG["heartbeat_ms"])
+            self.heartbeat_timer.timeout.connect(self.watchdog.beat)
+            self.heartbeat_timer.start()
+        # 🌟 프로파일러: PROFILE=1이면 실행 전체를, 아니면 Ctrl+Shift+P로 켠 구간을 cProfile로 측정합니다.
+        self.profiler = SessionProfiler(
+            WATCHDOG_CONFIG["profile_path"], WATCHDOG_CONFIG["profile_sort"], WATCHDOG_CONFIG["profile_top"]
+        )
+        self.profile_shortcut = QtGui.QShortcut(QtGui.QKeySequence("Ctrl+Shift+P"), self)
+        self.profile_shortcut.activated.connect(self.toggle_profiler)
+        if WATCHDOG_CONFIG["profile"]:
+            self.profiler.start()
+
+        # 🌟 정확 일치 답변 캐시 (메모리 LRU + TTL) 와 절약 효과 측정용 카운터
+        self.answer_cache = AnswerCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL)
+        self.exact_db_hits = 0
+        self.gemini_calls = 0
+        self.gemini_total_seconds = 0.0
+
+        # 🌟 의미 유사 캐시 (디스크 인덱스를 메모리 매핑으로 불러옴). 창을 띄운 뒤 준비 작업이 채워 넣습니다.
+        self.semantic_cache = None
 
-        self.chat_history = []
-        self.gemini_worker = None 
-        self.speech_worker = None
+        # 🌟 음성 캐시 (합성한 mp3를 디스크에 보관)
+        self.tts_cache = None
+        if TTS_CONFIG["enabled"]:
+            try:
+                self.tts_cache = SpeechCache(TTS_CONFIG["directory"], TTS_CONFIG["max_bytes"])
+            except OSError as e:
+                print(f"❌ 음성 캐시 초기화 실패 (캐시 없이 실행합니다): {e}")
+        self.speech_pipeline = SpeechPipeline(
+            self.tts_cache,
+            workers=TTS_CONFIG["workers"],
+            chunk_chars=TTS_CONFIG["chunk_chars"],
+            player=create_player(TTS_CONFIG["player"])
+        )
+        # 🌟 발화는 전용 스레드의 스케줄러가 순서/선점/취소를 관리합니다. (GUI 스레드는 기다리지 않음)
+        self.speech_scheduler = SpeechScheduler(self.speech_pipeline).start()
+
+        # 🌟 스트리밍 청크를 주기적으로 반영하는 타이머 (청크 버퍼는 요청별로 PendingRequest에 있음)
+        self.stream_timer = QtCore.QTimer(self)
+        self.stream_timer.setInterval(STREAM_FLUSH_INTERVAL_MS)
+        self.stream_timer.setSingleShot(True)
+        self.stream_timer.timeout.connect(self.flush_stream_buffer)
         
         self.lblAnswer.setText("[Mygemini] 무엇을 도와드릴까요?")
         self.lblAnswer.append("\n[DB] 대화 내용이 자동으로 기록됩니다. 질문 시 먼저 DB에서 검색합니다.")
 
         self.show()
+        # 🌟 창이 실제로 그려진 뒤(이벤트 루프 시작 후) 시간을 기록하고 준비 작업을 시작합니다.
+        QtCore.QTimer.singleShot(0, self.start_warmup)
+
+    def start_warmup(self):
+        """창 표시까지 걸린 시간을 기록하고, 클라이언트/DB/의미 캐시 준비를 백그라운드에서 시작합니다."""
+        print(f"⏱️ 창 표시까지 {(time.time() - STARTUP_T0) * 1000:.0f}ms")
+        worker = StartupWarmupWorker(self.db_pool)
+        worker.warmed_up.connect(self.handle_warmup_done)
+        self.start_background_worker(worker)
+
+    def handle_warmup_done(self, semantic_cache, timings):
+        """준비 작업이 끝나면 의미 캐시를 연결합니다. 이때부터 첫 질문도 준비 비용 없이 처리됩니다."""
+        self.semantic_cache = semantic_cache
+        print(f"⏱️ 답변 준비 완료까지 {(time.time() - STARTUP_T0) * 1000:.0f}ms {timings}")
+        if os.environ.get("MYGEMINI_EXIT_WHEN_READY") == "1":
+            QtWidgets.QApplication.instance().quit()
 
     def generate_response(self):
         user_question = self.lineEditMyQuestion.text().strip()
         
         if not user_question:
             return
+
+        # 🌟 새 질문이 이전 질문을 대신합니다. 아직 끝나지 않은 검색/요청은 취소해 토큰과 대역폭을 아낍니다.
+        if GEMINI_CANCEL_ON_NEW:
+            self.cancel_requests("새 질문")
         
         # 🌟 사용자가 특정 명령어를 입력하면 검색 기능 실행 (이전 로직 제거)
         # if user_question.lower().startswith("검색:"):
@@ -159,188 +671,547 @@ class GeminiApp(QtWidgets.QDialog):
         #     self.lineEditMyQuestion.clear()
         #     return
         
-        # 1. DB에서 먼저 검색 시도. 기록이 있으면 True 반환 및 UI에 표시 후 종료.
-        if self.search_history(user_question):
+        # 🌟 이 질문(턴)의 단계별 시간을 기록합니다. (질문 내용은 기록하지 않음)
+        trace = self.tracer.start_turn(
+            user_question, engine=ENGINE_CONFIG["engine"], model=MODEL_NAME, question_chars=len(user_question)
+        )
+
+        # 0. 같은 질문의 답변이 메모리 캐시에 있으면 네트워크 없이 바로 답합니다.
+        cached_answer = self.answer_cache.get(question_hash(user_question))
+        if cached_answer is not None:
+            self.show_cached_answer(user_question, cached_answer, "메모리 캐시", trace)
             self.lineEditMyQuestion.clear()
             return
-            
-        # 2. DB에 기록이 없으면 Gemini API 호출 시작
+
+        # 1. DB에서 먼저 검색합니다. 검색은 워커 스레드에서 실행되고 결과는 시그널로 돌아옵니다.
+        #    (기록이 있으면 UI에 표시 후 종료, 없거나 제한 시간을 넘기면 Gemini 호출)
+        self.start_history_lookup(user_question, trace)
+        self.lineEditMyQuestion.clear()
+
+    # =================================================================
+    # 🌟 응답 파이프라인: DB 검색 → (기록이 없으면) Gemini 호출 → 저장 → 음성 출력
+    # =================================================================
+    def start_history_lookup(self, user_question, trace):
+        """DB 검색 워커를 시작하고, 제한 시간이 지나면 Gemini 호출로 넘어가도록 타이머를 겁니다."""
+        self.lookup_seq += 1
+        request_id = self.lookup_seq
+        # 결과를 기다리는 검색: request_id -> 턴 측정 (trace.question이 질문)
+        self.pending_lookups[request_id] = trace
+        trace.begin("db_lookup")
+
+        # 검색 시작 메시지를 UI에 추가 (DB 검색 중임을 알림)
+        self.lblAnswer.append(f"\n[DB 검색] '{user_question}'으로 과거 기록 검색 시작...")
+
+        if self.async_engine is not None:
+            lookup = AsyncHistoryLookup(request_id, self.chat_store, user_question, self.semantic_cache)
+            signals = lookup.signals
+        else:
+            lookup = HistoryLookupWorker(request_id, self.db_pool, user_question, self.semantic_cache, self.replica)
+            signals = lookup
+        signals.exact_found.connect(self.handle_exact_answer)
+        signals.similar_found.connect(self.handle_similar_answer)
+        signals.lookup_done.connect(self.handle_lookup_result)
+        signals.lookup_failed.connect(self.handle_lookup_error)
+        if self.async_engine is not None:
+            lookup.start(self.async_engine)
+        else:
+            self.start_background_worker(lookup)
+
+        QtCore.QTimer.singleShot(DB_LOOKUP_TIMEOUT_MS, lambda: self.handle_lookup_timeout(request_id))
+        self.update_cancel_button()
+
+    def handle_lookup_result(self, request_id, user_question, results):
+        """DB 검색 결과를 표시합니다. 일치하는 기록이 없으면 Gemini 호출 단계로 넘어갑니다."""
+        trace = self.pending_lookups.pop(request_id, None)
+        if trace is None:
+            print(f"⏱️ 제한 시간이 지나 도착한 DB 검색 결과는 무시합니다: {user_question}")
+            return
+
+        trace.end("db_lookup", results=len(results))
+        print(f"✅ {'로컬 복제본' if self.replica is not None else 'MySQL'} 검색 성공: {len(results)}건")
+        if not self.show_history_results(results):
+            self.start_gemini_request(user_question, trace)
+        else:
+            trace.finish("cached", source="DB 검색 결과")
+            self.update_cancel_button()
+
+    def handle_exact_answer(self, request_id, user_question, answer):
+        """DB에서 같은 질문의 답변을 찾았으면 Gemini를 호출하지 않고 그 답변을 사용합니다."""
+        trace = self.pending_lookups.pop(request_id, None)
+        if trace is None:
+            return
+
+        trace.end("db_lookup")
+        self.exact_db_hits += 1
+        self.answer_cache.put(question_hash(user_question), answer)
+        self.show_cached_answer(user_question, answer, "DB", trace)
+
+    def handle_similar_answer(self, request_id, user_question, answer, matched_question, score):
+        """뜻이 같은 과거 질문(유사도 임계값 이상)의 답변을 사용합니다."""
+        trace = self.pending_lookups.pop(request_id, None)
+        if trace is None:
+            return
+
+        trace.end("db_lookup", similarity=round(score, 3))
+        self.lblAnswer.append(f"[의미 캐시] 비슷한 질문 '{matched_question[:50]}' (유사도 {score:.2f})")
+        self.show_cached_answer(user_question, answer, "의미 캐시", trace)
+
+    def show_cached_answer(self, user_question, answer, source, trace):
+        """캐시(메모리 또는 DB)에서 찾은 답변을 Gemini 응답과 같은 방식으로 표시하고 음성 출력합니다."""
+        self.lblAnswer.append(f"[질문] {user_question}\n")
+        self.lblAnswer.append(f"[Mygemini] ({source}에 저장된 답변) {answer}\n")
+
+        # 이어지는 질문의 맥락을 위해 대화 기록에도 추가합니다. (진행 중인 앞선 질문이 있으면 그 뒤 순서로)
+        self.request_seq += 1
+        request = PendingRequest(self.request_seq, user_question, None)
+        request.answer = answer
+        self.requests[request.request_id] = request
+        self.complete_request(request)
+
+        print(f"⚡ 답변 캐시 적중 ({source}): {self.cache_stats()}")
+        trace.finish("cached", source=source)
+        self.speak(answer, trace=trace)
+
+    def cache_stats(self):
+        """답변 캐시 적중/미스 횟수와, 적중으로 아낀 Gemini 호출 수 및 추정 대기 시간을 반환합니다."""
+        stats = self.answer_cache.stats()
+        saved_calls = stats["hits"] + self.exact_db_hits
+        if self.semantic_cache is not None:
+            saved_calls += self.semantic_cache.hits
+        average_latency = self.gemini_total_seconds / self.gemini_calls if self.gemini_calls else 0.0
+        stats.update({
+            "db_hits": self.exact_db_hits,
+            "semantic": self.semantic_cache.stats() if self.semantic_cache is not None else None,
+            "gemini_calls": self.gemini_calls,
+            "saved_calls": saved_calls,
+            "saved_seconds_estimate": round(saved_calls * average_latency, 2),
+        })
+        return stats
+
+    def handle_lookup_error(self, request_id, user_question, error_message):
+        """DB 검색 실패 시에도 AI가 응답할 수 있도록 Gemini 호출 단계로 넘어갑니다."""
+        trace = self.pending_lookups.pop(request_id, None)
+        if trace is None:
+            return
+
+        trace.end("db_lookup", error=True)
+        print(f"❌ MySQL 검색 실패: {error_message}")
+        self.lblAnswer.append(f"[DB 오류] 기록 검색 실패: {error_message}")
+        self.start_gemini_request(user_question, trace)
+
+    def handle_lookup_timeout(self, request_id):
+        """DB가 제한 시간 안에 응답하지 않으면 검색 결과를 기다리지 않고 Gemini에 질문합니다."""
+        trace = self.pending_lookups.pop(request_id, None)
+        if trace is None:
+            return  # 이미 검색 결과가 도착했습니다.
+
+        user_question = trace.question
+        trace.end("db_lookup", timeout=True)
+        print(f"⏱️ DB 검색 제한 시간 초과 ({DB_LOOKUP_TIMEOUT_MS}ms): {user_question}")
+        self.lblAnswer.append(f"[DB 검색] {DB_LOOKUP_TIMEOUT_MS}ms 안에 응답이 없어 Gemini에 바로 질문합니다.")
+        self.start_gemini_request(user_question, trace)
+
+    def start_background_worker(self, worker):
+        """워커가 끝날 때까지 참조를 유지하고, 끝나면 정리되도록 한 뒤 시작합니다."""
+        self.background_workers.add(worker)
+        worker.finished.connect(lambda: self.background_workers.discard(worker))
+        worker.finished.connect(worker.deleteLater)
+        worker.start()
+
+    def start_gemini_request(self, user_question, trace):
+        """DB에 기록이 없을 때 Gemini API 호출을 요청 풀에 제출합니다. 앞의 요청이 끝나기를 기다리지 않습니다."""
         user_message = f"[질문] {user_question}\n"
         self.lblAnswer.append(user_message)
         
         loading_message = "[Mygemini] 응답을 생성하는 중입니다..."
-        self.lblAnswer.append(loading_message)
-        QtWidgets.QApplication.processEvents() 
-        
-        self.chat_history.append({"role": "user", "parts": [{"text": user_question}]})
-
-        # Gemini API 호출 (QThread 사용)
-        self.gemini_worker = GeminiWorker(
-            client=client,
-            model_name=MODEL_NAME,
-            chat_history=self.chat_history,
-            user_question=user_question
-        )
-        
-        self.gemini_worker.response_ready.connect(self.handle_response)
-        self.gemini_worker.error_occurred.connect(self.handle_error)
+        message = self.lblAnswer.append(loading_message)
+
+        self.request_seq += 1
+        request = PendingRequest(self.request_seq, user_question, message)
+        self.requests[request.request_id] = request
+        request.trace = trace
+        trace.set(source="Gemini")
+        trace.begin("gemini_first_chunk")
+        trace.begin("gemini_total")
+
+        # 🌟 제출 시점의 대화 기록 복사본 + 이번 질문 (진행 중인 다른 질문은 포함하지 않음)
+        contents = self.context.contents()
+        contents.append({"role": "user", "parts": [{"text": user_question}]})
+
+        if self.async_engine is not None:
+            # Gemini API 호출 (asyncio 엔진, 답변이 스트리밍되는 동안 음성을 미리 합성)
+            prefetcher = None
+            if self.tts_cache is not None and TTS_CONFIG["speak"]:
+                prefetcher = SpeechPrefetcher(
+                    self.tts_cache, chunk_chars=TTS_CONFIG["chunk_chars"], timeout=ENGINE_CONFIG["tts_timeout"]
+                )
+            worker = AsyncGeminiWorker(
+                request.request_id,
+                client=client,
+                model_name=MODEL_NAME,
+                contents=contents,
+                user_question=user_question,
+                context_cache=self.context_cache,
+                scheduler=GEMINI_SCHEDULER,
+                prefetcher=prefetcher
+            )
+        else:
+            # Gemini API 호출 (QThreadPool 사용)
+            worker = GeminiWorker(
+                request.request_id,
+                client=client,
+                model_name=MODEL_NAME,
+                contents=contents,
+                user_question=user_question,
+                context_cache=self.context_cache,
+                scheduler=GEMINI_SCHEDULER
+            )
         
-        self.gemini_worker.start()
+        worker.signals.response_ready.connect(self.handle_response)
+        worker.signals.retrying.connect(self.handle_retry)
+        worker.signals.chunk_ready.connect(self.handle_chunk)
+        worker.signals.error_occurred.connect(self.handle_error)
+        request.signals = worker.signals
+        request.worker = worker
         
-        self.lineEditMyQuestion.clear()
+        if self.async_engine is not None:
+            worker.start(self.async_engine)
+        else:
+            self.request_pool.start(worker)
+        self.update_cancel_button()
         
-    def handle_response(self, user_question, gemini_response):
+    def handle_response(self, request_id, user_question, gemini_response):
         """API 응답을 받아 UI에 표시하고, DB에 저장하며, 음성 출력합니다."""
+        request = self.requests.get(request_id)
+        if request is None or request.done:
+            return  # 취소된 요청의 늦은 결과
+        trace = request.trace
+        trace.end("gemini_total")
+        trace.add_tokens(request.worker.request.usage)
         
         formatted_output = f"[Mygemini] {gemini_response}\n"
         
-        # 로딩 메시지를 제거합니다.
-        cursor = self.lblAnswer.textCursor()
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
-        cursor.removeSelectedText()
-        
-        # 최종 응답을 추가합니다.
-        self.lblAnswer.append(formatted_output)
-        
-        # 🌟 DB에 질문과 답변을 저장합니다.
-        self.save_to_mysql(user_question, gemini_response)
+        if request.streaming:
+            # 🌟 스트리밍으로 이미 표시된 응답: 남은 청크만 반영하고 줄을 마무리합니다.
+            self.flush_request(request)
+            self.write_request(request, "\n")
+        else:
+            # 로딩 메시지를 최종 응답으로 바꿉니다.
+            self.write_request(request, formatted_output, replace=True)
 
-        # 음성 출력을 새 스레드에서 시작합니다.
-        self.start_speech_worker(gemini_response)
+        # 🌟 같은 질문이 다시 오면 바로 답할 수 있도록 캐시에 넣고, 절약 효과 계산용 지연 시간을 기록합니다.
+        self.answer_cache.put(question_hash(user_question), gemini_response)
+        if self.semantic_cache is not None:
+            self.start_background_worker(SemanticIndexWorker(self.semantic_cache, user_question, gemini_response))
+        self.gemini_calls += 1
+        self.gemini_total_seconds += time.monotonic() - request.started_at
 
-        # 스레드 종료 및 정리
-        self.gemini_worker.quit()
-        self.gemini_worker.wait()
+        # 🌟 DB 저장 큐에 질문과 답변을 넣습니다. (실제 저장은 백그라운드에서 배치로)
+        self.save_to_mysql(user_question, gemini_response, trace)
+
+        # 음성 출력을 발화 스케줄러에 예약합니다. (기본 정책: 이전 발화를 끊고 새 답변 재생)
+        self.speak(gemini_response, trace=trace)
+
+        request.answer = gemini_response
+        self.finish_trace(request, "answered")
+        self.complete_request(request)
         
-    def handle_error(self, error_type, error_message):
+    def handle_error(self, request_id, error_type, error_message):
         """API 오류 발생 시 UI에 오류 메시지를 표시하고 로딩 메시지를 제거합니다."""
-        
-        if self.chat_history and self.chat_history[-1].get("role") == "user":
-             self.chat_history.pop()
+        request = self.requests.get(request_id)
+        if request is None or request.done:
+            return  # 취소된 요청의 늦은 결과
 
         formatted_output = f"[Mygemini] {error_type} 발생: {error_message}\n"
         
-        # 로딩 메시지를 제거하고 오류 메시지를 추가합니다.
-        cursor = self.lblAnswer.textCursor()
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
-        cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfLine, QtGui.QTextCursor.MoveMode.KeepAnchor)
-        cursor.removeSelectedText()
-        
-        self.lblAnswer.append(formatted_output)
+        # 로딩 메시지(또는 스트리밍 도중의 부분 응답)를 오류 메시지로 바꿉니다.
+        request.stream_buffer.clear()
+        self.write_request(request, formatted_output, replace=True)
         
-        # 오류 메시지 음성 출력을 새 스레드에서 시작합니다.
-        self.start_speech_worker(f"{error_type} 발생: {error_message}")
+        # 오류 메시지는 우선 재생하되, 오래 기다리게 되면 버립니다.
+        self.speak(f"{error_type} 발생: {error_message}", POLICY_DROP_STALE, PRIORITY_HIGH)
 
-        # 스레드 종료 및 정리
-        self.gemini_worker.quit()
-        self.gemini_worker.wait()
+        self.finish_trace(request, "error", error=error_type)
+        self.complete_request(request)
 
-    def start_speech_worker(self, text):
-        """블로킹될 수 있는 playsound를 별도의 SpeechWorker 스레드에서 실행합니다."""
-        if self.speech_worker and self.speech_worker.isRunning():
-            self.speech_worker.wait() 
-            
-        self.speech_worker = SpeechWorker(text)
-        self.speech_worker.start()
+    def handle_retry(self, request_id, attempt, wait):
+        """일시적인 오류로 다시 시도할 때 로딩 메시지에 대기 상황을 표시합니다."""
+        request = self.requests.get(request_id)
+        if request is None or request.done or request.streaming:
+            return
+        request.trace.set(retries=attempt - 1)
+        self.write_request(
+            request,
+            f"[Mygemini] 요청이 많아 {wait:.1f}초 후 다시 시도합니다... ({attempt}/{GEMINI_SCHEDULER.max_attempts})",
+            replace=True
+        )
+
+    def finish_trace(self, request, outcome, **attributes):
+        """요청의 턴 측정을 끝냅니다. 이 요청의 응답을 화면에 쓰는 데 걸린 GUI 시간도 함께 기록합니다."""
+        trace = request.trace
+        if trace is None:
+            return
+        if request.render_seconds:
+            trace.record("render", request.render_seconds)
+        trace.finish(outcome, **attributes)
+
+    def complete_request(self, request):
+        """
+        요청을 완료 처리하고, 앞선 요청이 모두 끝난 것부터 제출 순서대로 대화 기록에 합칩니다.
+        (오류로 끝난 질문은 기록에 넣지 않습니다.)
+        """
+        request.done = True
+        request.signals = None
+        request.worker = None
+        while self.requests:
+            first = next(iter(self.requests.values()))
+            if not first.done:
+                break
+            del self.requests[first.request_id]
+            if first.answer is not None:
+                self.context.add_exchange(first.user_question, first.answer)
+        self.update_cancel_button()
+
+    # =================================================================
+    # 🌟 요청 취소 (취소 버튼, 새 질문, 창 닫기)
+    # =================================================================
+    def cancel_requests(self, reason):
+        """결과를 기다리는 DB 검색과 진행 중인 Gemini 요청을 모두 취소합니다. 취소한 건수를 반환합니다."""
+        cancelled = 0
+        for request_id in list(self.pending_lookups):
+            # 목록에서 빼 두면 늦게 도착한 검색 결과/제한 시간 타이머는 무시됩니다.
+            trace = self.pending_lookups.pop(request_id)
+            trace.finish("cancelled", reason=reason)
+            self.lblAnswer.append(f"[DB 검색] '{trace.question}' 검색을 취소했습니다. ({reason})")
+            cancelled += 1
+        for request in list(self.requests.values()):
+            if not request.done:
+                self.cancel_request(request, reason)
+                cancelled += 1
+        self.update_cancel_button()
+        return cancelled
+
+    def cancel_request(self, request, reason):
+        """
+        Gemini 요청 하나를 취소합니다. 워커가 아직 시작 전이면 풀에서 꺼내고, 실행 중이면 취소 표시만 하고 기다리지 않습니다.
+        요청이 목록에서 빠지므로 늦게 도착한 응답/청크는 request_id로 걸러집니다.
+        """
+        worker = request.worker
+        if worker is not None:
+            worker.cancel()
+            if isinstance(worker, GeminiWorker) and self.request_pool.tryTake(worker):
+                print(f"🛑 요청 #{request.request_id} 취소 (시작 전, {reason})")
+            else:
+                print(f"🛑 요청 #{request.request_id} 취소 (진행 중, {reason})")
+
+        request.stream_buffer.clear()
+        self.write_request(request, f"[Mygemini] 요청을 취소했습니다. ({reason})\n", replace=True)
+        self.finish_trace(request, "cancelled", reason=reason)
+        self.complete_request(request)
+
+    def update_cancel_button(self):
+        """취소할 검색/요청이 있을 때만 취소 버튼을 활성화합니다."""
+        in_flight = bool(self.pending_lookups) or any(not r.done for r in self.requests.values())
+        self.btnCancel.setEnabled(in_flight)
+
+    # =================================================================
+    # 🌟 스트리밍 응답 표시 (요청별 청크를 모아서 주기적으로 반영)
+    # =================================================================
+    def handle_chunk(self, request_id, text):
+        """워커가 보낸 청크를 요청별 버퍼에 모읍니다. 첫 청크는 로딩 메시지를 대신해 즉시 표시합니다."""
+        request = self.requests.get(request_id)
+        if request is None or request.done:
+            return  # 취소된 요청의 늦은 결과
+        request.stream_buffer.append(text)
+
+        if not request.streaming:
+            request.streaming = True
+            request.stream_buffer.insert(0, "[Mygemini] ")
+            self.flush_request(request, replace=True)
+            request.trace.end("gemini_first_chunk")
+        elif not self.stream_timer.isActive():
+            self.stream_timer.start()
+
+    def flush_stream_buffer(self):
+        """모든 진행 중인 요청의 모아 둔 청크를 한 번에 반영합니다."""
+        for request in self.requests.values():
+            self.flush_request(request)
+
+    def flush_request(self, request, replace=False):
+        if not request.stream_buffer:
+            return
+        text = "".join(request.stream_buffer)
+        request.stream_buffer.clear()
+        self.write_request(request, text, replace)
+
+    def write_request(self, request, text, replace=False):
+        """
+        요청의 응답 메시지 끝에 text를 이어 씁니다. replace=True면 그 메시지(로딩 메시지 또는 부분 응답)를 text로 바꿉니다.
+        다른 요청의 응답이 뒤에 붙어 있어도 자기 메시지에만 씁니다. (맨 아래를 보고 있으면 뷰가 따라 내려감)
+        """
+        started_at = time.perf_counter()
+        if replace:
+            self.lblAnswer.set_text(request.message, text)
+        else:
+            self.lblAnswer.append_text(request.message, text)
+        request.render_seconds += time.perf_counter() - started_at
+
+    # =================================================================
+    # 🌟 통계 패널 (METRICS_PANEL=1): 창 아래에 단계별 지연 p50/p95와 토큰 수를 표시
+    # =================================================================
+    def create_stats_panel(self):
+        """창 아래쪽을 늘려 작은 통계 패널을 붙이고 1초마다 갱신합니다."""
+        panel_height = 64
+        self.stats_panel = QtWidgets.QLabel(self)
+        self.stats_panel.setGeometry(10, self.height(), self.width() - 20, panel_height)
+        self.stats_panel.setAlignment(QtCore.Qt.AlignmentFlag.AlignLeft | QtCore.Qt.AlignmentFlag.AlignTop)
+        self.stats_panel.setStyleSheet("font-size: 8pt; color: #555;")
+        self.stats_panel.setWordWrap(True)
+        self.resize(self.width(), self.height() + panel_height + 6)
+
+        self.stats_timer = QtCore.QTimer(self)
+        self.stats_timer.setInterval(1000)
+        self.stats_timer.timeout.connect(self.update_stats_panel)
+        self.stats_timer.start()
+        self.update_stats_panel()
+
+    def update_stats_panel(self):
+        self.stats_panel.setText(panel_text(self.tracer.store))
+
+    def toggle_profiler(self):
+        """Ctrl+Shift+P: 프로파일링을 켜거나, 켜져 있으면 멈추고 결과를 파일로 씁니다."""
+        if not self.profiler.running:
+            self.profiler.start()
+            self.lblAnswer.append("[프로파일] 측정을 시작했습니다. 다시 Ctrl+Shift+P를 누르면 결과를 저장합니다.")
+            return
+        try:
+            path = self.profiler.stop()
+        except OSError as e:
+            self.lblAnswer.append(f"[프로파일] 결과 저장 실패: {e}")
+            return
+        self.lblAnswer.append(f"[프로파일] 결과를 저장했습니다: {path} (요약: {path}.txt)")
+
+    def shutdown(self):
+        """프로그램 종료 직전에 저장 큐에 남은 기록을 저장하고 DB 커넥션 풀을 정리합니다."""
+        # 종료 처리 자체는 측정하지 않도록 프로파일러를 먼저 멈춥니다.
+        try:
+            self.profiler.stop()
+        except OSError as e:
+            print(f"❌ 프로파일 결과 저장 실패: {e}")
+        if self.watchdog is not None:
+            self.heartbeat_timer.stop()
+            self.watchdog.close()
+            print(f"📊 GUI 멈춤 통계: {self.watchdog.stats()}")
+        # 🌟 진행 중인 요청은 취소하고(연결 끊기), 아직 시작하지 않은 요청은 버립니다.
+        self.cancel_requests("프로그램 종료")
+        self.request_pool.clear()
+        if not self.request_pool.waitForDone(GEMINI_SHUTDOWN_WAIT_MS):
+            # QThreadPool은 삭제될 때 남은 작업을 끝까지 기다리므로, 삭제하지 않고 프로세스와 함께 버립니다.
+            print(f"⚠️ 요청 작업이 {GEMINI_SHUTDOWN_WAIT_MS}ms 안에 끝나지 않아 기다리지 않고 종료합니다.")
+            self.request_pool.setParent(None)
+            sip.transferto(self.request_pool, None)
+        if self.async_engine is not None:
+            self.async_engine.close(cleanup=self.chat_store.close)
+        print(f"📊 답변 캐시 통계: {self.cache_stats()}")
+        print(f"📊 대화 맥락 통계: {self.context.stats()}")
+        print(f"📊 Gemini 요청 통계: {GEMINI_SCHEDULER.stats()}")
+        if self.context_cache is not None:
+            print(f"📊 컨텍스트 캐시 통계: {self.context_cache.stats()}")
+            self.context_cache.close()
+        if self.tts_cache is not None:
+            print(f"📊 음성 캐시 통계: {self.tts_cache.stats()}")
+        print(f"📊 발화 스케줄러 통계: {self.speech_scheduler.stats()}")
+        print(f"📊 음성 재생 지연 통계: {self.speech_pipeline.stats()}")
+        self.speech_scheduler.close()
+        self.speech_pipeline.close()
+        if self.semantic_cache is not None:
+            self.semantic_cache.save()
+        if self.replica is not None:
+            stopped = self.replica_sync.close()
+            print(f"📊 로컬 복제본 통계: {self.replica.stats()}, 동기화: {self.replica_sync.stats()}")
+            if stopped:
+                self.replica.close()
+            else:
+                # 동기화 스레드가 아직 올리기/병합 중이면 연결을 닫지 않고 프로세스와 함께 정리되게 둡니다.
+                print("⚠️ 로컬 복제본 동기화가 끝나지 않아 복제본을 닫지 않고 종료합니다.")
+        self.write_queue.close()
+        self.db_pool.close()
+        # 저장/음성 단계까지 기록된 뒤에 측정 통계를 출력하고 파일을 마지막으로 갱신합니다.
+        print(f"📊 단계별 지연 통계: {self.tracer.store.summary()}")
+        if self.tracer.exporter is not None:
+            self.tracer.exporter.close()
+
+    def speak(self, text, policy=TTS_POLICY, priority=PRIORITY_NORMAL, trace=None):
+        """발화를 스케줄러에 예약합니다. 바로 반환하므로 이전 발화가 재생 중이어도 UI가 멈추지 않습니다."""
+        if not TTS_CONFIG["speak"]:
+            return None
+        return self.speech_scheduler.say(text, policy, priority, trace=trace)
 
     # =================================================================
     # 🌟 추가 기능 1: MySQL에 데이터 저장 (DB 완성)
     # =================================================================
-    def save_to_mysql(self, question, answer):
-        """질문과 답변을 MySQL 데이터베이스에 저장합니다."""
+    def save_to_mysql(self, question, answer, trace):
+        """질문과 답변을 write-behind 큐에 넣습니다. DB 지연은 응답 경로에 영향을 주지 않습니다."""
+        # 🌟 저장 단계: 큐에 넣은 때부터 DB에 커밋(또는 저널 보관)될 때까지
+        trace.begin("db_save")
+        if self.async_engine is not None:
+            self.async_engine.submit(self.save_async(question, answer, trace))
+            return
+        if self.replica is not None:
+            self.save_local(question, answer, trace)
+            return
+        self.write_queue.put(question, answer, on_saved=lambda saved: trace.end("db_save", saved=saved))
+
+    def save_local(self, question, answer, trace):
+        """로컬 복제본에 저장합니다. 원격에는 동기화 스레드가 올리며, 로컬 저장에 실패하면 write-behind 큐로 넘깁니다."""
         try:
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-            # 🚨 DB 연결 정보: 실제 정보로 교체해야 합니다!
-            conn = pymysql.connect(
-                host='bitnmeta2.synology.me',
-                user='iyrc',
-                passwd='Dodan1004!',
-                db='gemini_ai',
-                charset='utf8',
-                port=3307,
-                cursorclass=pymysql.cursors.DictCursor
-            )
-            with conn.cursor() as cursor:
-                # 🚨 테이블 이름 확인: 실제 MySQL 테이블 이름으로 바꿔주세요!
-                sql = "INSERT INTO chat_history (question, answer, create_at) VALUES (%s, %s, %s)"
-                
-                # 쿼리 실행
-                cursor.execute(sql, (question, answer, current_time))
-            
-            conn.commit()
-            print(f"✅ MySQL 저장 성공: {current_time}")
+            self.replica.save(question, answer)
+        except Exception as e:
+            print(f"⚠️ 로컬 저장 실패, 저장 큐로 넘깁니다: {e}")
+            self.write_queue.put(question, answer, on_saved=lambda saved: trace.end("db_save", saved=saved))
+            return
+        trace.end("db_save", saved=True, local=True)
+        self.replica_sync.notify()
 
+    async def save_async(self, question, answer, trace):
+        """asyncio 엔진: 비동기 드라이버로 바로 저장하고, 실패하면 write-behind 큐(재시도 + 저널)에 넘깁니다."""
+        created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            await asyncio.wait_for(self.chat_store.save(question, answer, created_at), ENGINE_CONFIG["db_timeout"])
+            trace.end("db_save", saved=True)
+            print(f"✅ {'로컬 복제본' if self.replica is not None else 'MySQL'} 저장 성공 (asyncio)")
+        except asyncio.CancelledError:
+            # 종료 중에 취소되면 저장 큐에 넘겨 잃어버리지 않습니다.
+            self.write_queue.put(question, answer, created_at)
+            raise
         except Exception as e:
-            print(f"❌ MySQL 저장 실패: {e}")
-            # UI에 오류 메시지 추가
-            self.lblAnswer.append(f"[DB 오류] 기록 저장 실패: {e}")
-        
-        finally:
-            if 'conn' in locals() and conn.open:
-                conn.close()
+            print(f"⚠️ 비동기 저장 실패, 저장 큐로 넘깁니다: {str(e) or type(e).__name__}")
+            self.write_queue.put(question, answer, created_at,
+                                 on_saved=lambda saved: trace.end("db_save", saved=saved))
+
+    def handle_save_error(self, count, error_message):
+        """배치 저장이 끝내 실패해 기록이 저널로 넘어갔을 때 UI에 알립니다."""
+        self.lblAnswer.append(f"[DB 오류] 기록 {count}건 저장 실패 (다음 실행 때 다시 저장합니다): {error_message}")
 
     # =================================================================
     # 🌟 추가 기능 2: MySQL에서 히스토리 검색 (저장된 답 찾기)
     # =================================================================
-    def search_history(self, search_term):
-        """MySQL 데이터베이스에서 특정 단어를 포함하는 질문과 답변 기록을 검색합니다.
+    def show_history_results(self, results):
+        """HistoryLookupWorker가 찾은 과거 기록을 UI에 표시합니다.
            검색된 기록이 있으면 True, 없으면 False를 반환합니다."""
         
-        # 검색 시작 메시지를 UI에 추가 (DB 검색 중임을 알림)
-        self.lblAnswer.append(f"\n[DB 검색] '{search_term}'으로 과거 기록 검색 시작...")
-        QtWidgets.QApplication.processEvents()
-        
-        search_success = False # 검색 성공 여부를 저장할 플래그
-        
-        try:
-            # 🚨 DB 연결 정보: save_to_mysql과 동일한 정보 사용
-            conn = pymysql.connect(
-                host='bitnmeta2.synology.me',
-                user='iyrc',
-                passwd='Dodan1004!',
-                db='gemini_ai',
-                charset='utf8',
-                port=3307,
-                cursorclass=pymysql.cursors.DictCursor
-            )
-
-            with conn.cursor() as cursor:
-                # 🚨 테이블 이름 확인: 실제 MySQL 테이블 이름으로 바꿔주세요!
-                # question과 answer 필드에서 검색어와 일치하는 것을 찾습니다.
-                sql = "SELECT create_at, question, answer FROM chat_history WHERE question LIKE %s OR answer LIKE %s ORDER BY create_at DESC"
-                search_pattern = f"%{search_term}%" # LIKE 검색을 위한 패턴
-                
-                cursor.execute(sql, (search_pattern, search_pattern))
-                results = cursor.fetchall()
-            
-            # 검색 결과를 UI에 표시
-            if results:
-                search_success = True # 검색 성공 플래그 설정
-                
-                self.lblAnswer.append(f"[DB 결과] 총 {len(results)}건의 관련 기록을 찾았습니다:")
-                for i, row in enumerate(results):
-                    self.lblAnswer.append(f"--- [기록 {i+1}] {row['create_at']} ---")
-                    self.lblAnswer.append(f"  Q: {row['question'][:50]}...") # 질문은 50자만 미리보기
-                    self.lblAnswer.append(f"  A: {row['answer'][:50]}...") # 답변도 50자만 미리보기
-                self.lblAnswer.append("--------------------------------------------------")
-            else:
-                self.lblAnswer.append("[DB 결과] 해당 검색어와 일치하는 과거 기록이 없습니다. Gemini에 질문합니다.")
-            
-            print(f"✅ MySQL 검색 성공: {len(results)}건")
-            
-            return search_success # 최종 결과 반환
+        # 검색 결과를 UI에 표시
+        if results:
+            self.lblAnswer.append(f"[DB 결과] 총 {len(results)}건의 관련 기록을 찾았습니다:")
+            for i, row in enumerate(results):
+                self.lblAnswer.append(f"--- [기록 {i+1}] {row['create_at']} ---")
+                self.lblAnswer.append(f"  Q: {row['question'][:50]}...") # 질문은 50자만 미리보기
+                self.lblAnswer.append(f"  A: {row['answer'][:50]}...") # 답변도 50자만 미리보기
+            self.lblAnswer.append("--------------------------------------------------")
+            return True
 
-        except Exception as e:
-            print(f"❌ MySQL 검색 실패: {e}")
-            self.lblAnswer.append(f"[DB 오류] 기록 검색 실패: {e}")
-            # 오류 발생 시에도 Gemini 호출을 위해 False 반환 (DB 문제가 있다면 AI가 응답해야 함)
-            return False 
-        
-        finally:
-            if 'conn' in locals() and conn.open:
-                conn.close()
+        self.lblAnswer.append("[DB 결과] 해당 검색어와 일치하는 과거 기록이 없습니다. Gemini에 질문합니다.")
+        return False
 
 
 # =================================================================
@@ -348,14 +1219,6 @@ class GeminiApp(QtWidgets.QDialog):
 # =================================================================
 
 if __name__ == '__main__':
-    # 프로그램 시작 시 남아있는 temp_speech_*.mp3 파일을 삭제합니다.
-    for f in os.listdir('.'):
-        if f.startswith('temp_speech_') and f.endswith('.mp3'):
-            try:
-                os.remove(f)
-            except OSError as e:
-                print(f"임시 파일 삭제 오류 {f}: {e}")
-                
     app = QtWidgets.QApplication(sys.argv)
     window = GeminiApp()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""
+기존 chat_history 기록을 의미 유사 캐시 인덱스에 일괄 임베딩합니다.
+
+사용 예:
+    python backfill_embeddings.py                    # .env 설정(SEMANTIC_EMBEDDER 등)대로 실행
+    python backfill_embeddings.py --embedder local   # 네트워크 없이 로컬 임베더 사용
+
+이미 인덱스에 있는 질문(정규화 해시 일치)은 건너뛰므로 여러 번 실행해도 됩니다.
+"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from mygemini_db import DBConfigError, create_mysql_pool
+from mygemini_semantic import SemanticCache, backfill_from_rows, create_embedder, semantic_config_from_env
+
+
+def iter_chat_history(pool, page_size):
+    """chat_history의 (question, answer)를 page_size 단위로 나눠 읽습니다."""
+    offset = 0
+    while True:
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT question, answer FROM chat_history ORDER BY create_at LIMIT %s OFFSET %s",
+                    (page_size, offset)
+                )
+                rows = cursor.fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield row["question"], row["answer"]
+        offset += len(rows)
+
+
+def main():
+    load_dotenv()
+    config = semantic_config_from_env()
+
+    parser = argparse.ArgumentParser(description="chat_history를 의미 캐시 인덱스에 임베딩합니다.")
+    parser.add_argument("--embedder", choices=["gemini", "local"], default=config["embedder"])
+    parser.add_argument("--path", default=config["path"], help="인덱스 파일 경로(확장자 제외)")
+    parser.add_argument("--batch-size", type=int, default=64, help="한 번에 임베딩할 질문 수")
+    args = parser.parse_args()
+
+    client = None
+    if args.embedder == "gemini":
+        from google import genai
+        client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+
+    try:
+        pool = create_mysql_pool(max_size=1)
+    except DBConfigError as e:
+        print(f"❌ {e}")
+        return 1
+    cache = SemanticCache(args.path, create_embedder(args.embedder, client), autosave_every=0)
+    try:
+        before = len(cache)
+        added = backfill_from_rows(cache, iter_chat_history(pool, args.batch_size * 4), args.batch_size)
+        print(f"✅ 임베딩 완료: {added}건 추가 (전체 {before} → {len(cache)}건), 인덱스: {args.path}")
+        return 0
+    except Exception as e:
+        print(f"❌ 임베딩 실패: {e}")
+        return 1
+    finally:
+        pool.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+질문 목록 파일(JSONL/CSV)에 Gemini로 일괄 답변합니다. (GUI 없이 실행: FAQ 생성, 회귀 확인 등)
+
+사용 예:
+    python batch_answer.py questions.jsonl                       # questions.answers.jsonl에 결과 저장
+    python batch_answer.py faq.csv -o faq_answers.jsonl -c 8     # 동시에 8개씩 처리
+    python batch_answer.py questions.jsonl --save-db             # 답변을 chat_history에도 배치로 저장
+
+- 입력: JSONL은 줄마다 {"question": ..., "id": ...(선택)}, CSV는 question 열(선택: id 열)이 있는 파일.
+  파일은 한 번에 읽지 않고 처리하는 만큼만 읽습니다.
+- 출력: 답변이 끝나는 대로 JSONL에 한 줄씩 추가합니다. {"id", "question", "answer", "error", "latency_ms"}
+- 다시 실행하면 출력 파일에 이미 답변이 있는 id는 건너뜁니다. (중단 후 이어서 실행, 오류였던 질문은 다시 시도)
+- 요청은 Mygemini5.py와 같은 GeminiRequest(속도 제한/재시도 포함)로 처리합니다.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+from mygemini_gemini import DEFAULT_MODEL, GeminiRequest, cancel_request, create_client
+from mygemini_ratelimit import RequestCancelled, RequestScheduler, ratelimit_config_from_env
+
+
+# =================================================================
+# 1. 입력 / 이어서 실행
+# =================================================================
+
+def iter_questions(path, question_field="question", id_field="id"):
+    """입력 파일에서 (id, 질문)을 하나씩 읽습니다. id 열이 없으면 파일 안의 순번(1부터)을 id로 씁니다."""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for number, row in enumerate(csv.DictReader(f), 1):
+                yield str(row.get(id_field) or number), (row.get(question_field) or "").strip()
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"⚠️ {number}번째 줄이 JSON이 아니어서 건너뜁니다: {line[:80]}")
+                continue
+            if isinstance(record, str):
+                record = {question_field: record}
+            yield str(record.get(id_field) or number), str(record.get(question_field) or "").strip()
+
+
+def load_done_ids(output_path):
+    """이미 답변이 기록된 id 집합을 반환합니다. (오류로 끝난 질문은 포함하지 않음)"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # 중단되면서 반쯤 쓰인 마지막 줄
+            if record.get("answer") is not None:
+                done.add(str(record["id"]))
+    return done
+
+
+# =================================================================
+# 2. 질문 하나 처리 (작업 스레드)
+# =================================================================
+
+def answer_question(client, model, scheduler, question, cancel_event):
+    """질문 하나에 답변하고 (답변, 오류 메시지, 소요 시간(ms))을 반환합니다. 대화 맥락 없이 질문만 보냅니다."""
+    started_at = time.monotonic()
+    request = GeminiRequest(
+        client, model, [{"role": "user", "parts": [{"text": question}]}],
+        stream=True,
+        scheduler=scheduler,
+        cancel_event=cancel_event
+    )
+    try:
+        answer, error = request.run(), None
+    except RequestCancelled:
+        raise
+    except Exception as e:
+        answer, error = None, str(e) or type(e).__name__
+    return answer, error, (time.monotonic() - started_at) * 1000
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))], 1) if values else None
+
+
+# =================================================================
+# 3. 실행
+# =================================================================
+
+def main():
+    load_dotenv()
+    ratelimit = ratelimit_config_from_env()
+
+    parser = argparse.ArgumentParser(description="질문 목록 파일에 Gemini로 일괄 답변합니다.")
+    parser.add_argument("input", help="질문 파일 (.jsonl 또는 .csv)")
+    parser.add_argument("-o", "--output", help="결과 JSONL 파일 (기본값: <입력 파일 이름>.answers.jsonl)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="동시에 처리할 질문 수")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--rpm", type=float, default=ratelimit["rpm"], help="분당 최대 요청 수 (기본값: GEMINI_RPM)")
+    parser.add_argument("--question-field", default="question", help="질문이 들어 있는 필드/열 이름")
+    parser.add_argument("--id-field", default="id", help="id가 들어 있는 필드/열 이름")
+    parser.add_argument("--save-db", action="store_true", help="답변을 chat_history에도 저장 (write-behind 배치 저장)")
+    parser.add_argument("--db-batch-size", type=int, default=int(os.environ.get("DB_WRITE_BATCH_SIZE", "20")))
+    args = parser.parse_args()
+
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        print("치명적 오류: GEMINI_API_KEY가 환경 변수나 .env 파일로 설정되지 않았습니다.")
+        return 1
+    client = create_client(api_key, os.environ.get("GEMINI_BASE_URL"))
+
+    ratelimit["rpm"] = args.rpm
+    scheduler = RequestScheduler(**ratelimit)
+    output_path = args.output or os.path.splitext(args.input)[0] + ".answers.jsonl"
+    done_ids = load_done_ids(output_path)
+    if done_ids:
+        print(f"🔁 이미 답변한 질문 {len(done_ids)}건은 건너뜁니다: {output_path}")
+
+    # 🌟 --save-db: GUI의 save_to_mysql과 같은 write-behind 큐로 배치 저장합니다. (실패하면 저널에 보관)
+    pool = write_queue = None
+    if args.save_db:
+        from mygemini_db import DBConfigError, WriteBehindQueue, create_mysql_pool
+        try:
+            pool = create_mysql_pool()
+        except DBConfigError as e:
+            print(f"❌ {e}")
+            return 1
+        write_queue = WriteBehindQueue(
+            pool,
+            os.environ.get("DB_WRITE_JOURNAL", "chat_history_journal.jsonl"),
+            batch_size=args.db_batch_size
+        ).start()
+
+    cancel_event = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=max(1, args.concurrency), thread_name_prefix="BatchAnswer")
+    pending = {}        # future -> (id, 질문)
+    latencies = []
+    answered = failed = skipped = 0
+    started_at = time.monotonic()
+    interrupted = False
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        def write_result(future):
+            nonlocal answered, failed
+            question_id, question = pending.pop(future)
+            answer, error, latency_ms = future.result()
+            output.write(json.dumps({"id": question_id, "question": question, "answer": answer, "error": error,
+                                     "latency_ms": round(latency_ms, 1)}, ensure_ascii=False) + "\n")
+            output.flush()
+            if answer is None:
+                failed += 1
+                print(f"❌ [{question_id}] {error}")
+                return
+            answered += 1
+            latencies.append(latency_ms)
+            if write_queue is not None:
+                write_queue.put(question, answer)
+            print(f"✅ [{question_id}] {latency_ms:.0f}ms ({answered + failed}건 완료)")
+
+        try:
+            for question_id, question in iter_questions(args.input, args.question_field, args.id_field):
+                if question_id in done_ids or not question:
+                    skipped += 1
+                    continue
+                # 동시에 진행 중인 질문이 concurrency개를 넘지 않도록, 하나가 끝날 때까지 다음 질문을 읽지 않습니다.
+                while len(pending) >= args.concurrency:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        write_result(future)
+                future = executor.submit(answer_question, client, args.model, scheduler, question, cancel_event)
+                pending[future] = (question_id, question)
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    write_result(future)
+        except KeyboardInterrupt:
+            # 진행 중인 요청은 연결을 끊고 멈춥니다. 끝난 답변은 이미 기록했으므로 다시 실행하면 이어서 처리합니다.
+            interrupted = True
+            cancel_request(cancel_event)
+            print("\n⚠️ 중단합니다. 다시 실행하면 남은 질문부터 이어서 처리합니다.")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if write_queue is not None:
+                write_queue.close()
+                pool.close()
+
+    elapsed = time.monotonic() - started_at
+    print(f"📊 답변 {answered}건, 실패 {failed}건, 건너뜀 {skipped}건, {elapsed:.1f}초 "
+          f"({answered / elapsed if elapsed else 0.0:.2f} q/s)")
+    print(f"📊 응답 시간 p50 {percentile(latencies, 0.5)}ms, p95 {percentile(latencies, 0.95)}ms")
+    print(f"📊 Gemini 요청 통계: {scheduler.stats()}")
+    print(f"💾 결과: {output_path}")
+    if interrupted:
+        return 130
+    return 0 if not failed else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
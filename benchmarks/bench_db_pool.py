@@ -0,0 +1,155 @@
+"""
+DB 커넥션 풀 벤치마크
+
+매 호출마다 새로 접속(connect → 쿼리 → close)하는 기존 방식과
+ConnectionPool에서 커넥션을 빌려 쓰는 방식을 비교합니다.
+
+기본은 로컬 SQLite 파일을 대역(stand-in)으로 사용하며, 원격 MySQL의 TCP + 인증
+왕복 시간을 흉내 내기 위해 --connect-latency-ms 만큼 접속 시 지연을 넣을 수 있습니다.
+--mysql 을 주면 .env의 MYSQL_* 설정으로 실제 MySQL에 대해 측정합니다.
+
+사용 예:
+    python benchmarks/bench_db_pool.py --iterations 500 --threads 4 --connect-latency-ms 20
+    python benchmarks/bench_db_pool.py --mysql --iterations 50
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mygemini_db import ConnectionPool, DBConfigError, db_config_from_env  # noqa: E402
+
+
+# =================================================================
+# 1. 대역 DB 준비
+# =================================================================
+
+def make_sqlite_backend(connect_latency):
+    """chat_history 테이블이 있는 임시 SQLite DB와 접속 함수, 쿼리 함수를 만듭니다."""
+    path = os.path.join(tempfile.mkdtemp(prefix="mygemini_bench_"), "bench.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE chat_history (id INTEGER PRIMARY KEY, question TEXT, answer TEXT, create_at TEXT)")
+    conn.executemany(
+        "INSERT INTO chat_history (question, answer, create_at) VALUES (?, ?, ?)",
+        [(f"질문 {i}", f"답변 {i}", "2025-01-01 00:00:00") for i in range(1000)],
+    )
+    conn.commit()
+    conn.close()
+
+    def connect():
+        # 원격 DB의 TCP 연결 + 인증 왕복 시간을 흉내 냅니다.
+        if connect_latency:
+            time.sleep(connect_latency)
+        return sqlite3.connect(path, check_same_thread=False)
+
+    def query(conn):
+        cur = conn.execute("SELECT create_at, question, answer FROM chat_history WHERE id = ?", (1,))
+        cur.fetchall()
+
+    return connect, query
+
+
+def make_mysql_backend():
+    """.env의 MYSQL_* 설정으로 실제 MySQL에 접속하는 함수와 쿼리 함수를 만듭니다."""
+    import pymysql
+
+    config = db_config_from_env()
+
+    def connect():
+        return pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **config)
+
+    def query(conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+
+    return connect, query
+
+
+# =================================================================
+# 2. 측정
+# =================================================================
+
+def run(label, op, iterations, threads):
+    """op를 iterations번 (threads개 스레드로) 실행하고 호출별 지연 시간을 모읍니다."""
+    latencies = []
+    lock = threading.Lock()
+
+    def one_call(_):
+        start = time.perf_counter()
+        op()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one_call, range(iterations)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(
+        f"{label:<18} {iterations / wall:>10.1f} ops/s   "
+        f"평균 {statistics.mean(latencies) * 1000:>8.2f} ms   "
+        f"p50 {statistics.median(latencies) * 1000:>8.2f} ms   "
+        f"p95 {p95 * 1000:>8.2f} ms"
+    )
+    return wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="매 호출 접속 방식과 커넥션 풀 방식을 비교합니다.")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--connect-latency-ms", type=float, default=20.0,
+                        help="SQLite 대역 사용 시 접속마다 넣을 지연 시간(ms)")
+    parser.add_argument("--mysql", action="store_true", help="SQLite 대신 .env의 MySQL에 대해 측정")
+    args = parser.parse_args()
+
+    if args.mysql:
+        from dotenv import load_dotenv
+        load_dotenv()
+        try:
+            connect, query = make_mysql_backend()
+        except DBConfigError as e:
+            print(f"❌ {e}")
+            return 1
+        target = "MySQL"
+    else:
+        connect, query = make_sqlite_backend(args.connect_latency_ms / 1000.0)
+        target = f"SQLite (접속 지연 {args.connect_latency_ms:g} ms)"
+
+    print(f"대상: {target}, 반복 {args.iterations}회, 스레드 {args.threads}개, 풀 크기 {args.pool_size}")
+
+    def per_call():
+        conn = connect()
+        try:
+            query(conn)
+        finally:
+            conn.close()
+
+    pool = ConnectionPool(connect, max_size=args.pool_size)
+
+    def pooled():
+        with pool.connection() as conn:
+            query(conn)
+
+    per_call_wall = run("매 호출 접속", per_call, args.iterations, args.threads)
+    pooled_wall = run("커넥션 풀", pooled, args.iterations, args.threads)
+    pool.close()
+
+    print(f"풀 통계: {pool.stats()}")
+    print(f"속도 향상: {per_call_wall / pooled_wall:.1f}배")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+응답 경로 종단 간(end-to-end) 벤치마크
+
+로컬 가짜 Gemini 서버(fake_gemini_server.py)를 띄우고 GEMINI_BASE_URL로 연결한 GeminiApp(offscreen Qt)에
+실제 사용자처럼 질문을 하나씩 보내며, 시나리오(지연, 긴 스트림, 503, 429)별로 다음을 측정합니다.
+API 키와 네트워크는 필요 없고, 요청은 실제 google.genai 클라이언트(HTTP, SSE 파싱 포함)를 거칩니다.
+
+- TTFT: 질문 제출부터 첫 청크가 GUI 스레드에 도착할 때까지 (DB 검색 단계 포함)
+- 렌더링: 질문 제출부터 첫 청크가 lblAnswer에 실제로 그려질 때까지
+- 전체: 질문 제출부터 답변(또는 오류) 처리가 끝날 때까지
+- GUI 멈춤: GUI 스레드 하트비트 타이머가 제때 돌지 못한 시간 (간격이 --stall-ms를 넘은 만큼의 합, 최대 간격)
+
+DB는 닿지 않는 주소(검색 즉시 실패 → Gemini 호출), 의미 캐시/컨텍스트 캐시/음성 출력은 끈 상태로 측정합니다.
+질문은 매번 달라 답변 캐시에 걸리지 않습니다.
+
+사용 예:
+    python benchmarks/bench_e2e.py                                  # 모든 시나리오, 시나리오마다 10턴
+    python benchmarks/bench_e2e.py --scenario long-stream --turns 20 --engine asyncio
+    python benchmarks/bench_e2e.py --json baseline.json             # 결과 저장
+    python benchmarks/bench_e2e.py --compare baseline.json          # 기준보다 느려졌으면 종료 코드 1
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt6 import QtCore, QtWidgets  # noqa: E402
+
+from fake_gemini_server import SCENARIOS, FakeGeminiServer  # noqa: E402
+
+# 비교(--compare)에 쓰는 지표
+COMPARED_METRICS = ("ttft_p50", "ttft_p95", "render_p95", "total_p50", "total_p95", "stall_ms")
+
+
+# =================================================================
+# 1. 측정
+# =================================================================
+
+class Turn:
+    """질문 하나의 측정 시각(time.perf_counter, 초)입니다."""
+
+    def __init__(self, scenario, question):
+        self.scenario = scenario
+        self.question = question
+        self.submitted_at = None
+        self.first_chunk_at = None
+        self.rendered_at = None
+        self.done_at = None
+        self.ok = False
+        self.stall_ms = 0.0
+        self.max_gap_ms = 0.0
+
+    def elapsed_ms(self, at):
+        return None if at is None else (at - self.submitted_at) * 1000
+
+
+class E2EBenchmark:
+    """
+    GeminiApp에 질문을 차례로 보내고 각 단계의 시각을 기록합니다.
+    앱 코드는 바꾸지 않고, 창의 메서드(handle_chunk, complete_request)를 감싸고
+    lblAnswer에 이벤트 필터를 달아 관찰합니다.
+    """
+
+    def __init__(self, window, server, plan, gap_ms, turn_timeout, heartbeat_ms, stall_ms):
+        self.window = window
+        self.server = server
+        self.plan = plan                # [(시나리오 이름 또는 None(버리는 예열 턴), 질문)]
+        self.gap_ms = gap_ms
+        self.turn_timeout = turn_timeout
+        self.heartbeat_ms = heartbeat_ms
+        self.stall_threshold = stall_ms
+        self.turns = []
+        self.current = None
+        self.render_pending = False
+        self.last_beat = None
+
+        handle_chunk = window.handle_chunk
+        complete_request = window.complete_request
+
+        def chunk_probe(request_id, text):
+            turn = self.current
+            first = turn is not None and turn.first_chunk_at is None
+            if first:
+                turn.first_chunk_at = time.perf_counter()
+            handle_chunk(request_id, text)
+            if first:
+                # 첫 청크가 문서에 들어갔습니다. 다음 viewport 그리기가 사용자가 보는 첫 글자입니다.
+                self.render_pending = True
+                window.lblAnswer.viewport().update()
+
+        def complete_probe(request):
+            complete_request(request)
+            self.finish_turn(request.answer is not None)
+
+        window.handle_chunk = chunk_probe
+        window.complete_request = complete_probe
+
+        self.paint_filter = PaintFilter(self)
+        window.lblAnswer.viewport().installEventFilter(self.paint_filter)
+
+        # 🌟 GUI 스레드 하트비트: 이벤트 루프가 막히면 타이머가 늦게 돌고, 늦은 만큼을 멈춤 시간으로 셉니다.
+        self.heartbeat = QtCore.QTimer()
+        self.heartbeat.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self.heartbeat.setInterval(heartbeat_ms)
+        self.heartbeat.timeout.connect(self.beat)
+
+    def start(self):
+        self.heartbeat.start()
+        self.last_beat = time.perf_counter()
+        self.next_turn()
+
+    def beat(self):
+        now = time.perf_counter()
+        gap_ms = (now - self.last_beat) * 1000
+        self.last_beat = now
+        turn = self.current
+        if turn is None:
+            return
+        turn.max_gap_ms = max(turn.max_gap_ms, gap_ms)
+        if gap_ms > self.stall_threshold:
+            turn.stall_ms += gap_ms - self.heartbeat_ms
+
+    def painted(self):
+        if self.render_pending and self.current is not None:
+            self.render_pending = False
+            self.current.rendered_at = time.perf_counter()
+
+    def next_turn(self):
+        if not self.plan:
+            self.heartbeat.stop()
+            QtWidgets.QApplication.instance().quit()
+            return
+        scenario, question = self.plan.pop(0)
+        self.server.scenario = SCENARIOS[scenario or "fast"]
+        turn = Turn(scenario, question)
+        self.current = turn
+        self.render_pending = False
+        self.window.lineEditMyQuestion.setText(question)
+        turn.submitted_at = time.perf_counter()
+        self.window.btnSend.click()
+        QtCore.QTimer.singleShot(int(self.turn_timeout * 1000), lambda: self.handle_timeout(turn))
+
+    def handle_timeout(self, turn):
+        if turn is self.current:
+            # 취소하면 complete_request를 거쳐 실패한 턴으로 끝납니다.
+            self.window.cancel_requests("벤치마크 제한 시간 초과")
+            if turn is self.current:
+                self.finish_turn(False)
+
+    def finish_turn(self, ok):
+        turn = self.current
+        if turn is None:
+            return
+        turn.done_at = time.perf_counter()
+        turn.ok = ok
+        self.current = None
+        if turn.scenario is not None:
+            self.turns.append(turn)
+        QtCore.QTimer.singleShot(self.gap_ms, self.next_turn)
+
+
+class PaintFilter(QtCore.QObject):
+    """lblAnswer viewport의 Paint 이벤트를 벤치마크에 알립니다. (이벤트는 그대로 통과)"""
+
+    def __init__(self, benchmark):
+        super().__init__()
+        self.benchmark = benchmark
+
+    def eventFilter(self, obj, event):
+        if event.type() == QtCore.QEvent.Type.Paint:
+            self.benchmark.painted()
+        return False
+
+
+# =================================================================
+# 2. 집계 / 비교
+# =================================================================
+
+def percentile(values, q):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))], 1) if values else None
+
+
+def summarize(turns):
+    """시나리오별 지표를 계산합니다. 지연 지표는 성공한 턴만 사용합니다."""
+    results = {}
+    for name in dict.fromkeys(turn.scenario for turn in turns):
+        group = [turn for turn in turns if turn.scenario == name]
+        ok = [turn for turn in group if turn.ok]
+        ttft = [turn.elapsed_ms(turn.first_chunk_at) for turn in ok if turn.first_chunk_at is not None]
+        render = [turn.elapsed_ms(turn.rendered_at) for turn in ok if turn.rendered_at is not None]
+        total = [turn.elapsed_ms(turn.done_at) for turn in ok]
+        results[name] = {
+            "turns": len(group),
+            "failed": len(group) - len(ok),
+            "ttft_p50": percentile(ttft, 0.5),
+            "ttft_p95": percentile(ttft, 0.95),
+            "render_p50": percentile(render, 0.5),
+            "render_p95": percentile(render, 0.95),
+            "total_p50": percentile(total, 0.5),
+            "total_p95": percentile(total, 0.95),
+            "stall_ms": round(sum(turn.stall_ms for turn in group), 1),
+            "max_gap_ms": round(max((turn.max_gap_ms for turn in group), default=0.0), 1),
+        }
+    return results
+
+
+def print_table(results):
+    def cell(value):
+        return "-" if value is None else f"{value:.0f}"
+
+    print(f"{'시나리오':<18}{'턴':>4}{'실패':>5}{'TTFT p50/p95':>16}{'렌더링 p50/p95':>16}"
+          f"{'전체 p50/p95':>16}{'GUI 멈춤':>10}{'최대 간격':>10}")
+    for name, r in results.items():
+        print(f"{name:<18}{r['turns']:>4}{r['failed']:>5}"
+              f"{cell(r['ttft_p50']) + '/' + cell(r['ttft_p95']):>16}"
+              f"{cell(r['render_p50']) + '/' + cell(r['render_p95']):>16}"
+              f"{cell(r['total_p50']) + '/' + cell(r['total_p95']):>16}"
+              f"{cell(r['stall_ms']) + 'ms':>10}{cell(r['max_gap_ms']) + 'ms':>10}")
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    """기준 결과보다 (비율 tolerance와 절대값 slack_ms를 모두) 넘게 느려진 지표 목록을 반환합니다."""
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = base.get(metric), r.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > slack_ms:
+                regressions.append(f"{name} {metric}: {old:.0f}ms → {new:.0f}ms")
+        if r["failed"] > base.get("failed", 0):
+            regressions.append(f"{name} failed: {base.get('failed', 0)} → {r['failed']}")
+    return regressions
+
+
+# =================================================================
+# 3. 실행
+# =================================================================
+
+def configure_environment(args, base_url):
+    """Mygemini5.py를 가져오기 전에 환경 변수를 정합니다. (모듈을 가져올 때 설정을 읽으므로)"""
+    work_dir = tempfile.mkdtemp(prefix="mygemini_e2e_")
+    env = {
+        "GEMINI_API_KEY": "fake",
+        "GEMINI_BASE_URL": base_url,
+        "GEMINI_ENGINE": args.engine,
+        "SEMANTIC_CACHE": "0",
+        "CONTEXT_CACHE": "0",       # 가짜 서버는 cachedContents API가 없습니다.
+        "TTS_ENABLED": "0",
+        "DB_WRITE_JOURNAL": os.path.join(work_dir, "journal.jsonl"),
+        "REPLICA_PATH": os.path.join(work_dir, "chat_history.sqlite3"),
+    }
+    if not args.db:
+        env.update(MYSQL_HOST="127.0.0.1", MYSQL_PORT="1", MYSQL_USER="offline", MYSQL_PASSWORD="offline")
+    if not args.show:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    os.environ.update(env)
+    # 속도 제한/재시도는 측정을 방해하지 않을 만큼 느슨하게 (이미 설정된 값은 그대로)
+    # 앱의 단계별 측정 기록(METRICS_LOG/METRICS_PROM)과 GUI 멈춤 스택(STALL_LOG)은 따로 지정하지 않았으면 임시 폴더에 씁니다.
+    for name, value in [("GEMINI_RPM", "6000"), ("GEMINI_BURST", "50"),
+                        ("GEMINI_BACKOFF_BASE", "0.1"), ("GEMINI_BACKOFF_MAX", "1"),
+                        ("METRICS_LOG", os.path.join(work_dir, "turns.jsonl")),
+                        ("METRICS_PROM", os.path.join(work_dir, "mygemini.prom")),
+                        ("STALL_LOG", os.path.join(work_dir, "stalls.log"))]:
+        os.environ.setdefault(name, value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 Gemini 서버로 GeminiApp의 응답 경로 지연을 측정합니다.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="측정할 시나리오 (여러 번 지정 가능, 기본값: 전부)")
+    parser.add_argument("--turns", type=int, default=10, help="시나리오마다 보낼 질문 수")
+    parser.add_argument("--engine", choices=["thread", "asyncio"], default=os.environ.get("GEMINI_ENGINE", "thread"))
+    parser.add_argument("--gap-ms", type=int, default=100, help="답변이 끝난 뒤 다음 질문까지 쉬는 시간(ms)")
+    parser.add_argument("--turn-timeout", type=float, default=30.0, help="질문 하나의 최대 시간(초). 넘으면 취소하고 실패로 셈")
+    parser.add_argument("--heartbeat-ms", type=int, default=5, help="GUI 하트비트 간격(ms)")
+    parser.add_argument("--stall-ms", type=float, default=50.0, help="하트비트 간격이 이보다 길면 GUI 멈춤으로 셈(ms)")
+    parser.add_argument("--seed", type=int, default=0, help="가짜 서버의 오류/429 난수 시드")
+    parser.add_argument("--db", action="store_true", help="닿지 않는 DB 대신 .env의 MySQL을 사용")
+    parser.add_argument("--show", action="store_true", help="실제 화면에 창을 띄움 (기본값: offscreen)")
+    parser.add_argument("--verbose", action="store_true", help="앱 로그를 함께 출력")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--compare", help="비교할 기준 결과 JSON 파일 (--json으로 저장한 것)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="기준보다 이 비율 넘게 느려지면 회귀로 봄")
+    parser.add_argument("--slack-ms", type=float, default=20.0, help="이 시간(ms) 이하의 차이는 회귀로 보지 않음")
+    args = parser.parse_args()
+
+    scenarios = args.scenario or list(SCENARIOS)
+    server = FakeGeminiServer(seed=args.seed).start()
+    configure_environment(args, server.url)
+    os.chdir(ROOT)     # Mygemini.ui, ui_cache 경로 기준
+
+    app = QtWidgets.QApplication(sys.argv[:1])
+    log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with log:
+        import Mygemini5
+
+        window = Mygemini5.GeminiApp()
+        # 첫 질문 한 번은 커넥션/모듈 준비용으로 버립니다.
+        plan = [(None, "예열 질문")]
+        plan += [(name, f"[{name}] 벤치마크 질문 {i + 1}") for name in scenarios for i in range(args.turns)]
+        benchmark = E2EBenchmark(window, server, plan, args.gap_ms, args.turn_timeout, args.heartbeat_ms, args.stall_ms)
+
+        # 준비 작업(클라이언트 생성 등)이 끝난 뒤 측정을 시작합니다.
+        handle_warmup_done = window.handle_warmup_done
+
+        def warmup_probe(semantic_cache, timings):
+            handle_warmup_done(semantic_cache, timings)
+            QtCore.QTimer.singleShot(0, benchmark.start)
+
+        window.handle_warmup_done = warmup_probe
+        app.exec()
+    server.close()
+
+    results = summarize(benchmark.turns)
+    print(f"엔진: {args.engine}, 시나리오마다 {args.turns}턴, 단위 ms (질문 제출 시각 기준)")
+    print_table(results)
+    print(f"📊 가짜 서버 통계: {server.stats()}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"engine": args.engine, "turns": args.turns, "scenarios": results}, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과: {args.json}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.slack_ms)
+        if regressions:
+            print("❌ 기준보다 느려진 지표:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("✅ 기준 대비 회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+시작 시간 벤치마크
+
+Mygemini5.py를 새 프로세스로 여러 번 실행해 다음 두 시간을 측정합니다. (프로세스 시작 시각 기준)
+- 창 표시까지: 창을 띄우고 이벤트 루프가 돌기 시작할 때까지
+- 답변 준비 완료까지: 백그라운드 준비 작업(Gemini 클라이언트, DB 커넥션, 의미 캐시)이 끝날 때까지
+
+미리 변환한 UI(UI_PRECOMPILED=1)와 실행 중 .ui 해석(UI_PRECOMPILED=0)을 함께 비교합니다.
+--offline 을 주면 가짜 API 키와 닿지 않는 DB 주소를 써서 네트워크 없이 측정합니다.
+
+사용 예:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 10 --offline
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WINDOW_RE = re.compile(r"창 표시까지 (\d+)ms")
+READY_RE = re.compile(r"답변 준비 완료까지 (\d+)ms")
+
+
+def run_once(env, timeout):
+    """Mygemini5.py를 한 번 실행해 (창 표시까지 ms, 답변 준비 완료까지 ms)를 반환합니다."""
+    env = dict(env, MYGEMINI_STARTUP_T0=repr(time.time()))
+    result = subprocess.run(
+        [sys.executable, "Mygemini5.py"], cwd=ROOT, env=env, timeout=timeout,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    output = result.stdout.decode("utf-8", "replace")
+    window, ready = WINDOW_RE.search(output), READY_RE.search(output)
+    if not window or not ready:
+        raise RuntimeError(f"시간 측정 결과를 찾을 수 없습니다 (종료 코드 {result.returncode}):\n{output[-2000:]}")
+    return int(window.group(1)), int(ready.group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mygemini5.py의 창 표시/답변 준비 시간을 측정합니다.")
+    parser.add_argument("--runs", type=int, default=5, help="변형마다 측정할 실행 횟수")
+    parser.add_argument("--offline", action="store_true", help="가짜 API 키와 닿지 않는 DB로 네트워크 없이 측정")
+    parser.add_argument("--show", action="store_true", help="실제 화면에 창을 띄움 (기본값: offscreen)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="실행 한 번의 최대 시간(초)")
+    args = parser.parse_args()
+
+    env = dict(os.environ, MYGEMINI_EXIT_WHEN_READY="1", PYTHONIOENCODING="utf-8")
+    if not args.show:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    if args.offline:
+        env.update(GEMINI_API_KEY=env.get("GEMINI_API_KEY") or "offline", MYSQL_HOST="127.0.0.1", MYSQL_PORT="1",
+                   MYSQL_USER="offline", MYSQL_PASSWORD="offline",
+                   SEMANTIC_EMBEDDER="local", TTS_PLAYER="file")
+
+    print(f"실행 {args.runs}회 (변형마다, 첫 실행은 UI 변환/디스크 캐시를 위해 버림)")
+    print(f"{'변형':<22}{'창 표시 중앙값':>14}{'최소':>8}{'답변 준비 중앙값':>16}{'최소':>8}")
+    for name, precompiled in [("미리 변환한 UI", "1"), ("uic.loadUi", "0")]:
+        variant_env = dict(env, UI_PRECOMPILED=precompiled)
+        run_once(variant_env, args.timeout)
+        windows, readies = [], []
+        for _ in range(args.runs):
+            window, ready = run_once(variant_env, args.timeout)
+            windows.append(window)
+            readies.append(ready)
+        print(f"{name:<22}{statistics.median(windows):>12.0f}ms{min(windows):>6}ms"
+              f"{statistics.median(readies):>14.0f}ms{min(readies):>6}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""
+로컬 가짜 Gemini 서버
+
+Gemini REST API(generateContent, streamGenerateContent?alt=sse)와 같은 형식으로 응답하는 로컬 HTTP 서버입니다.
+GEMINI_BASE_URL을 이 서버 주소로 주면 API 키와 네트워크 없이 실제 google.genai 클라이언트(HTTP, SSE 파싱 포함)로
+응답 경로 전체를 실행하고 측정할 수 있습니다.
+
+시나리오로 재현할 수 있는 것:
+- 첫 토큰까지의 지연, 청크 수/청크 사이 간격/청크 길이 (스트리밍)
+- 일시적인 서버 오류(503)와 할당량 초과(429, Retry-After 헤더)를 정해진 확률로 (seed로 재현 가능)
+
+사용 예:
+    python benchmarks/fake_gemini_server.py --port 8765 --first-token-ms 400 --chunks 30 --rate-limit-rate 0.2
+    GEMINI_BASE_URL=http://127.0.0.1:8765 GEMINI_API_KEY=fake python Mygemini5.py
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+# generateContent / streamGenerateContent 경로 (예: /v1beta/models/gemini-2.5-flash:streamGenerateContent)
+GENERATE_PATH_RE = re.compile(r"^/[^/]+/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$")
+FILLER_TEXT = "가짜 서버가 보내는 답변입니다. 응답 경로의 지연 시간을 측정하기 위한 문장입니다. "
+
+
+# =================================================================
+# 1. 시나리오
+# =================================================================
+
+class FakeScenario:
+    """가짜 서버의 응답 방식입니다. 시간 단위는 ms, 확률은 0~1입니다."""
+
+    def __init__(self, name="default", first_token_ms=200, chunks=20, chunk_interval_ms=30, chunk_chars=40,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=0.5, jitter_ms=0):
+        self.name = name
+        self.first_token_ms = first_token_ms
+        self.chunks = chunks
+        self.chunk_interval_ms = chunk_interval_ms
+        self.chunk_chars = chunk_chars
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after      # 429 응답의 Retry-After(초)
+        self.jitter_ms = jitter_ms          # 지연마다 더하는 0~jitter_ms 임의 시간
+
+    def __repr__(self):
+        return f"FakeScenario({self.name})"
+
+
+# 벤치마크가 기본으로 돌리는 시나리오
+SCENARIOS = {
+    "fast": FakeScenario("fast", first_token_ms=80, chunks=20, chunk_interval_ms=20),
+    "slow-first-token": FakeScenario("slow-first-token", first_token_ms=1500, chunks=10, chunk_interval_ms=50),
+    "long-stream": FakeScenario("long-stream", first_token_ms=150, chunks=300, chunk_interval_ms=5, chunk_chars=80),
+    "flaky": FakeScenario("flaky", first_token_ms=100, chunks=20, chunk_interval_ms=20, error_rate=0.3),
+    "rate-limited": FakeScenario("rate-limited", first_token_ms=100, chunks=20, chunk_interval_ms=20,
+                                 rate_limit_rate=0.5, retry_after=0.3),
+}
+
+
+# =================================================================
+# 2. 서버
+# =================================================================
+
+class FakeGeminiServer:
+    """
+    별도 스레드에서 도는 가짜 Gemini 서버입니다. scenario를 바꾸면 다음 요청부터 적용됩니다.
+    url은 GEMINI_BASE_URL로 그대로 쓸 수 있습니다.
+    """
+
+    def __init__(self, scenario=None, host="127.0.0.1", port=0, seed=0):
+        self.scenario = scenario or FakeScenario()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "streams": 0, "rate_limited": 0, "errors": 0, "disconnected": 0}
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="FakeGeminiServer", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def roll(self, scenario):
+        """이번 요청을 실패시킬지 정합니다. (429, 503 또는 None)"""
+        with self._lock:
+            value = self._random.random()
+        if value < scenario.rate_limit_rate:
+            return 429
+        if value < scenario.rate_limit_rate + scenario.error_rate:
+            return 503
+        return None
+
+    def delay(self, scenario, ms):
+        with self._lock:
+            jitter = self._random.uniform(0, scenario.jitter_ms) if scenario.jitter_ms else 0.0
+        time.sleep((ms + jitter) / 1000.0)
+
+
+def chunk_texts(scenario):
+    """시나리오의 청크 수/길이에 맞춘 답변 조각들을 만듭니다."""
+    text = FILLER_TEXT * (scenario.chunks * scenario.chunk_chars // len(FILLER_TEXT) + 1)
+    return [text[i * scenario.chunk_chars:(i + 1) * scenario.chunk_chars] for i in range(scenario.chunks)]
+
+
+def response_payload(text, prompt_tokens, output_tokens, model, finished):
+    """GenerateContentResponse 형식의 JSON 객체를 만듭니다."""
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        },
+        "modelVersion": model,
+    }
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # 클라이언트가 커넥션을 재사용할 수 있도록 keep-alive
+        disable_nagle_algorithm = True  # 작은 청크가 Nagle + 지연 ACK로 수십 ms씩 늦게 도착하지 않도록
+
+        def log_message(self, format, *args):
+            pass    # 요청마다 로그를 찍지 않습니다.
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            match = GENERATE_PATH_RE.match(urlparse(self.path).path)
+            if match is None:
+                self.send_error_json(404, "NOT_FOUND", f"가짜 서버가 지원하지 않는 경로입니다: {self.path}")
+                return
+
+            server.count("requests")
+            scenario = server.scenario
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                self.send_error_json(400, "INVALID_ARGUMENT", "요청 본문이 JSON이 아닙니다.")
+                return
+            # 토큰 수는 글자 수로 어림합니다. (usageMetadata 측정용)
+            prompt_tokens = max(1, len(json.dumps(request.get("contents", []), ensure_ascii=False)) // 4)
+
+            server.delay(scenario, scenario.first_token_ms)
+            status = server.roll(scenario)
+            if status == 429:
+                server.count("rate_limited")
+                self.send_error_json(429, "RESOURCE_EXHAUSTED", "가짜 서버 할당량 초과",
+                                     {"Retry-After": f"{scenario.retry_after:g}"})
+                return
+            if status == 503:
+                server.count("errors")
+                self.send_error_json(503, "UNAVAILABLE", "가짜 서버 일시 오류")
+                return
+
+            if match.group("method") == "streamGenerateContent":
+                self.stream_response(scenario, prompt_tokens, match.group("model"))
+            else:
+                self.full_response(scenario, prompt_tokens, match.group("model"))
+
+        def full_response(self, scenario, prompt_tokens, model):
+            # 스트리밍이 아니어도 생성 시간은 같게 맞춥니다. (모든 청크가 만들어진 뒤 한 번에 응답)
+            texts = chunk_texts(scenario)
+            server.delay(scenario, scenario.chunk_interval_ms * max(0, len(texts) - 1))
+            text = "".join(texts)
+            self.send_json(200, response_payload(text, prompt_tokens, max(1, len(text) // 4), model, True))
+
+        def stream_response(self, scenario, prompt_tokens, model):
+            server.count("streams")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            texts = chunk_texts(scenario)
+            output_tokens = 0
+            try:
+                for i, text in enumerate(texts):
+                    if i:
+                        server.delay(scenario, scenario.chunk_interval_ms)
+                    output_tokens += max(1, len(text) // 4)
+                    payload = response_payload(text, prompt_tokens, output_tokens, model, i == len(texts) - 1)
+                    self.write_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\r\n\r\n".encode("utf-8"))
+                self.write_chunk(b"")
+            except (BrokenPipeError, ConnectionResetError):
+                # 클라이언트가 스트림을 닫았습니다. (취소/새 질문)
+                server.count("disconnected")
+                self.close_connection = True
+
+        def write_chunk(self, data):
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def send_json(self, status, payload, headers=None):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_error_json(self, status, error_status, message, headers=None):
+            self.send_json(status, {"error": {"code": status, "message": message, "status": error_status}}, headers)
+
+    return Handler
+
+
+# =================================================================
+# 3. 단독 실행
+# =================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini REST API 형식으로 응답하는 로컬 가짜 서버를 실행합니다.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), help="미리 정의된 시나리오 (아래 옵션보다 우선)")
+    parser.add_argument("--first-token-ms", type=float, default=200)
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--chunk-interval-ms", type=float, default=30)
+    parser.add_argument("--chunk-chars", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503으로 실패시킬 확률")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429로 거절할 확률")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="429 응답의 Retry-After(초)")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scenario = SCENARIOS.get(args.scenario) or FakeScenario(
+        "custom", args.first_token_ms, args.chunks, args.chunk_interval_ms, args.chunk_chars,
+        args.error_rate, args.rate_limit_rate, args.retry_after, args.jitter_ms
+    )
+    server = FakeGeminiServer(scenario, args.host, args.port, args.seed).start()
+    print(f"✅ 가짜 Gemini 서버 실행 중 ({scenario.name}): GEMINI_BASE_URL={server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(f"📊 가짜 서버 통계: {server.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+chat_history 스키마 마이그레이션 도구
+
+사용 예:
+    python migrate_db.py            # 적용되지 않은 마이그레이션을 모두 적용
+    python migrate_db.py --status   # 적용 현황만 출력
+
+접속 정보는 Mygemini5.py와 같이 .env의 MYSQL_* 값을 사용합니다.
+"""
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+from mygemini_db import MIGRATIONS, DBConfigError, applied_migrations, create_mysql_pool, run_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="chat_history 스키마 마이그레이션을 적용합니다.")
+    parser.add_argument("--status", action="store_true", help="적용 현황만 출력하고 종료")
+    args = parser.parse_args()
+
+    load_dotenv()
+    try:
+        pool = create_mysql_pool(max_size=1)
+    except DBConfigError as e:
+        print(f"❌ {e}")
+        return 1
+    try:
+        if args.status:
+            done = set(applied_migrations(pool))
+            for version, name, _ in MIGRATIONS:
+                mark = "적용됨" if version in done else "대기"
+                print(f"[{mark}] {version}: {name}")
+            return 0
+
+        applied = run_migrations(pool)
+        if not applied:
+            print("✅ 적용할 마이그레이션이 없습니다. 스키마가 최신 상태입니다.")
+        return 0
+    except Exception as e:
+        print(f"❌ 마이그레이션 실패: {e}")
+        return 1
+    finally:
+        pool.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
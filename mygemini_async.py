@@ -0,0 +1,94 @@
+"""
+Mygemini asyncio 엔진 모듈
+
+요청마다 OS 스레드를 쓰는 대신, 전용 스레드 하나에서 도는 asyncio 이벤트 루프에서
+Gemini 호출(client.aio), DB 조회/저장, 음성 미리 합성을 코루틴으로 처리합니다.
+
+- AsyncLoopThread: 이벤트 루프 스레드입니다. GUI 스레드는 submit()으로 코루틴을 넘기기만 하고 기다리지 않으며,
+  결과는 Qt 시그널(큐 연결)로 GUI 스레드에 돌아갑니다.
+- 제한 시간: 요청 전체(timeout)와 스트리밍 청크 사이 대기(chunk_timeout)를 따로 겁니다.
+- 취소: submit()이 반환한 Future를 cancel()하면 태스크가 취소되고, 그 태스크가 기다리던 하위 작업과
+  HTTP 스트림도 함께 정리됩니다.
+"""
+import asyncio
+import os
+import threading
+
+
+# =================================================================
+# 1. 설정
+# =================================================================
+
+def engine_config_from_env():
+    """환경 변수에서 요청 엔진 설정(thread 또는 asyncio, 제한 시간들)을 읽습니다."""
+    return {
+        "engine": os.environ.get("GEMINI_ENGINE", "thread"),
+        "timeout": float(os.environ.get("GEMINI_TIMEOUT", "120")),
+        "chunk_timeout": float(os.environ.get("GEMINI_CHUNK_TIMEOUT", "30")),
+        "db_timeout": float(os.environ.get("ASYNC_DB_TIMEOUT", "10")),
+        "tts_timeout": float(os.environ.get("TTS_FETCH_TIMEOUT", "20")),
+    }
+
+
+# =================================================================
+# 2. 이벤트 루프 스레드
+# =================================================================
+
+class AsyncLoopThread:
+    """asyncio 이벤트 루프를 전용 스레드에서 돌리고, 다른 스레드에서 코루틴을 넘겨받아 실행합니다."""
+
+    def __init__(self, name="AsyncEngine"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+
+    def submit(self, coro):
+        """코루틴을 루프에서 실행하도록 예약하고 concurrent.futures.Future를 바로 반환합니다."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def close(self, cleanup=None, timeout=5.0):
+        """
+        남은 태스크를 모두 취소하고 끝나기를 기다린 뒤, cleanup 코루틴 함수(예: DB 풀 닫기)를 실행하고 루프를 멈춥니다.
+        asyncio.to_thread로 실행 중인 블로킹 호출은 끝까지 기다리지 않습니다. (데몬 스레드)
+        """
+        if not self._thread.is_alive():
+            return
+
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if cleanup is not None:
+                await cleanup()
+
+        try:
+            self.submit(shutdown()).result(timeout)
+        except Exception as e:
+            print(f"⚠️ asyncio 엔진 정리 중 오류: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+
+
+# =================================================================
+# 3. 제한 시간
+# =================================================================
+
+async def iterate_with_timeout(stream, timeout):
+    """비동기 스트림을 순회하되, 다음 항목이 timeout초 안에 오지 않으면 asyncio.TimeoutError를 발생시킵니다."""
+    iterator = stream.__aiter__()
+    while True:
+        try:
+            item = await asyncio.wait_for(iterator.__anext__(), timeout)
+        except StopAsyncIteration:
+            return
+        yield item
@@ -0,0 +1,100 @@
+"""
+Mygemini 답변 캐시 모듈
+
+- 질문 정규화 및 해시 (같은 질문이면 띄어쓰기/끝 문장부호/대소문자가 달라도 같은 키)
+- 프로세스 내 LRU + TTL 답변 캐시 (적중/미스 카운터 포함)
+"""
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+# =================================================================
+# 1. 질문 정규화 / 해시
+# =================================================================
+
+# 질문 끝에서만 떼어 내는 문장부호 (전각 포함)
+TRAILING_PUNCTUATION = "?.!？。！"
+# 정규화 규칙이 바뀌면 올립니다. (저장된 question_hash를 다시 계산해야 함: 마이그레이션 4, 로컬 복제본)
+QUESTION_HASH_VERSION = 2
+
+
+def normalize_question(text):
+    """
+    유니코드 NFC 정규화 후 대소문자, 공백 차이와 질문 끝의 문장부호(?.!)만 없앤 문자열을 반환합니다.
+
+    연산자/기호는 질문의 뜻을 바꾸므로 그대로 둡니다. 모두 공백으로 바꾸면
+    "1+1은?"과 "1-1은?", "C++란?"과 "C#란?"이 같은 키가 되어 다른 질문의 답변이 나옵니다.
+    """
+    text = " ".join(unicodedata.normalize("NFC", text).casefold().split())
+    return text.rstrip(TRAILING_PUNCTUATION).rstrip()
+
+
+def question_hash(text):
+    """정규화한 질문의 SHA-256 해시(16진수 64자)를 반환합니다. chat_history.question_hash와 같은 값입니다."""
+    return hashlib.sha256(normalize_question(text).encode("utf-8")).hexdigest()
+
+
+# =================================================================
+# 2. LRU + TTL 답변 캐시
+# =================================================================
+
+class AnswerCache:
+    """
+    question_hash → 답변을 보관하는 스레드 안전 LRU 캐시입니다.
+
+    - max_size: 보관할 최대 항목 수 (넘으면 가장 오래 쓰지 않은 항목부터 제거)
+    - ttl: 항목 유효 시간(초). 0 이하면 만료되지 않습니다.
+    """
+
+    def __init__(self, max_size=256, ttl=3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """캐시된 답변을 반환합니다. 없거나 만료되었으면 None을 반환합니다."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                answer, expires_at = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return answer
+                del self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, answer):
+        """답변을 캐시에 넣습니다."""
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._items[key] = (answer, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        """적중/미스 횟수와 적중률을 딕셔너리로 반환합니다."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,426 @@
+"""
+Mygemini 대화 맥락 관리 모듈
+
+매 요청마다 전체 대화 기록을 보내지 않도록 토큰 예산 안에서 보낼 맥락을 만듭니다.
+
+- 슬라이딩 윈도우: 예산을 넘으면 가장 오래된 대화(질문+답변 한 쌍)부터 뺍니다.
+  한 번에 예산의 evict_ratio만큼 넉넉히 빼서, 요약(과 컨텍스트 캐시)이 매 턴 바뀌지 않게 합니다.
+- 앞부분 고정: 처음 N개의 대화는 빼지 않습니다.
+- 요약: 뺀 대화는 백그라운드 스레드에서 누적 요약해 맥락 앞부분에 넣습니다. (응답 경로를 막지 않음)
+- 대화마다 토큰 수를 추가할 때 한 번만 계산해 두므로, 예산 확인 시 전체 기록을 다시 세지 않습니다.
+- 컨텍스트 캐시: 시스템 지시문과 바뀌지 않는 앞부분(고정 대화 + 요약)을 Gemini 캐시에 올려 두고
+  이후에는 캐시 이름으로 참조합니다.
+"""
+import math
+import threading
+import time
+
+
+SUMMARY_PREFIX = "[이전 대화 요약]"
+SUMMARY_ACK = "네, 이전 대화 내용을 참고해서 이어서 답변하겠습니다."
+
+
+def estimate_tokens(text):
+    """토큰 수를 빠르게 어림합니다. (UTF-8 4바이트 ≈ 1토큰, 한글 한 글자 ≈ 0.75토큰)"""
+    return max(1, math.ceil(len(text.encode("utf-8")) / 4))
+
+
+def _content(role, text):
+    return {"role": role, "parts": [{"text": text}]}
+
+
+class ConversationContext:
+    """
+    토큰 예산을 지키는 대화 맥락입니다.
+
+    - token_budget: 요청 한 번에 보낼 맥락의 최대 토큰 수 (요약과 고정 대화 포함)
+    - pin_first: 예산과 관계없이 항상 유지할 처음 대화 수
+    - summarize: summarize(이전 요약, [(질문, 답변), ...]) -> 새 요약. None이면 요약 없이 버립니다.
+    - count_tokens: 텍스트의 토큰 수를 세는 함수 (기본값은 어림 계산)
+    - evict_ratio: 예산을 넘으면 예산의 (1 - evict_ratio)까지 줄어들 때까지 뺍니다. (0이면 넘는 만큼만)
+    """
+
+    def __init__(self, token_budget=8000, pin_first=0, summarize=None, count_tokens=estimate_tokens, evict_ratio=0.25):
+        self.token_budget = token_budget
+        self.pin_first = pin_first
+        self.evict_ratio = evict_ratio
+        self.summarize = summarize
+        self.count_tokens = count_tokens
+
+        # 대화 한 쌍: {"user": 질문, "model": 답변 또는 None(응답 대기), "tokens": 토큰 수}
+        self._turns = []
+        self._window_tokens = 0     # 고정되지 않은 대화들의 토큰 합계 (증분 관리)
+        self._pinned_tokens = 0     # 고정된 대화들의 토큰 합계
+
+        self.summary = ""
+        self.summary_tokens = 0
+        self._evicted = []          # 아직 요약에 반영하지 않은 (질문, 답변)
+        self._summarizing = False
+        self._lock = threading.Lock()
+
+        self.evicted_turns = 0
+
+    # ---------------------------------------------------------------
+    # 대화 추가 / 제거
+    # ---------------------------------------------------------------
+    def add_user(self, text):
+        """사용자 질문을 추가합니다. 답변은 add_model로 채웁니다."""
+        with self._lock:
+            self._turns.append({"user": text, "model": None, "tokens": self.count_tokens(text)})
+            self._account(self._turns[-1]["tokens"], len(self._turns) - 1)
+        self._enforce_budget()
+
+    def add_model(self, text):
+        """마지막 질문에 대한 답변을 추가합니다."""
+        with self._lock:
+            if not self._turns or self._turns[-1]["model"] is not None:
+                raise ValueError("답변을 붙일 질문이 없습니다.")
+            tokens = self.count_tokens(text)
+            self._turns[-1]["model"] = text
+            self._turns[-1]["tokens"] += tokens
+            self._account(tokens, len(self._turns) - 1)
+        self._enforce_budget()
+
+    def add_exchange(self, question, answer):
+        """질문과 답변을 한 번에 추가합니다. (캐시에서 찾은 답변 등)"""
+        self.add_user(question)
+        self.add_model(answer)
+
+    def pop_user(self):
+        """답변을 받지 못한 마지막 질문을 제거합니다. (API 오류 시)"""
+        with self._lock:
+            if self._turns and self._turns[-1]["model"] is None:
+                turn = self._turns.pop()
+                self._account(-turn["tokens"], len(self._turns))
+
+    @property
+    def _pinned_count(self):
+        # 고정 대화는 빠지지 않으므로 항상 _turns의 앞쪽 pin_first개입니다.
+        return min(self.pin_first, len(self._turns))
+
+    def _account(self, tokens, index):
+        """index번째 대화의 토큰 변화량을 고정 구역 또는 윈도우 합계에 반영합니다."""
+        if index < self.pin_first:
+            self._pinned_tokens += tokens
+        else:
+            self._window_tokens += tokens
+
+    # ---------------------------------------------------------------
+    # 예산 적용 / 요약
+    # ---------------------------------------------------------------
+    def total_tokens(self):
+        return self._pinned_tokens + self.summary_tokens + self._window_tokens
+
+    def _enforce_budget(self):
+        """
+        예산을 넘으면 고정 구역 다음의 가장 오래된 완료된 대화부터 뺍니다. 마지막 대화는 항상 남깁니다.
+        넘을 때마다 한 턴씩 빼면 요약이 매 턴 바뀌므로, 예산의 (1 - evict_ratio)까지 한꺼번에 뺍니다.
+        """
+        start_summary = False
+        with self._lock:
+            target = self.token_budget
+            if self.total_tokens() > self.token_budget:
+                target = int(self.token_budget * (1 - self.evict_ratio))
+            while self.total_tokens() > target:
+                index = self._pinned_count
+                if index >= len(self._turns) - 1:
+                    break
+                turn = self._turns.pop(index)
+                self._window_tokens -= turn["tokens"]
+                self.evicted_turns += 1
+                if self.summarize is not None:
+                    self._evicted.append((turn["user"], turn["model"] or ""))
+
+            if self._evicted and not self._summarizing:
+                self._summarizing = True
+                start_summary = True
+
+        if start_summary:
+            threading.Thread(target=self._summarize_evicted, name="ContextSummarizer", daemon=True).start()
+
+    def _summarize_evicted(self):
+        """빠진 대화를 이전 요약과 합쳐 새 요약을 만듭니다. 진행 중 새로 빠진 대화는 다음 차례에 반영합니다."""
+        while True:
+            with self._lock:
+                evicted, self._evicted = self._evicted, []
+                previous = self.summary
+                if not evicted:
+                    self._summarizing = False
+                    return
+            try:
+                summary = self.summarize(previous, evicted)
+            except Exception as e:
+                print(f"❌ 대화 요약 실패 (빠진 대화 {len(evicted)}개는 요약 없이 버립니다): {e}")
+                continue
+
+            with self._lock:
+                self.summary = summary or ""
+                self.summary_tokens = self.count_tokens(self.summary) if self.summary else 0
+            print(f"📝 대화 요약 갱신: 빠진 대화 {len(evicted)}개 반영 (요약 {self.summary_tokens}토큰)")
+            self._enforce_budget()
+
+    # ---------------------------------------------------------------
+    # API 요청용 맥락
+    # ---------------------------------------------------------------
+    def contents(self):
+        """API에 보낼 contents 목록(복사본)을 만듭니다: 고정 대화 → 요약 → 최근 대화 순서."""
+        with self._lock:
+            contents = []
+            for turn in self._turns[:self._pinned_count]:
+                contents.extend(self._turn_contents(turn))
+            if self.summary:
+                contents.append(_content("user", f"{SUMMARY_PREFIX}\n{self.summary}"))
+                contents.append(_content("model", SUMMARY_ACK))
+            for turn in self._turns[self._pinned_count:]:
+                contents.extend(self._turn_contents(turn))
+            return contents
+
+    def stable_length(self, contents):
+        """
+        contents() 결과에서 다음 요약 갱신 전까지 바뀌지 않는 앞부분(고정 대화 + 요약)의 항목 수를 반환합니다.
+        (컨텍스트 캐시는 이 부분만 올립니다. 그 뒤의 최근 대화는 대화를 뺄 때마다 앞쪽이 바뀜)
+        """
+        index = 0
+        for _ in range(self.pin_first):
+            for role in ("user", "model"):
+                if index < len(contents) and contents[index]["role"] == role:
+                    index += 1
+        if index + 1 < len(contents) and contents[index]["parts"][0]["text"].startswith(SUMMARY_PREFIX):
+            index += 2
+        return index
+
+    @staticmethod
+    def _turn_contents(turn):
+        contents = [_content("user", turn["user"])]
+        if turn["model"] is not None:
+            contents.append(_content("model", turn["model"]))
+        return contents
+
+    def stats(self):
+        with self._lock:
+            return {
+                "turns": len(self._turns),
+                "pinned": self._pinned_count,
+                "tokens": self.total_tokens(),
+                "budget": self.token_budget,
+                "evicted": self.evicted_turns,
+                "summary_tokens": self.summary_tokens,
+            }
+
+
+def summary_prompt(previous_summary, turns, max_chars=1000):
+    """요약 모델에 보낼 프롬프트를 만듭니다. 요약이 예산을 잠식하지 않도록 길이 제한을 함께 줍니다."""
+    lines = ["다음은 사용자와 AI 비서의 이전 대화입니다. 이후 대화에 필요한 사실, 사용자 선호, 결정 사항을",
+             f"빠짐없이 담아 한국어로 {max_chars}자 이내로 간결하게 요약해 주세요."]
+    if previous_summary:
+        lines += ["", "[기존 요약]", previous_summary]
+    lines += ["", "[새로 추가할 대화]"]
+    for question, answer in turns:
+        lines += [f"사용자: {question}", f"AI: {answer}"]
+    return "\n".join(lines)
+
+
+# =================================================================
+# 명시적 컨텍스트 캐시 (client.caches)
+# =================================================================
+
+class ContextCacheManager:
+    """
+    시스템 지시문과 앞부분 대화(변하지 않는 접두부)를 Gemini 컨텍스트 캐시에 한 번 올려 두고,
+    이후 요청에서는 캐시 이름(cached_content)과 새로 추가된 대화만 보내도록 합니다.
+
+    - min_tokens: 접두부가 이보다 작으면 캐시를 만들지 않습니다. (모델별 최소 캐시 크기)
+    - ttl: 캐시 유효 시간(초). 만료가 refresh_margin초 안으로 다가오면 사용할 때 연장합니다.
+    - rebuild_tokens: 캐시 뒤에 붙여 보내는 대화가 이만큼 커지면 접두부를 다시 올립니다. (stable_prefix가 없을 때)
+    - stable_prefix(contents) -> 항목 수: 캐시할 앞부분의 길이 (예: ConversationContext.stable_length).
+      주면 그 앞부분만 올리고, 앞부분이 그대로인 동안(요약이 바뀌기 전까지) 캐시를 계속 씁니다.
+      없으면 마지막(새 질문)을 뺀 대화 전체를 올립니다. (대화를 빼기 시작하면 매 턴 다시 만들게 됨)
+    - client에는 caches.create / caches.update / caches.delete 만 있으면 되므로 가짜 클라이언트로 시험할 수 있습니다.
+    """
+
+    def __init__(self, client, model, system_instruction, ttl=3600, min_tokens=1024, rebuild_tokens=2048,
+                 refresh_margin=60, retry_delay=60, count_tokens=estimate_tokens, stable_prefix=None):
+        self.client = client
+        self.model = model
+        self.system_instruction = system_instruction
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.rebuild_tokens = rebuild_tokens
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        self.count_tokens = count_tokens
+        self.stable_prefix = stable_prefix
+        self._lock = threading.Lock()
+
+        self._name = None           # 현재 캐시 이름 (client.caches의 name)
+        self._prefix = []           # 캐시에 올린 contents
+        self._expires_at = 0.0      # time.monotonic() 기준 만료 시각
+        self._retry_at = 0.0        # 생성 실패 후 다시 시도할 시각
+        self._creating = False      # 다른 요청이 캐시를 만드는 중 (잠금 밖에서)
+
+        self.created = 0
+        self.reused = 0
+        self.refreshed = 0
+        self.fallbacks = 0
+
+    def prepare(self, contents):
+        """
+        보낼 contents를 캐시 기준으로 나눕니다. (보낼 contents, cached_content 이름 또는 None)을 반환합니다.
+        이름이 None이면 캐시 없이 contents 전체와 system_instruction을 그대로 보내야 합니다.
+
+        잠금 안에서는 상태를 보고 할 일만 정하고, caches.create/update/delete(네트워크 호출)는 잠금 밖에서 한 뒤
+        결과만 잠금 안에서 반영합니다. (동시에 들어온 다른 요청이 느린 캐시 생성을 기다리지 않도록)
+        """
+        prefix = contents[:self._prefix_length(contents)]
+        stale = None
+        with self._lock:
+            name = self._name
+            if name is not None:
+                cached = len(self._prefix)
+                if self._reusable(prefix, contents):
+                    if time.monotonic() < self._expires_at - self.refresh_margin:
+                        self.reused += 1
+                        return contents[cached:], name
+                    action = "refresh"
+                else:
+                    # 접두부가 바뀌었거나(요약/제거) 캐시 뒤 대화가 커졌으면 새로 올립니다.
+                    stale = self._detach()
+                    name = None
+            if name is None:
+                if time.monotonic() < self._retry_at or self._creating:
+                    # 생성 실패 직후이거나 다른 요청이 캐시를 만드는 중이면 이번 요청은 캐시 없이 보냅니다.
+                    self.fallbacks += 1
+                    action = None
+                elif not prefix or self.count_tokens(self.system_instruction) + self._contents_tokens(prefix) < self.min_tokens:
+                    action = None
+                else:
+                    self._creating = True
+                    action = "create"
+
+        if stale is not None:
+            self._delete(stale)
+
+        if action == "refresh":
+            refreshed = self._refresh(name)
+            with self._lock:
+                if self._name == name:
+                    if refreshed:
+                        self._expires_at = time.monotonic() + self.ttl
+                        self.refreshed += 1
+                        self.reused += 1
+                        return contents[len(self._prefix):], name
+                    stale = self._detach()
+            # 연장에 실패했으면 그 캐시를 지우고 새로 만듭니다.
+            if stale is not None:
+                self._delete(stale)
+            return self.prepare(contents)
+
+        if action != "create":
+            return contents, None
+
+        cache = self._create(prefix)
+        with self._lock:
+            self._creating = False
+            if cache is None:
+                self._retry_at = time.monotonic() + self.retry_delay
+                self.fallbacks += 1
+                return contents, None
+            stale = self._detach()
+            self._name = cache.name
+            self._prefix = list(prefix)
+            self._expires_at = time.monotonic() + self.ttl
+            self.created += 1
+        if stale is not None:
+            self._delete(stale)
+        return contents[len(prefix):], cache.name
+
+    def invalidate(self, name=None):
+        """
+        서버에서 캐시를 찾지 못하는 등 캐시 사용 요청이 실패했을 때 그 캐시(name)를 버립니다.
+        그 사이 다른 요청이 캐시를 새로 만들었으면 새 캐시는 그대로 둡니다. name이 None이면 현재 캐시를 버립니다.
+        """
+        with self._lock:
+            if name is not None and self._name != name:
+                return
+            stale = self._detach()
+        if stale is not None:
+            self._delete(stale)
+
+    def close(self):
+        """프로그램 종료 시 남은 캐시를 삭제합니다. (만료 전까지 보관 비용이 들지 않도록)"""
+        self.invalidate()
+
+    def _prefix_length(self, contents):
+        # 마지막(새 질문)은 캐시하지 않습니다.
+        if self.stable_prefix is None:
+            return len(contents) - 1
+        return min(self.stable_prefix(contents), len(contents) - 1)
+
+    def _reusable(self, prefix, contents):
+        """현재 캐시(self._prefix)를 이번 요청에 쓸 수 있는지 확인합니다. (self._lock을 잡은 채로 호출)"""
+        if self.stable_prefix is not None:
+            return prefix == self._prefix
+        cached = len(self._prefix)
+        return cached <= len(prefix) and prefix[:cached] == self._prefix \
+            and self._contents_tokens(contents[cached:]) < self.rebuild_tokens
+
+    def _contents_tokens(self, contents):
+        return sum(self.count_tokens(part.get("text", "")) for content in contents for part in content["parts"])
+
+    def _detach(self):
+        """현재 캐시를 상태에서 떼어 내고 그 이름을 반환합니다. (self._lock을 잡은 채로 호출, 삭제는 잠금 밖에서)"""
+        name, self._name, self._prefix = self._name, None, []
+        return name
+
+    def _create(self, prefix):
+        """캐시를 만들고 반환합니다. 실패하면 None (잠금 밖에서 호출)"""
+        from google.genai import types
+
+        try:
+            cache = self.client.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    display_name="mygemini-context",
+                    system_instruction=self.system_instruction,
+                    contents=prefix,
+                    ttl=f"{int(self.ttl)}s"
+                )
+            )
+        except Exception as e:
+            print(f"⚠️ 컨텍스트 캐시 생성 실패 ({self.retry_delay}초 동안 캐시 없이 요청합니다): {e}")
+            return None
+        print(f"✅ 컨텍스트 캐시 생성: {cache.name} (대화 {len(prefix)}개)")
+        return cache
+
+    def _refresh(self, name):
+        """캐시 TTL을 연장합니다. 실패하면 False (잠금 밖에서 호출)"""
+        from google.genai import types
+
+        try:
+            self.client.caches.update(
+                name=name,
+                config=types.UpdateCachedContentConfig(ttl=f"{int(self.ttl)}s")
+            )
+        except Exception as e:
+            print(f"⚠️ 컨텍스트 캐시 연장 실패 (새로 만듭니다): {e}")
+            return False
+        return True
+
+    def _delete(self, name):
+        """캐시를 삭제합니다. (잠금 밖에서 호출)"""
+        try:
+            self.client.caches.delete(name=name)
+        except Exception as e:
+            # 이미 만료되었을 수 있으므로 실패해도 무시합니다.
+            print(f"⚠️ 컨텍스트 캐시 삭제 실패: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self._name is not None,
+                "cached_turns": len(self._prefix),
+                "created": self.created,
+                "reused": self.reused,
+                "refreshed": self.refreshed,
+                "fallbacks": self.fallbacks,
+            }
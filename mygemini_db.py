@@ -0,0 +1,845 @@
+"""
+Mygemini 데이터베이스 공용 모듈
+
+모든 DB 작업(save_to_mysql, search_history 등)이 함께 쓰는 커넥션 풀과
+접속 설정을 제공합니다. PyQt에 의존하지 않으므로 벤치마크나 다른 스크립트에서도
+그대로 가져다 쓸 수 있습니다.
+"""
+import asyncio
+import importlib.util
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+
+from mygemini_cache import QUESTION_HASH_VERSION, question_hash
+
+
+# =================================================================
+# 1. 접속 설정
+# =================================================================
+
+# 기본값 없이 반드시 .env(또는 환경 변수)로 정해야 하는 접속 정보
+REQUIRED_DB_ENV = ("MYSQL_HOST", "MYSQL_USER", "MYSQL_PASSWORD")
+
+
+class DBConfigError(RuntimeError):
+    """필수 MySQL 접속 정보가 설정되지 않았을 때 발생합니다."""
+
+
+def db_config_from_env():
+    """환경 변수(.env)에서 MySQL 접속 정보를 읽어 pymysql.connect 인자 형태로 반환합니다.
+
+    MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD가 없으면 DBConfigError가 발생합니다.
+    (어느 DB에 접속하는지 모르는 채로 실제 서버에 연결되지 않도록)
+    """
+    missing = [name for name in REQUIRED_DB_ENV if not os.environ.get(name)]
+    if missing:
+        raise DBConfigError(f"MySQL 접속 정보가 없습니다. .env 또는 환경 변수에 {', '.join(missing)}을(를) 설정해 주세요.")
+    return {
+        "host": os.environ["MYSQL_HOST"],
+        "user": os.environ["MYSQL_USER"],
+        "passwd": os.environ["MYSQL_PASSWORD"],
+        "db": os.environ.get("MYSQL_DB", "gemini_ai"),
+        "charset": os.environ.get("MYSQL_CHARSET", "utf8"),
+        "port": int(os.environ.get("MYSQL_PORT", "3307")),
+        "connect_timeout": int(os.environ.get("MYSQL_CONNECT_TIMEOUT", "10")),
+        # 응답 없는 DB 때문에 워커 스레드가 끝없이 붙잡히지 않도록 읽기/쓰기 시간도 제한합니다.
+        "read_timeout": int(os.environ.get("MYSQL_READ_TIMEOUT", "30")),
+        "write_timeout": int(os.environ.get("MYSQL_WRITE_TIMEOUT", "30")),
+    }
+
+
+def pool_config_from_env():
+    """환경 변수에서 커넥션 풀 설정(최대 크기, 대기 시간, 헬스 체크 주기)을 읽습니다."""
+    return {
+        "max_size": int(os.environ.get("MYSQL_POOL_SIZE", "4")),
+        "checkout_timeout": float(os.environ.get("MYSQL_POOL_TIMEOUT", "10")),
+        "ping_interval": float(os.environ.get("MYSQL_POOL_PING_INTERVAL", "30")),
+    }
+
+
+# =================================================================
+# 2. 스레드 안전 커넥션 풀
+# =================================================================
+
+class PoolTimeout(Exception):
+    """풀의 모든 커넥션이 사용 중이어서 제한 시간 안에 커넥션을 받지 못했을 때 발생합니다."""
+
+
+class ConnectionPool:
+    """
+    크기가 제한된 스레드 안전 커넥션 풀입니다.
+
+    - connect: 새 커넥션을 만드는 인자 없는 함수 (pymysql, sqlite3 등 무엇이든 가능)
+    - max_size: 동시에 열려 있을 수 있는 커넥션의 최대 개수
+    - checkout_timeout: 커넥션이 모두 사용 중일 때 기다리는 최대 시간(초)
+    - ping_interval: 이 시간(초) 이상 쉬고 있던 커넥션은 꺼낼 때 ping으로 상태를 확인합니다.
+      0이면 꺼낼 때마다 확인합니다.
+    """
+
+    def __init__(self, connect, max_size=4, checkout_timeout=10.0, ping_interval=30.0, ping=None):
+        if max_size < 1:
+            raise ValueError("max_size는 1 이상이어야 합니다.")
+        self._connect = connect
+        self._ping = ping or default_ping
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.ping_interval = ping_interval
+
+        # (커넥션, 마지막 반납 시각) 쌍. 최근에 반납된 커넥션부터 재사용합니다.
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.created = 0
+        self.reused = 0
+        self.reconnected = 0
+
+    def acquire(self):
+        """풀에서 커넥션을 하나 꺼냅니다. 쉬고 있던 커넥션은 필요하면 ping으로 확인합니다."""
+        if self._closed:
+            raise RuntimeError("이미 닫힌 커넥션 풀입니다.")
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise PoolTimeout(f"{self.checkout_timeout}초 안에 DB 커넥션을 얻지 못했습니다. (최대 {self.max_size}개)")
+
+        try:
+            while True:
+                try:
+                    conn, released_at = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._new_connection()
+
+                if time.monotonic() - released_at < self.ping_interval:
+                    self._count("reused")
+                    return conn
+                try:
+                    self._ping(conn)
+                    self._count("reused")
+                    return conn
+                except Exception as e:
+                    # 끊어진 커넥션은 버리고 다음 유휴 커넥션(없으면 새 커넥션)으로 재시도합니다.
+                    print(f"⚠️ DB 커넥션 상태 확인 실패, 다시 연결합니다: {e}")
+                    self._count("reconnected")
+                    _close_quietly(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        """커넥션을 풀에 돌려줍니다. 문제가 있었던 커넥션(broken=True)은 닫아서 버립니다."""
+        try:
+            if broken or self._closed:
+                _close_quietly(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """with 문으로 커넥션을 빌려 쓰고, 블록이 끝나면 자동으로 반납합니다.
+
+        블록 안에서 예외가 발생하면 rollback을 시도하고, rollback도 실패하면 커넥션을 버립니다.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            broken = False
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            self.release(conn, broken=broken)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """풀을 닫고 쉬고 있는 커넥션을 모두 닫습니다. 사용 중인 커넥션은 반납될 때 닫힙니다."""
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            _close_quietly(conn)
+
+    def stats(self):
+        """생성/재사용/재연결 횟수를 딕셔너리로 반환합니다."""
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "reconnected": self.reconnected,
+                "idle": self._idle.qsize(),
+                "max_size": self.max_size,
+            }
+
+    def _new_connection(self):
+        conn = self._connect()
+        self._count("created")
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def default_ping(conn):
+    """pymysql 커넥션은 ping(reconnect=True), 그 밖의 DB-API 커넥션은 SELECT 1로 상태를 확인합니다."""
+    if hasattr(conn, "ping"):
+        conn.ping(reconnect=True)
+    else:
+        conn.execute("SELECT 1")
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def create_mysql_pool(db_config=None, **pool_options):
+    """MySQL(pymysql) 커넥션 풀을 만듭니다. 실제 접속은 처음 커넥션을 꺼낼 때 이루어집니다."""
+    import pymysql
+
+    config = dict(db_config or db_config_from_env())
+    options = pool_config_from_env()
+    options.update(pool_options)
+
+    def connect():
+        return pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **config)
+
+    return ConnectionPool(connect, **options)
+
+
+# =================================================================
+# 3. chat_history 테이블 작업
+# =================================================================
+
+# 🚨 테이블 이름 확인: 실제 MySQL 테이블 이름으로 바꿔주세요!
+INSERT_CHAT_SQL = (
+    "INSERT INTO chat_history (question, answer, create_at, question_hash) VALUES (%s, %s, %s, %s)"
+)
+# 🌟 로컬 복제본에서 올리는 기록은 고유 ID(row_uid)와 함께 저장합니다. (다시 올려도 한 번만 저장)
+INSERT_CHAT_UID_SQL = (
+    "INSERT INTO chat_history (question, answer, create_at, question_hash, row_uid) VALUES (%s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE row_uid = row_uid"
+)
+# question_hash 컬럼이 없는(마이그레이션 2 적용 전) 테이블용
+INSERT_CHAT_LEGACY_SQL = "INSERT INTO chat_history (question, answer, create_at) VALUES (%s, %s, %s)"
+# 🌟 정규화된 질문 해시로 같은 질문의 가장 최근 답변을 찾습니다. (인덱스 조회)
+FIND_ANSWER_BY_HASH_SQL = (
+    "SELECT create_at, question, answer FROM chat_history "
+    "WHERE question_hash = %s ORDER BY create_at DESC LIMIT 1"
+)
+SEARCH_CHAT_LIKE_SQL = (
+    "SELECT create_at, question, answer FROM chat_history "
+    "WHERE question LIKE %s OR answer LIKE %s ORDER BY create_at DESC LIMIT %s"
+)
+# 🌟 FULLTEXT(ngram) 인덱스를 사용하는 관련도순 검색. 검색어 전체를 구(phrase)로 찾으므로
+#    LIKE '%검색어%'와 비슷한 결과를 인덱스로 빠르게 얻습니다.
+SEARCH_CHAT_FULLTEXT_SQL = (
+    "SELECT create_at, question, answer, "
+    "MATCH(question, answer) AGAINST (%s IN BOOLEAN MODE) AS score "
+    "FROM chat_history WHERE MATCH(question, answer) AGAINST (%s IN BOOLEAN MODE) "
+    "ORDER BY score DESC, create_at DESC LIMIT %s"
+)
+# 🌟 로컬 복제본 증분 동기화: 마지막으로 가져온 시각 이후의 기록을 오래된 순으로 (같은 초의 기록을 놓치지 않도록 >=)
+SELECT_CHAT_SINCE_SQL = (
+    "SELECT create_at, question, answer, row_uid FROM chat_history "
+    "WHERE create_at >= %s ORDER BY create_at LIMIT %s"
+)
+# row_uid 컬럼이 없는(마이그레이션 5 적용 전) 테이블용
+SELECT_CHAT_SINCE_LEGACY_SQL = (
+    "SELECT create_at, question, answer FROM chat_history "
+    "WHERE create_at >= %s ORDER BY create_at LIMIT %s"
+)
+# MySQL 오류 1191: Can't find FULLTEXT index matching the column list
+ER_FT_MATCHING_KEY_NOT_FOUND = 1191
+# MySQL 오류 1054: Unknown column (question_hash / row_uid 컬럼이 아직 없을 때)
+ER_BAD_FIELD_ERROR = 1054
+# ngram 파서의 기본 토큰 길이(ngram_token_size). 이보다 짧은 검색어는 인덱스로 찾을 수 없습니다.
+NGRAM_TOKEN_SIZE = 2
+HISTORY_SEARCH_LIMIT = int(os.environ.get("HISTORY_SEARCH_LIMIT", "10"))
+
+
+def _is_mysql_error(e, code):
+    return bool(e.args) and e.args[0] == code
+
+
+def insert_chat_rows(pool, cursor, rows):
+    """(question, answer, create_at, question_hash[, row_uid]) 행들을 executemany로 저장합니다.
+
+    row_uid(로컬 복제본 기록의 고유 ID)가 있으면 함께 저장하고, 이미 저장된 row_uid는 다시 넣지 않습니다.
+    row_uid / question_hash 컬럼이 없으면 그 값을 빼고 저장하며, 이후에는 바로 그 방식을 사용합니다.
+    """
+    if rows and len(rows[0]) > 4:
+        if getattr(pool, "row_uid_available", True):
+            try:
+                cursor.executemany(INSERT_CHAT_UID_SQL, rows)
+                return
+            except Exception as e:
+                if not _is_mysql_error(e, ER_BAD_FIELD_ERROR):
+                    raise
+                print("⚠️ chat_history에 row_uid 컬럼이 없어 고유 ID 없이 저장합니다. (migrate_db.py 실행 필요)")
+                pool.row_uid_available = False
+        rows = [row[:4] for row in rows]
+
+    if getattr(pool, "question_hash_available", True):
+        try:
+            cursor.executemany(INSERT_CHAT_SQL, rows)
+            return
+        except Exception as e:
+            if not _is_mysql_error(e, ER_BAD_FIELD_ERROR):
+                raise
+            print("⚠️ chat_history에 question_hash 컬럼이 없어 해시 없이 저장합니다. (migrate_db.py 실행 필요)")
+            pool.question_hash_available = False
+    cursor.executemany(INSERT_CHAT_LEGACY_SQL, [row[:3] for row in rows])
+
+
+def save_chat_history(pool, question, answer, created_at=None):
+    """질문과 답변 한 건을 chat_history에 저장하고, 저장한 시각 문자열을 반환합니다."""
+    created_at = created_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            insert_chat_rows(pool, cursor, [(question, answer, created_at, question_hash(question))])
+        conn.commit()
+    return created_at
+
+
+def find_answer_by_hash(pool, qhash):
+    """같은 질문(정규화 해시 일치)의 가장 최근 기록을 반환합니다. 없으면 None을 반환합니다."""
+    if not getattr(pool, "question_hash_available", True):
+        return None
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            try:
+                cursor.execute(FIND_ANSWER_BY_HASH_SQL, (qhash,))
+            except Exception as e:
+                if not _is_mysql_error(e, ER_BAD_FIELD_ERROR):
+                    raise
+                print("⚠️ chat_history에 question_hash 컬럼이 없어 정확 일치 검색을 건너뜁니다. (migrate_db.py 실행 필요)")
+                pool.question_hash_available = False
+                return None
+            return cursor.fetchone()
+
+
+def search_chat_history(pool, search_term, limit=HISTORY_SEARCH_LIMIT):
+    """검색어가 포함된 기록을 최대 limit건 반환합니다.
+
+    FULLTEXT 인덱스가 있으면 관련도순으로, 인덱스가 없거나(마이그레이션 전) 검색어가
+    너무 짧으면 기존 LIKE 검색으로 최신순 결과를 돌려줍니다.
+    """
+    phrase = search_term.replace('"', ' ').strip()
+    use_fulltext = getattr(pool, "fulltext_available", True) and len(phrase) >= NGRAM_TOKEN_SIZE
+
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            if use_fulltext:
+                try:
+                    boolean_query = f'"{phrase}"'
+                    cursor.execute(SEARCH_CHAT_FULLTEXT_SQL, (boolean_query, boolean_query, limit))
+                    return cursor.fetchall()
+                except Exception as e:
+                    if not _is_mysql_error(e, ER_FT_MATCHING_KEY_NOT_FOUND):
+                        raise
+                    # 인덱스가 없으면 이후 검색은 바로 LIKE로 처리합니다. (python migrate_db.py로 생성)
+                    print("⚠️ chat_history에 FULLTEXT 인덱스가 없어 LIKE 검색을 사용합니다. (migrate_db.py 실행 필요)")
+                    pool.fulltext_available = False
+
+            search_pattern = f"%{search_term}%"  # LIKE 검색을 위한 패턴
+            cursor.execute(SEARCH_CHAT_LIKE_SQL, (search_pattern, search_pattern, limit))
+            return cursor.fetchall()
+
+
+def fetch_chat_history_since(pool, since, limit):
+    """
+    create_at이 since(문자열) 이상인 기록을 오래된 순으로 최대 limit건 반환합니다. (로컬 복제본 동기화용)
+    row_uid 컬럼이 없으면 row_uid 없이 반환합니다.
+    """
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            if getattr(pool, "row_uid_available", True):
+                try:
+                    cursor.execute(SELECT_CHAT_SINCE_SQL, (since, limit))
+                    return cursor.fetchall()
+                except Exception as e:
+                    if not _is_mysql_error(e, ER_BAD_FIELD_ERROR):
+                        raise
+                    print("⚠️ chat_history에 row_uid 컬럼이 없어 고유 ID 없이 동기화합니다. (migrate_db.py 실행 필요)")
+                    pool.row_uid_available = False
+            cursor.execute(SELECT_CHAT_SINCE_LEGACY_SQL, (since, limit))
+            return cursor.fetchall()
+
+
+# =================================================================
+# 4. 스키마 마이그레이션 (python migrate_db.py)
+# =================================================================
+
+def _backfill_question_hash(cursor):
+    """기존 기록의 question_hash를 채웁니다. (정규화는 파이썬에서만 할 수 있으므로 SQL 대신 함수로 실행)"""
+    cursor.execute("SELECT DISTINCT question FROM chat_history WHERE question_hash IS NULL")
+    questions = [row["question"] if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
+    cursor.executemany(
+        "UPDATE chat_history SET question_hash = %s WHERE question = %s AND question_hash IS NULL",
+        [(question_hash(q), q) for q in questions]
+    )
+    print(f"   question_hash 채움: 서로 다른 질문 {len(questions)}개")
+
+
+def _rehash_questions(cursor):
+    """질문 정규화 규칙이 바뀌었을 때 모든 기록의 question_hash를 다시 계산합니다."""
+    cursor.execute("SELECT DISTINCT question FROM chat_history")
+    questions = [row["question"] if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
+    cursor.executemany(
+        "UPDATE chat_history SET question_hash = %s WHERE question = %s",
+        [(question_hash(q), q) for q in questions]
+    )
+    print(f"   question_hash 다시 계산 (정규화 v{QUESTION_HASH_VERSION}): 서로 다른 질문 {len(questions)}개")
+
+
+# (버전, 이름, 단계 목록). 단계는 순서대로 실행합니다.
+# - 문자열: 실행할 SQL
+# - 튜플: 대안 SQL 목록. 앞에서부터 시도해 처음 성공한 것을 적용합니다.
+# - 함수: cursor를 받아 직접 처리합니다.
+MIGRATIONS = [
+    (1, "chat_history 질문/답변 FULLTEXT 인덱스 (ngram 파서, 한국어 검색용)", [
+        (
+            "ALTER TABLE chat_history ADD FULLTEXT INDEX ft_chat_history_qa (question, answer) WITH PARSER ngram",
+            # ngram 파서가 없는 서버(예: MariaDB)는 공백 단위 기본 파서로 대신 생성합니다.
+            "ALTER TABLE chat_history ADD FULLTEXT INDEX ft_chat_history_qa (question, answer)",
+        ),
+    ]),
+    (2, "chat_history 정규화 질문 해시 컬럼 + 인덱스 (정확 일치 답변 캐시용)", [
+        "ALTER TABLE chat_history ADD COLUMN question_hash CHAR(64) NULL, "
+        "ADD INDEX idx_chat_history_question_hash (question_hash)",
+        _backfill_question_hash,
+    ]),
+    (3, "chat_history 작성 시각 인덱스 (로컬 복제본 증분 동기화용)", [
+        "ALTER TABLE chat_history ADD INDEX idx_chat_history_create_at (create_at)",
+    ]),
+    (4, "chat_history question_hash 다시 계산 (연산자/기호를 남기는 정규화)", [
+        _rehash_questions,
+    ]),
+    (5, "chat_history 기록 고유 ID 컬럼 (로컬 복제본 중복 제거용)", [
+        "ALTER TABLE chat_history ADD COLUMN row_uid CHAR(32) NULL, "
+        "ADD UNIQUE INDEX idx_chat_history_row_uid (row_uid)",
+    ]),
+]
+
+CREATE_MIGRATIONS_TABLE_SQL = (
+    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+    "version INT PRIMARY KEY, name VARCHAR(255) NOT NULL, applied_at DATETIME NOT NULL)"
+)
+
+
+def applied_migrations(pool):
+    """이미 적용된 마이그레이션 버전 목록을 반환합니다."""
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(CREATE_MIGRATIONS_TABLE_SQL)
+            cursor.execute("SELECT version FROM schema_migrations ORDER BY version")
+            rows = cursor.fetchall()
+        conn.commit()
+    return [row["version"] if isinstance(row, dict) else row[0] for row in rows]
+
+
+def run_migrations(pool, migrations=MIGRATIONS):
+    """아직 적용되지 않은 마이그레이션을 버전 순서대로 적용하고, 적용한 버전 목록을 반환합니다."""
+    done = set(applied_migrations(pool))
+    applied = []
+    for version, name, steps in migrations:
+        if version in done:
+            continue
+
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                for step in steps:
+                    _run_migration_step(cursor, version, name, step)
+
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)",
+                    (version, name, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                )
+            conn.commit()
+
+        print(f"✅ 마이그레이션 {version} 적용: {name}")
+        applied.append(version)
+    return applied
+
+
+def _run_migration_step(cursor, version, name, step):
+    if callable(step):
+        step(cursor)
+        return
+    if isinstance(step, str):
+        cursor.execute(step)
+        return
+
+    error = None
+    for sql in step:
+        try:
+            cursor.execute(sql)
+            return
+        except Exception as e:
+            error = e
+            print(f"⚠️ 마이그레이션 {version} SQL 실패, 다음 방법을 시도합니다: {e}")
+    raise RuntimeError(f"마이그레이션 {version} ({name}) 적용 실패: {error}")
+
+
+# =================================================================
+# 5. Write-behind 저장 큐 (배치 INSERT + 실패 시 로컬 저널)
+# =================================================================
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    질문/답변 기록을 메모리에 모았다가 백그라운드 스레드에서 executemany로 한꺼번에 저장합니다.
+
+    - batch_size개가 모이거나, 첫 기록이 들어온 뒤 flush_interval초가 지나면 저장합니다.
+    - 저장에 실패한 배치는 max_retries번까지 지수 백오프로 재시도하고,
+      그래도 실패하면 journal_path(JSON Lines 파일)에 기록해 잃어버리지 않습니다.
+    - start() 시 저널에 남아 있는 기록을 먼저 다시 저장합니다.
+      (재생 도중 프로그램이 죽으면 일부 기록이 중복 저장될 수 있습니다.)
+    - close()가 timeout 안에 끝나지 않으면(DB 응답 없음) 저장 중인 배치와 큐에 남은 기록을 저널로 넘기고 반환합니다.
+      (그 뒤에 늦게 커밋된 배치는 다음 실행 때 중복 저장될 수 있습니다.)
+    - on_spill(개수, 오류 메시지): 배치를 저널로 넘겼을 때 저장 스레드에서 호출됩니다.
+    - put(..., on_saved=함수): 그 기록이 든 배치의 처리가 끝나면 저장 스레드에서 on_saved(저장 성공 여부)를 호출합니다.
+    """
+
+    def __init__(self, pool, journal_path, batch_size=20, flush_interval=2.0,
+                 max_retries=3, retry_backoff=0.5, on_spill=None):
+        self.pool = pool
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.on_spill = on_spill
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="WriteBehindQueue", daemon=True)
+        self._lock = threading.Lock()           # 저널 쓰기 / 저장 중인 배치 넘겨받기
+        self._closing = threading.Event()       # close() 호출됨: 재시도 대기 없이 바로 저널로
+        self._abandoned = False                 # close()가 시간 초과로 남은 기록을 가져감
+        self._inflight = None                   # 저장 중인 (배치, 콜백)
+
+        self.saved = 0
+        self.spilled = 0
+        self.batches = 0
+
+    def start(self):
+        """저장 스레드를 시작합니다. 스레드는 먼저 이전 실행에서 남은 저널을 재생합니다."""
+        self._thread.start()
+        return self
+
+    def put(self, question, answer, created_at=None, on_saved=None):
+        """기록 한 건을 큐에 넣고 바로 반환합니다. (DB 지연이 호출자에게 전달되지 않음)"""
+        created_at = created_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._queue.put(((question, answer, created_at, question_hash(question)), on_saved))
+        return created_at
+
+    def close(self, timeout=10.0):
+        """남은 기록을 저장(실패 시 저널에 기록)하고 저장 스레드를 종료합니다."""
+        if not self._thread.is_alive():
+            return
+        self._closing.set()
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            return
+
+        # 🚨 DB가 응답하지 않아 시간 안에 끝나지 않았습니다. 저장 스레드는 데몬이라 프로그램과 함께 사라지므로,
+        # 저장 중인 배치와 큐에 남은 기록을 여기서 저널에 넘깁니다. (다음 실행의 start()에서 다시 저장)
+        with self._lock:
+            self._abandoned = True
+            batch, callbacks = self._inflight or ([], [])
+            batch, callbacks = list(batch), list(callbacks)
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    continue
+                row, on_saved = item
+                batch.append(row)
+                if on_saved is not None:
+                    callbacks.append(on_saved)
+            if batch:
+                self._write_journal(batch)
+        if batch:
+            print(f"💾 저장 스레드가 {timeout:.0f}초 안에 끝나지 않아 기록 {len(batch)}건을 저널에 보관했습니다: {self.journal_path}")
+        self._notify(callbacks, False)
+
+    def _run(self):
+        self._replay_journal()
+        if self._abandoned:
+            return
+
+        batch = []
+        callbacks = []
+        deadline = None
+        while True:
+            timeout = None if not batch else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # 시간 조건으로 저장
+
+            if item is _STOP:
+                if batch:
+                    self._flush_pending(batch, callbacks)
+                return
+
+            if item is not None:
+                row, on_saved = item
+                batch.append(row)
+                if on_saved is not None:
+                    callbacks.append(on_saved)
+                if len(batch) == 1:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+
+            if not self._flush_pending(batch, callbacks):
+                return
+            batch = []
+            callbacks = []
+
+    def _flush_pending(self, batch, callbacks):
+        """배치를 저장하고 콜백을 호출합니다. 그사이 close()가 배치를 넘겨받았으면 False를 반환합니다."""
+        with self._lock:
+            self._inflight = (batch, callbacks)
+        saved = self._flush(batch)
+        with self._lock:
+            self._inflight = None
+            if self._abandoned:
+                return False
+        self._notify(callbacks, saved)
+        return True
+
+    def _notify(self, callbacks, saved):
+        for on_saved in callbacks:
+            try:
+                on_saved(saved)
+            except Exception as e:
+                print(f"⚠️ 저장 완료 콜백 오류: {e}")
+
+    def _flush(self, batch):
+        """배치를 executemany 한 번으로 저장합니다. 재시도 후에도 실패하면 저널에 기록합니다."""
+        error = None
+        for attempt in range(self.max_retries):
+            try:
+                with self.pool.connection() as conn:
+                    with conn.cursor() as cursor:
+                        insert_chat_rows(self.pool, cursor, batch)
+                    conn.commit()
+                self.saved += len(batch)
+                self.batches += 1
+                print(f"✅ MySQL 배치 저장 성공: {len(batch)}건")
+                return True
+            except Exception as e:
+                error = e
+                print(f"❌ MySQL 배치 저장 실패 ({attempt + 1}/{self.max_retries}): {e}")
+                # 종료 중(close)이면 더 기다리지 않고 바로 저널에 기록합니다.
+                if attempt + 1 >= self.max_retries or self._closing.wait(self.retry_backoff * (2 ** attempt)):
+                    break
+
+        self._spill(batch, error)
+        return False
+
+    def _spill(self, batch, error):
+        with self._lock:
+            if self._abandoned:
+                return  # close()가 이미 이 배치를 저널에 기록했습니다.
+            self._write_journal(batch)
+        print(f"💾 저장하지 못한 기록 {len(batch)}건을 저널에 보관했습니다: {self.journal_path}")
+        if self.on_spill:
+            self.on_spill(len(batch), str(error))
+
+    def _write_journal(self, batch):
+        """기록을 저널 끝에 추가하고 디스크에 씁니다. (self._lock을 잡은 채로 호출)"""
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for question, answer, created_at, qhash in batch:
+                f.write(json.dumps({"question": question, "answer": answer, "create_at": created_at,
+                                    "question_hash": qhash}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.spilled += len(batch)
+
+    def _replay_journal(self):
+        """이전 실행에서 저널에 남은 기록을 다시 저장합니다. 또 실패하면 새 저널에 다시 기록됩니다."""
+        replay_path = self.journal_path + ".replay"
+        if os.path.exists(self.journal_path) and not os.path.exists(replay_path):
+            os.replace(self.journal_path, replay_path)
+        if not os.path.exists(replay_path):
+            return
+
+        rows = []
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    print(f"⚠️ 저널의 손상된 줄을 건너뜁니다: {line[:80]}")
+                    continue
+                rows.append((record["question"], record["answer"], record["create_at"],
+                             record.get("question_hash") or question_hash(record["question"])))
+
+        print(f"🔁 저널에 남은 기록 {len(rows)}건을 다시 저장합니다.")
+        for i in range(0, len(rows), self.batch_size):
+            self._flush(rows[i:i + self.batch_size])
+        if self._abandoned:
+            return  # 재생을 끝내지 못하고 종료: .replay 파일을 남겨 다음 실행에서 다시 재생합니다.
+        os.remove(replay_path)
+
+
+# =================================================================
+# 6. 비동기 접근 (asyncio 엔진)
+# =================================================================
+
+class AsyncChatStore:
+    """
+    aiomysql 커넥션 풀로 chat_history를 조회/저장합니다. (asyncio 엔진용)
+
+    - 풀은 처음 사용할 때 그 이벤트 루프에서 만듭니다. (한 루프에서만 사용)
+    - SQL과 question_hash / FULLTEXT 호환 처리는 동기 함수와 같습니다.
+    """
+
+    def __init__(self, db_config=None, max_size=4):
+        config = dict(db_config or db_config_from_env())
+        # aiomysql은 password 인자를 쓰고, 읽기/쓰기 시간 제한은 호출하는 쪽에서 asyncio.wait_for로 겁니다.
+        self._connect_args = {
+            "host": config["host"],
+            "port": config["port"],
+            "user": config["user"],
+            "password": config["passwd"],
+            "db": config["db"],
+            "charset": config["charset"],
+            "connect_timeout": config["connect_timeout"],
+        }
+        self.max_size = max_size
+        self._pool = None
+        self._pool_lock = None
+        self.question_hash_available = True
+        self.fulltext_available = True
+
+    async def _get_pool(self):
+        import aiomysql
+
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await aiomysql.create_pool(
+                        minsize=0, maxsize=self.max_size, cursorclass=aiomysql.DictCursor, **self._connect_args
+                    )
+        return self._pool
+
+    @asynccontextmanager
+    async def _cursor(self):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                yield conn, cursor
+
+    async def find_answer_by_hash(self, qhash):
+        """find_answer_by_hash()의 비동기 버전입니다."""
+        if not self.question_hash_available:
+            return None
+        async with self._cursor() as (conn, cursor):
+            try:
+                await cursor.execute(FIND_ANSWER_BY_HASH_SQL, (qhash,))
+            except Exception as e:
+                if not _is_mysql_error(e, ER_BAD_FIELD_ERROR):
+                    raise
+                print("⚠️ chat_history에 question_hash 컬럼이 없어 정확 일치 검색을 건너뜁니다. (migrate_db.py 실행 필요)")
+                self.question_hash_available = False
+                return None
+            return await cursor.fetchone()
+
+    async def search(self, search_term, limit=HISTORY_SEARCH_LIMIT):
+        """search_chat_history()의 비동기 버전입니다."""
+        phrase = search_term.replace('"', ' ').strip()
+        async with self._cursor() as (conn, cursor):
+            if self.fulltext_available and len(phrase) >= NGRAM_TOKEN_SIZE:
+                try:
+                    boolean_query = f'"{phrase}"'
+                    await cursor.execute(SEARCH_CHAT_FULLTEXT_SQL, (boolean_query, boolean_query, limit))
+                    return await cursor.fetchall()
+                except Exception as e:
+                    if not _is_mysql_error(e, ER_FT_MATCHING_KEY_NOT_FOUND):
+                        raise
+                    print("⚠️ chat_history에 FULLTEXT 인덱스가 없어 LIKE 검색을 사용합니다. (migrate_db.py 실행 필요)")
+                    self.fulltext_available = False
+
+            search_pattern = f"%{search_term}%"
+            await cursor.execute(SEARCH_CHAT_LIKE_SQL, (search_pattern, search_pattern, limit))
+            return await cursor.fetchall()
+
+    async def save(self, question, answer, created_at=None):
+        """save_chat_history()의 비동기 버전입니다. 저장한 시각 문자열을 반환합니다."""
+        created_at = created_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        row = (question, answer, created_at, question_hash(question))
+        async with self._cursor() as (conn, cursor):
+            if self.question_hash_available:
+                try:
+                    await cursor.execute(INSERT_CHAT_SQL, row)
+                    await conn.commit()
+                    return created_at
+                except Exception as e:
+                    if not _is_mysql_error(e, ER_BAD_FIELD_ERROR):
+                        raise
+                    print("⚠️ chat_history에 question_hash 컬럼이 없어 해시 없이 저장합니다. (migrate_db.py 실행 필요)")
+                    self.question_hash_available = False
+            await cursor.execute(INSERT_CHAT_LEGACY_SQL, row[:3])
+            await conn.commit()
+        return created_at
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+
+class ThreadedChatStore:
+    """aiomysql이 없을 때 쓰는 AsyncChatStore 대체품입니다. 동기 풀 함수를 asyncio.to_thread로 실행합니다."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def find_answer_by_hash(self, qhash):
+        return await asyncio.to_thread(find_answer_by_hash, self.pool, qhash)
+
+    async def search(self, search_term, limit=HISTORY_SEARCH_LIMIT):
+        return await asyncio.to_thread(search_chat_history, self.pool, search_term, limit)
+
+    async def save(self, question, answer, created_at=None):
+        return await asyncio.to_thread(save_chat_history, self.pool, question, answer, created_at)
+
+    async def close(self):
+        pass  # 동기 풀은 만든 쪽에서 닫습니다.
+
+
+def create_async_chat_store(pool, db_config=None):
+    """aiomysql이 설치되어 있으면 AsyncChatStore를, 없으면 동기 풀을 쓰는 ThreadedChatStore를 만듭니다."""
+    if importlib.util.find_spec("aiomysql") is None:
+        print("⚠️ aiomysql이 없어 비동기 DB 작업을 스레드에서 실행합니다. (pip install aiomysql)")
+        return ThreadedChatStore(pool)
+    return AsyncChatStore(db_config, max_size=pool_config_from_env()["max_size"])
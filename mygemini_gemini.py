@@ -0,0 +1,413 @@
+"""
+Mygemini Gemini 요청 모듈
+
+GUI(GeminiWorker, AsyncGeminiWorker)와 배치 모드(batch_answer.py)가 함께 쓰는 Gemini 요청 처리입니다.
+PyQt에 의존하지 않습니다.
+
+- 컨텍스트 캐시가 있으면 캐시 이름으로 앞부분 대화를 참조하고, 캐시를 찾을 수 없거나 쓸 수 없어(400/403/404) 실패하면
+  캐시 없이 한 번 더 요청합니다. 429/5xx 같은 일시적인 오류는 캐시를 그대로 두고 스케줄러의 재시도에 맡깁니다.
+- 스트리밍 모드에서는 청크마다 on_chunk(텍스트)를 호출합니다.
+- 속도 제한/재시도 스케줄러(RequestScheduler)를 거쳐 요청하며, 청크를 이미 내보냈거나 취소되었으면 재시도하지 않습니다.
+- 취소: cancel_request(cancel_event)를 호출하면 그 요청이 기다리고 있는 HTTP 연결(소켓)을 바로 끊고
+  RequestCancelled를 발생시킵니다. 첫 토큰 대기, 청크 사이 대기, 스트리밍이 아닌 요청 모두 해당합니다.
+  (cancel_event만 설정하면 다음 청크가 올 때 멈춥니다)
+- google.genai는 가져오는 데 오래 걸리므로 처음 필요할 때 가져옵니다. (LazyClient, import_genai)
+- base_url을 주면 Gemini API 대신 같은 REST 형식의 다른 서버(로컬 가짜 서버, 프록시 등)에 요청합니다.
+"""
+import asyncio
+import importlib
+import socket
+import threading
+from contextlib import contextmanager
+
+from mygemini_async import iterate_with_timeout
+from mygemini_ratelimit import RequestCancelled, error_code
+
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+SYSTEM_INSTRUCTION = "You are a helpful assistant. Please answer all questions in Korean."
+# 캐시 사용 요청이 이 코드로 실패하면 캐시 문제(만료/삭제, 권한)로 보고 캐시 없이 다시 요청합니다.
+CACHE_FALLBACK_CODES = {400, 403, 404}
+
+
+# =================================================================
+# 1. 요청 취소 (HTTP 연결 끊기)
+# =================================================================
+
+# 스레드마다 지금 실행 중인 요청의 cancel_event (cancel_scope로 설정)
+_local = threading.local()
+# cancel_event -> 그 요청이 지금 읽기/쓰기를 기다리고 있는 소켓들
+_blocked = {}
+_blocked_lock = threading.Lock()
+
+
+@contextmanager
+def cancel_scope(cancel_event):
+    """이 스레드에서 하는 HTTP 읽기/쓰기를 cancel_event에 묶습니다. (cancel_request로 바로 끊을 수 있도록)"""
+    previous = getattr(_local, "cancel_event", None)
+    _local.cancel_event = cancel_event
+    try:
+        yield
+    finally:
+        _local.cancel_event = previous
+
+
+def cancel_request(cancel_event):
+    """cancel_event를 설정하고, 그 이벤트에 묶인 요청이 응답을 기다리던 연결을 끊습니다. (어느 스레드에서든 호출 가능)"""
+    cancel_event.set()
+    with _blocked_lock:
+        sockets = list(_blocked.get(cancel_event, ()))
+    for sock in sockets:
+        try:
+            # close()는 다른 스레드의 recv()를 깨우지 못하므로 shutdown()으로 끊습니다.
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # 이미 닫힌 연결
+
+
+@contextmanager
+def _blocking_io(sock):
+    event = getattr(_local, "cancel_event", None)
+    if event is None or sock is None:
+        yield
+        return
+    with _blocked_lock:
+        _blocked.setdefault(event, set()).add(sock)
+    try:
+        # 등록한 뒤에 확인해야 cancel_request와 엇갈려도 놓치지 않습니다.
+        if event.is_set():
+            raise RequestCancelled()
+        yield
+    finally:
+        with _blocked_lock:
+            sockets = _blocked.get(event)
+            sockets.discard(sock)
+            if not sockets:
+                del _blocked[event]
+
+
+class _CancellableStream:
+    """httpcore 네트워크 스트림을 감싸 읽기/쓰기 중인 소켓을 취소 대상으로 등록합니다. (TLS 위에서도 원래 TCP 소켓을 끊음)"""
+
+    def __init__(self, stream, sock):
+        self._stream = stream
+        self._sock = sock
+
+    def read(self, max_bytes, timeout=None):
+        with _blocking_io(self._sock):
+            return self._stream.read(max_bytes, timeout)
+
+    def write(self, buffer, timeout=None):
+        with _blocking_io(self._sock):
+            self._stream.write(buffer, timeout)
+
+    def close(self):
+        self._stream.close()
+
+    def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+        return _CancellableStream(self._stream.start_tls(ssl_context, server_hostname, timeout), self._sock)
+
+    def get_extra_info(self, info):
+        return self._stream.get_extra_info(info)
+
+
+class _CancellableBackend:
+    """httpcore 네트워크 백엔드를 감싸 새 연결을 _CancellableStream으로 돌려줍니다."""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        stream = self._backend.connect_tcp(host, port, timeout, local_address, socket_options)
+        return _CancellableStream(stream, stream.get_extra_info("socket"))
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        stream = self._backend.connect_unix_socket(path, timeout, socket_options)
+        return _CancellableStream(stream, stream.get_extra_info("socket"))
+
+    def sleep(self, seconds):
+        self._backend.sleep(seconds)
+
+
+def _cancellable_transport(proxy=None):
+    """cancel_request로 끊을 수 있는 동기 httpx 전송 계층을 만듭니다. (httpx 내부 구조가 다르면 None)"""
+    import httpx
+
+    transport = httpx.HTTPTransport(proxy=proxy)
+    pool = getattr(transport, "_pool", None)
+    if pool is None or not hasattr(pool, "_network_backend"):
+        return None
+    pool._network_backend = _CancellableBackend(pool._network_backend)
+    return transport
+
+
+def _cancellable_client_args():
+    """
+    동기 httpx 클라이언트에 줄 transport/mounts를 만듭니다.
+    transport를 직접 주면 httpx가 환경 변수의 프록시(HTTPS_PROXY, HTTP_PROXY, ALL_PROXY, NO_PROXY)를 읽지 않으므로
+    httpx와 같은 규칙으로 프록시마다 끊을 수 있는 전송 계층을 만들어 mounts로 붙입니다.
+    """
+    try:
+        from httpx._utils import get_environment_proxies
+    except ImportError:
+        get_environment_proxies = None
+    transport = _cancellable_transport()
+    if transport is None or get_environment_proxies is None:
+        # httpx 내부 구조가 바뀌었으면 기본 전송 계층을 씁니다. (취소는 다음 청크에서)
+        print("⚠️ 이 httpx 버전에서는 요청을 바로 끊을 수 없어 다음 청크에서 취소합니다.")
+        return {}
+    mounts = {}
+    for pattern, url in get_environment_proxies().items():
+        # url이 None이면 NO_PROXY 대상입니다. (기본 전송 계층으로 직접 연결)
+        mounts[pattern] = None if url is None else _cancellable_transport(proxy=url)
+    return {"transport": transport, "mounts": mounts}
+
+
+# =================================================================
+# 2. 클라이언트
+# =================================================================
+
+_genai_import_lock = threading.Lock()
+
+
+def import_genai():
+    """
+    google.genai(와 errors, types)를 가져옵니다. 준비 작업과 요청 스레드가 처음에 동시에 가져오면
+    한쪽이 부분 초기화된 모듈을 보고 실패하므로(circular import 오류) 한 번에 한 스레드만 가져옵니다.
+    """
+    with _genai_import_lock:
+        for name in ("google.genai", "google.genai.errors", "google.genai.types"):
+            importlib.import_module(name)
+
+
+def create_client(api_key, base_url=None):
+    """
+    genai.Client를 만듭니다. base_url(예: http://127.0.0.1:8765)을 주면 그 서버로 요청합니다.
+    (benchmarks/fake_gemini_server.py로 API 키와 네트워크 없이 응답 경로를 측정할 때 사용)
+    동기 요청은 cancel_request로 바로 끊을 수 있는 전송 계층을 씁니다. (비동기 요청은 태스크 취소로 끊김)
+    """
+    import_genai()
+    from google import genai
+
+    http_options = {"client_args": _cancellable_client_args()}
+    if base_url:
+        http_options["base_url"] = base_url
+    return genai.Client(api_key=api_key, http_options=http_options)
+
+
+class LazyClient:
+    """
+    genai.Client를 처음 사용할 때 만드는 대리 객체입니다. client.models 등은 그대로 실제 클라이언트로 전달됩니다.
+    get()을 미리 호출해(백그라운드 준비 작업) 첫 요청의 지연을 없앨 수 있습니다.
+    """
+
+    def __init__(self, api_key, base_url=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = create_client(self.api_key, self.base_url)
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+# =================================================================
+# 3. 요청
+# =================================================================
+
+def build_gemini_request(contents, context_cache, use_cache=True, system_instruction=SYSTEM_INSTRUCTION):
+    """
+    보낼 contents와 config, 사용한 캐시 이름(없으면 None)을 만듭니다.
+    캐시가 있으면 캐시 뒤에 붙는 대화만 보내고 캐시 이름으로 참조합니다.
+    """
+    from google.genai import types
+
+    config = types.GenerateContentConfig(system_instruction=system_instruction)
+    if not use_cache or context_cache is None:
+        return contents, config, None
+    cached_contents, cache_name = context_cache.prepare(contents)
+    if cache_name is None:
+        return cached_contents, config, None
+    # 시스템 지시문은 캐시에 들어 있으므로 config에는 캐시 이름만 넣습니다.
+    return cached_contents, types.GenerateContentConfig(cached_content=cache_name), cache_name
+
+
+class GeminiRequest:
+    """
+    Gemini 요청 하나입니다. run()(스레드용) 또는 run_async()(asyncio용)로 실행해 전체 응답 텍스트를 받습니다.
+
+    - contents: 보낼 대화 기록 (마지막 항목이 이번 질문)
+    - scheduler: RequestScheduler (None이면 한 번만 요청)
+    - on_chunk(텍스트): 스트리밍 청크마다 호출 / on_retry(다음 시도 번호, 대기 시간(초), 오류): 재시도 전에 호출
+    """
+
+    def __init__(self, client, model_name, contents, stream=False, context_cache=None, scheduler=None,
+                 on_chunk=None, on_retry=None, cancel_event=None):
+        self.client = client
+        self.model_name = model_name
+        self.contents = contents
+        self.stream = stream
+        self.context_cache = context_cache
+        self.scheduler = scheduler
+        self.on_chunk = on_chunk
+        self.on_retry = on_retry
+        self.cancel_event = cancel_event
+        self.chunks_emitted = False
+        self.parts = []     # 지금까지 받은 청크
+        self.usage = None   # 마지막 응답(청크)의 usage_metadata (토큰 수)
+
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def can_retry(self, error):
+        # 이미 화면에 청크를 내보냈거나 취소됐으면 다시 시도하지 않습니다.
+        return not self.chunks_emitted and not self.cancelled()
+
+    def _emit(self, text):
+        self.parts.append(text)
+        self.chunks_emitted = True
+        if self.on_chunk is not None:
+            self.on_chunk(text)
+
+    # ---------------------------------------------------------------
+    # 스레드에서 실행
+    # ---------------------------------------------------------------
+    def run(self):
+        """요청을 실행하고 전체 응답 텍스트를 반환합니다. 취소되면 RequestCancelled를 발생시킵니다."""
+        if self.cancelled():
+            raise RequestCancelled()
+        import_genai()
+        try:
+            with cancel_scope(self.cancel_event):
+                if self.scheduler is None:
+                    text = self.generate()
+                else:
+                    text = self.scheduler.call(
+                        self.generate, can_retry=self.can_retry, on_retry=self.on_retry, cancel_event=self.cancel_event
+                    )
+        except RequestCancelled:
+            raise
+        except Exception:
+            # cancel_request가 연결을 끊어 생긴 오류(httpx 읽기 오류 등)는 취소로 처리합니다.
+            if self.cancelled():
+                raise RequestCancelled() from None
+            raise
+        if self.cancelled():
+            raise RequestCancelled()
+        return text
+
+    def generate(self, use_cache=True):
+        from google.genai.errors import APIError
+
+        contents, config, cache_name = build_gemini_request(self.contents, self.context_cache, use_cache)
+        try:
+            if self.stream:
+                return self.generate_streaming(contents, config)
+            response = self.client.models.generate_content(
+                model=self.model_name,
+                contents=contents,
+                config=config
+            )
+            self.usage = getattr(response, "usage_metadata", None)
+            return response.text
+        except APIError as e:
+            # 캐시가 만료/삭제되어 실패했으면 캐시를 버리고 전체 맥락으로 한 번 더 요청합니다.
+            if not self.cache_failed(e, cache_name):
+                raise
+            self.context_cache.invalidate(cache_name)
+            return self.generate(use_cache=False)
+
+    def cache_failed(self, error, cache_name):
+        """캐시를 쓴 요청이 캐시 문제로 실패했는지 확인합니다. (일시적인 오류는 False: 스케줄러가 재시도)"""
+        if cache_name is None or self.chunks_emitted or error_code(error) not in CACHE_FALLBACK_CODES:
+            return False
+        print(f"⚠️ 컨텍스트 캐시 사용 요청 실패, 캐시 없이 다시 요청합니다: {error}")
+        return True
+
+    def generate_streaming(self, contents, config):
+        """generate_content_stream으로 응답을 받아 청크마다 on_chunk를 호출하고, 전체 응답을 반환합니다."""
+        self.parts = []
+        stream = self.client.models.generate_content_stream(
+            model=self.model_name,
+            contents=contents,
+            config=config
+        )
+        try:
+            for chunk in stream:
+                if self.cancelled():
+                    raise RequestCancelled()
+                # 토큰 수는 청크마다 누적값으로 오므로 마지막 것을 씁니다.
+                usage = getattr(chunk, "usage_metadata", None)
+                if usage is not None:
+                    self.usage = usage
+                if chunk.text:
+                    self._emit(chunk.text)
+        finally:
+            # 취소/오류로 중간에 빠져나오면 제너레이터를 닫아 HTTP 응답 스트림(연결)을 바로 정리합니다.
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        return "".join(self.parts)
+
+    # ---------------------------------------------------------------
+    # asyncio에서 실행 (client.aio)
+    # ---------------------------------------------------------------
+    async def run_async(self, chunk_timeout=30.0):
+        """run()의 asyncio 버전입니다. 취소는 태스크 취소로 처리하고, 청크 사이 대기가 chunk_timeout을 넘으면 재시도합니다."""
+        async def generate():
+            return await self.generate_async(chunk_timeout)
+
+        if self.scheduler is None:
+            return await generate()
+        return await self.scheduler.call_async(generate, can_retry=self.can_retry, on_retry=self.on_retry)
+
+    async def generate_async(self, chunk_timeout, use_cache=True):
+        from google.genai.errors import APIError
+
+        # 컨텍스트 캐시 준비는 동기 API 호출이므로 루프를 막지 않도록 스레드에서 실행합니다.
+        contents, config, cache_name = await asyncio.to_thread(
+            build_gemini_request, self.contents, self.context_cache, use_cache
+        )
+        try:
+            if self.stream:
+                return await self.generate_streaming_async(contents, config, chunk_timeout)
+            response = await self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=contents,
+                config=config
+            )
+            self.usage = getattr(response, "usage_metadata", None)
+            return response.text
+        except APIError as e:
+            if not self.cache_failed(e, cache_name):
+                raise
+            await asyncio.to_thread(self.context_cache.invalidate, cache_name)
+            return await self.generate_async(chunk_timeout, use_cache=False)
+
+    async def generate_streaming_async(self, contents, config, chunk_timeout):
+        self.parts = []
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model_name,
+            contents=contents,
+            config=config
+        )
+        try:
+            async for chunk in iterate_with_timeout(stream, chunk_timeout):
+                usage = getattr(chunk, "usage_metadata", None)
+                if usage is not None:
+                    self.usage = usage
+                if chunk.text:
+                    self._emit(chunk.text)
+        finally:
+            # 취소/시간 초과로 중간에 빠져나오면 스트림을 닫아 HTTP 연결을 정리합니다.
+            close = getattr(stream, "aclose", None)
+            if close is not None:
+                await close()
+        return "".join(self.parts)
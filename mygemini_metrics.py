@@ -0,0 +1,394 @@
+"""
+Mygemini 단계별 지연 측정 모듈
+
+질문 하나(턴)마다 턴 ID를 붙이고, 단계(DB 검색, Gemini 첫 청크/전체, 화면 표시, DB 저장, 음성 합성/재생)별
+소요 시간을 time.monotonic으로 재서 기록합니다. Gemini 응답의 usage_metadata 토큰 수도 함께 남깁니다.
+PyQt에 의존하지 않으며, 여러 스레드(GUI, 요청 워커, 저장 큐, 발화 스케줄러)에서 함께 사용할 수 있습니다.
+
+- MetricsStore: 단계별 히스토그램(누적 버킷 + 최근 값)과 카운터를 메모리에 보관합니다.
+- TurnTrace: 턴 하나의 측정입니다. 단계가 끝날 때마다 히스토그램에 넣고 JSONL에 span 한 줄을 씁니다.
+  턴이 끝나면(finish) 요약 한 줄을 씁니다. 답변 뒤에 끝나는 단계(DB 저장, 음성)는 같은 턴 ID의 span으로 이어서 기록됩니다.
+- MetricsExporter: JSONL 기록과 Prometheus 텍스트 파일 갱신을 백그라운드 스레드에서 처리합니다.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+# =================================================================
+# 1. 설정
+# =================================================================
+
+def metrics_config_from_env():
+    """환경 변수에서 측정 기록 설정(JSONL 경로, Prometheus 파일 경로, 갱신 주기(초), 통계 패널 표시 여부)을 읽습니다."""
+    return {
+        "log_path": os.environ.get("METRICS_LOG", os.path.join("metrics", "turns.jsonl")),
+        "prometheus_path": os.environ.get("METRICS_PROM", os.path.join("metrics", "mygemini.prom")),
+        "interval": float(os.environ.get("METRICS_EXPORT_INTERVAL", "15")),
+        "panel": os.environ.get("METRICS_PANEL", "0") != "0",
+    }
+
+
+# 히스토그램 버킷 상한(초). Prometheus 기본 버킷보다 긴 쪽(LLM 응답, 음성 재생)을 넓게 잡았습니다.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# usage_metadata 필드 → 토큰 종류
+TOKEN_FIELDS = {
+    "prompt_token_count": "prompt",
+    "candidates_token_count": "output",
+    "cached_content_token_count": "cached",
+    "thoughts_token_count": "thoughts",
+    "total_token_count": "total",
+}
+
+
+def usage_tokens(usage):
+    """Gemini 응답의 usage_metadata를 {토큰 종류: 개수}로 바꿉니다. (없는 필드는 뺌)"""
+    if usage is None:
+        return {}
+    tokens = {}
+    for field, kind in TOKEN_FIELDS.items():
+        value = getattr(usage, field, None)
+        if value:
+            tokens[kind] = int(value)
+    return tokens
+
+
+# =================================================================
+# 2. 히스토그램 / 저장소
+# =================================================================
+
+class Histogram:
+    """누적 버킷(Prometheus 형식)과 최근 recent개 값(백분위 계산용)을 보관합니다. 값의 단위는 초입니다."""
+
+    def __init__(self, buckets=BUCKETS, recent=1024):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=recent)
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class MetricsStore:
+    """단계별 소요 시간 히스토그램과 카운터(턴 결과별 개수, 토큰 수)입니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}     # (이름, 라벨 값) -> 값
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(max(0.0, seconds))
+
+    def increment(self, name, label, value=1):
+        with self._lock:
+            key = (name, label)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def counter(self, name, label):
+        with self._lock:
+            return self._counters.get((name, label), 0)
+
+    def summary(self):
+        """단계별 {count, p50_ms, p95_ms, max_ms}와 카운터를 반환합니다. (최근 값 기준)"""
+        with self._lock:
+            stages = {}
+            for stage, histogram in self._histograms.items():
+                stages[stage] = {
+                    "count": histogram.count,
+                    "p50_ms": round(histogram.percentile(0.5) * 1000, 1),
+                    "p95_ms": round(histogram.percentile(0.95) * 1000, 1),
+                    "max_ms": round(max(histogram.recent) * 1000, 1),
+                }
+            counters = {f"{name}{{{label}}}": value for (name, label), value in self._counters.items()}
+        return {"stages": stages, "counters": counters}
+
+    def prometheus_text(self):
+        """Prometheus 텍스트 형식(exposition format)으로 내보냅니다."""
+        lines = [
+            "# HELP mygemini_stage_duration_seconds 턴 단계별 소요 시간",
+            "# TYPE mygemini_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'mygemini_stage_duration_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'mygemini_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'mygemini_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'mygemini_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                label_name = "outcome" if name == "turns" else "kind"
+                lines.append(f"# TYPE mygemini_{name}_total counter")
+                for (counter_name, label), value in sorted(self._counters.items()):
+                    if counter_name == name:
+                        lines.append(f'mygemini_{name}_total{{{label_name}="{label}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+# =================================================================
+# 3. 턴 측정
+# =================================================================
+
+class TurnTrace:
+    """
+    턴 하나의 단계별 측정입니다. 어느 스레드에서 호출해도 됩니다.
+
+    - begin(단계) / end(단계): 같은 턴 안에서 구간을 잽니다. (begin 없이 end하면 무시)
+    - record(단계, 초): 다른 곳에서 잰 구간을 기록합니다.
+    - finish(결과): 턴을 끝내고 요약을 기록합니다. 결과: answered, cached, error, cancelled
+    """
+
+    def __init__(self, turn_id, question, store, exporter=None, **attributes):
+        self.turn_id = turn_id
+        self.question = question    # 화면 표시/로그 출력용 (파일에는 기록하지 않음)
+        self.store = store
+        self.exporter = exporter
+        self.started_at = time.monotonic()
+        self.attributes = attributes
+        self.stages = {}        # 단계 -> ms (finish 전에 끝난 단계)
+        self.tokens = {}
+        self.outcome = None
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def begin(self, stage):
+        with self._lock:
+            self._open[stage] = time.monotonic()
+
+    def end(self, stage, **attributes):
+        with self._lock:
+            started_at = self._open.pop(stage, None)
+        if started_at is not None:
+            self._record(stage, started_at, time.monotonic() - started_at, attributes)
+
+    def record(self, stage, seconds, **attributes):
+        self._record(stage, time.monotonic() - seconds, seconds, attributes)
+
+    def set(self, **attributes):
+        with self._lock:
+            self.attributes.update(attributes)
+
+    def add_tokens(self, usage):
+        """usage_metadata의 토큰 수를 더합니다. (재요청/요약 요청이 있으면 합계)"""
+        tokens = usage_tokens(usage)
+        with self._lock:
+            for kind, value in tokens.items():
+                self.tokens[kind] = self.tokens.get(kind, 0) + value
+
+    def _record(self, stage, started_at, seconds, attributes):
+        self.store.observe(stage, seconds)
+        with self._lock:
+            if self.outcome is None:
+                self.stages[stage] = round(self.stages.get(stage, 0.0) + seconds * 1000, 1)
+        if self.exporter is not None:
+            self.exporter.log(dict(
+                {"type": "span", "turn": self.turn_id, "stage": stage,
+                 "offset_ms": round((started_at - self.started_at) * 1000, 1),
+                 "duration_ms": round(seconds * 1000, 1)},
+                **attributes
+            ))
+
+    def finish(self, outcome, **attributes):
+        """턴을 끝냅니다. 두 번째 호출부터는 무시합니다."""
+        with self._lock:
+            if self.outcome is not None:
+                return
+            self.outcome = outcome
+            self.attributes.update(attributes)
+            total = time.monotonic() - self.started_at
+            record = {
+                "type": "turn",
+                "turn": self.turn_id,
+                "time": datetime.now().isoformat(timespec="milliseconds"),
+                "outcome": outcome,
+                "total_ms": round(total * 1000, 1),
+                "stages": dict(self.stages),
+                "tokens": dict(self.tokens),
+            }
+            record.update(self.attributes)
+
+        self.store.observe("turn_total", total)
+        self.store.increment("turns", outcome)
+        for kind, value in record["tokens"].items():
+            self.store.increment("tokens", kind, value)
+        if self.exporter is not None:
+            self.exporter.log(record)
+
+
+class TurnTracer:
+    """턴 ID를 붙여 TurnTrace를 만듭니다. 턴 ID는 '실행 시작 시각-순번'입니다."""
+
+    def __init__(self, store=None, exporter=None):
+        self.store = store or MetricsStore()
+        self.exporter = exporter
+        self.session = datetime.now().strftime("%Y%m%d%H%M%S")
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def start_turn(self, question, **attributes):
+        with self._lock:
+            self._seq += 1
+            turn_id = f"{self.session}-{self._seq:04d}"
+        return TurnTrace(turn_id, question, self.store, self.exporter, **attributes)
+
+
+# =================================================================
+# 4. 내보내기 (JSONL, Prometheus 텍스트 파일)
+# =================================================================
+
+_STOP = object()
+
+
+class MetricsExporter:
+    """
+    측정 기록을 백그라운드 스레드에서 파일로 내보냅니다. 경로가 비어 있으면 그 형식은 내보내지 않습니다.
+
+    - log_path: span/턴 기록을 한 줄씩 추가하는 JSONL 파일
+    - prometheus_path: interval초마다(그리고 종료할 때) 통째로 다시 쓰는 Prometheus 텍스트 파일
+      (node_exporter textfile collector 등에서 읽을 수 있도록 임시 파일에 쓴 뒤 교체)
+    """
+
+    def __init__(self, store, log_path=None, prometheus_path=None, interval=15.0):
+        self.store = store
+        self.log_path = log_path or None
+        self.prometheus_path = prometheus_path or None
+        self.interval = interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="MetricsExporter", daemon=True)
+        self._dirty = False
+
+    def start(self):
+        for path in (self.log_path, self.prometheus_path):
+            if path and os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._thread.start()
+        return self
+
+    def log(self, record):
+        """기록 한 건을 큐에 넣고 바로 반환합니다."""
+        self._queue.put(record)
+
+    def close(self, timeout=5.0):
+        """남은 기록을 쓰고 Prometheus 파일을 마지막으로 갱신한 뒤 스레드를 끝냅니다."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _run(self):
+        log_file = open(self.log_path, "a", encoding="utf-8") if self.log_path else None
+        next_export = time.monotonic() + self.interval
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0.0, next_export - time.monotonic()))
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP:
+                    break
+                if item is not None:
+                    self._dirty = True
+                    if log_file is not None:
+                        log_file.write(json.dumps(item, ensure_ascii=False) + "\n")
+                        # 큐에 더 쌓여 있으면 한꺼번에 쓰고 flush합니다.
+                        if self._queue.empty():
+                            log_file.flush()
+                if time.monotonic() >= next_export:
+                    self._export()
+                    next_export = time.monotonic() + self.interval
+        except Exception as e:
+            print(f"❌ 측정 기록 내보내기 실패: {e}")
+        finally:
+            if log_file is not None:
+                log_file.close()
+        self._export()
+
+    def _export(self):
+        if not self.prometheus_path or not self._dirty:
+            return
+        try:
+            tmp_path = self.prometheus_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.store.prometheus_text())
+            os.replace(tmp_path, self.prometheus_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"❌ Prometheus 측정 파일 쓰기 실패: {e}")
+
+
+# =================================================================
+# 5. 통계 패널 문구
+# =================================================================
+
+# 패널에 표시하는 단계 (순서대로)
+PANEL_STAGES = (
+    ("db_lookup", "DB 검색"),
+    ("gemini_first_chunk", "첫 청크"),
+    ("gemini_total", "Gemini"),
+    ("turn_total", "턴 전체"),
+    ("render", "화면 표시"),
+    ("db_save", "DB 저장"),
+    ("tts_first_audio", "첫 음성"),
+    ("gui_stall", "GUI 멈춤"),
+)
+
+
+def panel_text(store):
+    """통계 패널에 표시할 몇 줄짜리 요약(턴 결과별 개수, 토큰 수, 단계별 p50/p95)을 만듭니다."""
+    summary = store.summary()
+    stages = summary["stages"]
+    turns = " ".join(
+        f"{label} {store.counter('turns', outcome)}"
+        for outcome, label in (("answered", "답변"), ("cached", "캐시"), ("error", "오류"), ("cancelled", "취소"))
+    )
+    lines = [f"턴: {turns} | 토큰: 입력 {store.counter('tokens', 'prompt')} 출력 {store.counter('tokens', 'output')}"
+             " | 단계별 p50/p95(ms)"]
+    cells = [
+        f"{label} {stages[stage]['p50_ms']:.0f}/{stages[stage]['p95_ms']:.0f}"
+        for stage, label in PANEL_STAGES if stage in stages
+    ]
+    for i in range(0, len(cells), 3):
+        lines.append(" | ".join(cells[i:i + 3]))
+    if not cells:
+        lines.append("아직 측정한 턴이 없습니다.")
+    return "\n".join(lines)
+
+
+def create_tracer(config=None):
+    """설정대로 저장소와 내보내기 스레드를 만들고 TurnTracer를 반환합니다. (내보낼 파일이 없으면 메모리에만 기록)"""
+    config = config or metrics_config_from_env()
+    store = MetricsStore()
+    exporter = None
+    if config["log_path"] or config["prometheus_path"]:
+        try:
+            exporter = MetricsExporter(store, config["log_path"], config["prometheus_path"], config["interval"]).start()
+        except OSError as e:
+            print(f"❌ 측정 기록 파일을 열 수 없어 메모리에만 기록합니다: {e}")
+    return TurnTracer(store, exporter)
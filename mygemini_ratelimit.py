@@ -0,0 +1,271 @@
+"""
+Mygemini 요청 속도 제한 / 재시도 모듈
+
+Gemini 호출 앞에서 요청 속도를 할당량에 맞추고, 일시적인 오류(429/5xx)는 바로 실패로
+돌리지 않고 기다렸다가 다시 시도합니다.
+
+- 토큰 버킷: 분당 요청 수(RPM)에 맞춰 요청을 내보내고, 순간적으로 몰리면 짧게 줄을 세웁니다.
+- 재시도: 지수 백오프 + 지터(tenacity), 서버가 알려 준 Retry-After / RetryInfo 대기 시간을 우선합니다.
+- 시도별 대기/소요 시간과 결과를 기록합니다. (stats())
+- asyncio 엔진은 call_async()로 같은 토큰 버킷과 재시도 규칙을 함께 씁니다.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from tenacity import AsyncRetrying, Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+
+# =================================================================
+# 1. 설정
+# =================================================================
+
+# 잠시 후 다시 시도하면 성공할 수 있는 HTTP 상태 코드
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class RequestCancelled(Exception):
+    """요청이 취소되어 더 진행하지 않을 때 발생합니다. (재시도하지 않음)"""
+
+
+def ratelimit_config_from_env():
+    """환경 변수에서 요청 속도 제한/재시도 설정을 읽습니다."""
+    return {
+        "rpm": float(os.environ.get("GEMINI_RPM", "10")),
+        "burst": int(os.environ.get("GEMINI_BURST", "3")),
+        "max_attempts": int(os.environ.get("GEMINI_MAX_ATTEMPTS", "5")),
+        "backoff_base": float(os.environ.get("GEMINI_BACKOFF_BASE", "1.0")),
+        "backoff_max": float(os.environ.get("GEMINI_BACKOFF_MAX", "30")),
+    }
+
+
+# =================================================================
+# 2. 토큰 버킷
+# =================================================================
+
+class TokenBucket:
+    """
+    초당 rate개씩 토큰이 차는 버킷입니다. 요청마다 토큰 하나를 쓰고, 없으면 찰 때까지 기다립니다.
+
+    - rate: 초당 토큰 수 (분당 요청 수 / 60)
+    - capacity: 최대 토큰 수 (한 번에 몰아서 보낼 수 있는 요청 수)
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """토큰이 있으면 하나 쓰고 0을, 없으면 토큰이 찰 때까지 남은 시간(초)을 반환합니다."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, cancel_event=None):
+        """
+        토큰 하나를 가져옵니다. 기다린 시간(초)을 반환합니다.
+        기다리는 중에 cancel_event가 설정되면 토큰을 가져가지 않고 바로 RequestCancelled를 발생시킵니다.
+        """
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            if cancel_event is None:
+                time.sleep(delay)
+            elif cancel_event.wait(delay):
+                raise RequestCancelled()
+            waited += delay
+
+    async def acquire_async(self):
+        """acquire()의 asyncio 버전입니다. 이벤트 루프를 막지 않고 기다립니다."""
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+# =================================================================
+# 3. 오류 분류 / Retry-After
+# =================================================================
+
+def error_code(error):
+    """APIError 등의 HTTP 상태 코드를 반환합니다. 알 수 없으면 None."""
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(error):
+    """다시 시도할 만한 오류(429, 5xx, 네트워크 타임아웃/연결 오류)인지 판단합니다."""
+    code = error_code(error)
+    if code is not None:
+        return code in RETRYABLE_CODES
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(error, (httpx.TimeoutException, httpx.NetworkError, asyncio.TimeoutError))
+
+
+def retry_after_seconds(error):
+    """서버가 알려 준 대기 시간(초)을 반환합니다. (Retry-After 헤더 또는 google.rpc.RetryInfo) 없으면 None."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass  # HTTP 날짜 형식은 사용하지 않습니다.
+
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []) or []:
+            delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+            if isinstance(delay, str) and delay.endswith("s"):
+                try:
+                    return max(0.0, float(delay[:-1]))
+                except ValueError:
+                    pass
+    return None
+
+
+# =================================================================
+# 4. 요청 스케줄러
+# =================================================================
+
+class RequestScheduler:
+    """
+    Gemini 호출을 토큰 버킷으로 속도 제한하고, 일시적인 오류는 백오프 후 다시 시도합니다.
+
+    - max_attempts: 최대 시도 횟수 (첫 시도 포함)
+    - backoff_base / backoff_max: 지수 백오프의 기본/최대 대기 시간(초). 실제 대기는 0~계산값 사이의 무작위(지터)
+    - Retry-After가 있으면 백오프 값보다 길 때 그 시간을 기다립니다.
+    """
+
+    def __init__(self, rpm=10, burst=3, max_attempts=5, backoff_base=1.0, backoff_max=30.0, history=1000):
+        self.bucket = TokenBucket(rpm / 60.0, burst)
+        self.max_attempts = max_attempts
+        self._backoff = wait_random_exponential(multiplier=backoff_base, max=backoff_max)
+        self._lock = threading.Lock()
+        self.attempts = deque(maxlen=history)  # 최근 시도 기록
+
+    def _wait(self, retry_state):
+        backoff = self._backoff(retry_state)
+        retry_after = retry_after_seconds(retry_state.outcome.exception())
+        if retry_after is not None and retry_after > backoff:
+            # 여러 요청이 같은 시각에 다시 몰리지 않도록 최대 20%의 지터를 더합니다.
+            return retry_after * random.uniform(1.0, 1.2)
+        return backoff
+
+    def call(self, fn, can_retry=None, on_retry=None, cancel_event=None):
+        """
+        fn()을 실행하고 결과를 반환합니다.
+
+        - can_retry: can_retry(오류) -> bool. 일시적인 오류라도 이 함수가 False면 바로 실패합니다.
+          (예: 스트리밍 청크를 이미 화면에 내보낸 경우)
+        - on_retry: on_retry(다음 시도 번호, 대기 시간(초), 오류) 재시도 전에 호출됩니다.
+        - cancel_event: threading.Event. 설정되면 백오프 대기와 토큰 대기를 바로 끝내고 RequestCancelled를 발생시킵니다.
+        """
+        def check_cancelled():
+            if cancel_event is not None and cancel_event.is_set():
+                raise RequestCancelled()
+
+        retrying = Retrying(
+            sleep=cancel_event.wait if cancel_event is not None else time.sleep,
+            **self._retry_options(can_retry, on_retry)
+        )
+        for attempt in retrying:
+            with attempt:
+                check_cancelled()
+                queued = self.bucket.acquire(cancel_event)
+                check_cancelled()
+                started_at = time.monotonic()
+                try:
+                    result = fn()
+                except Exception as e:
+                    self._record(attempt.retry_state.attempt_number, queued, started_at, error_code(e) or type(e).__name__)
+                    raise
+                self._record(attempt.retry_state.attempt_number, queued, started_at, None)
+        return result
+
+    async def call_async(self, fn, can_retry=None, on_retry=None):
+        """
+        call()의 asyncio 버전입니다. await fn()을 실행하고 결과를 반환합니다.
+        토큰 버킷은 call()과 함께 쓰며, 취소는 태스크 취소(CancelledError)로 처리합니다.
+        """
+        retrying = AsyncRetrying(**self._retry_options(can_retry, on_retry))
+        async for attempt in retrying:
+            with attempt:
+                queued = await self.bucket.acquire_async()
+                started_at = time.monotonic()
+                try:
+                    result = await fn()
+                except Exception as e:
+                    self._record(attempt.retry_state.attempt_number, queued, started_at, error_code(e) or type(e).__name__)
+                    raise
+                self._record(attempt.retry_state.attempt_number, queued, started_at, None)
+        return result
+
+    def _retry_options(self, can_retry, on_retry):
+        """call()/call_async()가 함께 쓰는 tenacity 설정 (중단 조건, 대기 시간, 재시도 조건, 재시도 알림)"""
+        def should_retry(error):
+            return is_retryable(error) and (can_retry is None or can_retry(error))
+
+        def before_sleep(retry_state):
+            error = retry_state.outcome.exception()
+            wait = retry_state.next_action.sleep
+            print(f"⏳ Gemini 요청 재시도 {retry_state.attempt_number + 1}/{self.max_attempts} "
+                  f"({wait:.1f}초 후, 오류 {error_code(error)})")
+            if on_retry is not None:
+                on_retry(retry_state.attempt_number + 1, wait, error)
+
+        return {
+            "stop": stop_after_attempt(self.max_attempts),
+            "wait": self._wait,
+            "retry": retry_if_exception(should_retry),
+            "before_sleep": before_sleep,
+            "reraise": True,
+        }
+
+    def _record(self, attempt_number, queued, started_at, error):
+        with self._lock:
+            self.attempts.append({
+                "attempt": attempt_number,
+                "queued_ms": round(queued * 1000, 1),
+                "elapsed_ms": round((time.monotonic() - started_at) * 1000, 1),
+                "error": error,
+            })
+
+    def stats(self):
+        """최근 시도들의 요약: 시도/재시도/실패 횟수, 속도 제한으로 기다린 시간, 소요 시간 p50/p95"""
+        with self._lock:
+            attempts = list(self.attempts)
+        elapsed = sorted(a["elapsed_ms"] for a in attempts)
+
+        def percentile(q):
+            return elapsed[min(len(elapsed) - 1, int(len(elapsed) * q))] if elapsed else None
+
+        return {
+            "attempts": len(attempts),
+            "retries": sum(1 for a in attempts if a["attempt"] > 1),
+            "errors": sum(1 for a in attempts if a["error"] is not None),
+            "queued_ms_total": round(sum(a["queued_ms"] for a in attempts), 1),
+            "elapsed_ms_p50": percentile(0.5),
+            "elapsed_ms_p95": percentile(0.95),
+        }
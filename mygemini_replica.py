@@ -0,0 +1,452 @@
+"""
+Mygemini chat_history 로컬 복제본 모듈
+
+원격 MySQL의 chat_history를 로컬 SQLite 파일에 복제해 두고, 질문 전 기록 검색은 로컬에서 바로 처리합니다.
+(네트워크 왕복 없이 1ms 안쪽, DB 서버에 닿지 않아도 검색 가능)
+
+- LocalChatReplica: SQLite chat_history 테이블 + FTS5 전문 검색 인덱스(trigram, 한국어 부분 일치 검색용).
+  새 기록은 고유 ID(row_uid)를 붙여 먼저 로컬에 저장하고(pushed=0), 원격에 올린 뒤 pushed=1로 표시합니다.
+  원격에서 다시 가져온 기록은 row_uid로 중복을 걸러냅니다.
+- ReplicaSync: 백그라운드 스레드가 주기적으로(또는 로컬 저장 직후) 올리지 않은 기록을 원격에 배치로 저장하고,
+  원격의 새 기록을 create_at 기준으로 증분해서 가져옵니다. 원격에 닿지 않으면 다음 주기에 다시 시도합니다.
+- ReplicaChatStore: asyncio 엔진에서 chat_store 자리에 쓰는 비동기 래퍼입니다.
+
+PyQt에 의존하지 않습니다.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from mygemini_cache import QUESTION_HASH_VERSION, question_hash
+from mygemini_db import HISTORY_SEARCH_LIMIT, fetch_chat_history_since, insert_chat_rows
+
+
+# =================================================================
+# 1. 설정
+# =================================================================
+
+def replica_config_from_env():
+    """환경 변수에서 로컬 복제본 설정을 읽습니다."""
+    return {
+        "enabled": os.environ.get("REPLICA", "1") != "0",
+        "path": os.environ.get("REPLICA_PATH", "chat_history.sqlite3"),
+        "sync_interval": float(os.environ.get("REPLICA_SYNC_INTERVAL", "30")),
+        "push_delay": float(os.environ.get("REPLICA_PUSH_DELAY", "2.0")),
+        "batch_size": int(os.environ.get("REPLICA_BATCH_SIZE", "200")),
+    }
+
+
+# =================================================================
+# 2. 로컬 SQLite 복제본
+# =================================================================
+
+SCHEMA_SQL = [
+    "CREATE TABLE IF NOT EXISTS chat_history ("
+    "id INTEGER PRIMARY KEY, question TEXT NOT NULL, answer TEXT NOT NULL, create_at TEXT NOT NULL, "
+    "question_hash TEXT NOT NULL, pushed INTEGER NOT NULL DEFAULT 0, row_uid TEXT)",
+    "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+]
+INDEX_SQL = [
+    # 원격에서 다시 가져온 기록(자기가 올린 것 포함)은 row_uid로 중복을 걸러냅니다. (NULL은 여러 개 허용)
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_chat_history_row_uid ON chat_history (row_uid)",
+    "CREATE INDEX IF NOT EXISTS idx_chat_history_question_hash ON chat_history (question_hash, create_at)",
+    "CREATE INDEX IF NOT EXISTS idx_chat_history_pushed ON chat_history (pushed) WHERE pushed = 0",
+]
+# FTS5 인덱스 (chat_history를 내용 테이블로 쓰는 external content 방식, 삽입 트리거로 함께 갱신)
+FTS_SCHEMA_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chat_history_fts USING fts5("
+    "question, answer, content='chat_history', content_rowid='id', tokenize='{tokenizer}')",
+    "CREATE TRIGGER IF NOT EXISTS chat_history_fts_insert AFTER INSERT ON chat_history BEGIN "
+    "INSERT INTO chat_history_fts (rowid, question, answer) VALUES (new.id, new.question, new.answer); END",
+]
+# trigram은 검색어를 3글자 단위로 색인해 부분 일치(LIKE '%검색어%'와 같은 결과)를 인덱스로 찾습니다. (SQLite 3.34+)
+FTS_TOKENIZERS = ("trigram", "unicode61")
+TRIGRAM_SIZE = 3
+
+FIND_ANSWER_BY_HASH_SQL = (
+    "SELECT create_at, question, answer FROM chat_history "
+    "WHERE question_hash = ? ORDER BY create_at DESC LIMIT 1"
+)
+SEARCH_FTS_SQL = (
+    "SELECT h.create_at, h.question, h.answer, -bm25(chat_history_fts) AS score "
+    "FROM chat_history_fts JOIN chat_history h ON h.id = chat_history_fts.rowid "
+    "WHERE chat_history_fts MATCH ? ORDER BY score DESC, h.create_at DESC LIMIT ?"
+)
+SEARCH_LIKE_SQL = (
+    "SELECT create_at, question, answer FROM chat_history "
+    "WHERE question LIKE ? OR answer LIKE ? ORDER BY create_at DESC LIMIT ?"
+)
+INSERT_SQL = (
+    "INSERT INTO chat_history (question, answer, create_at, question_hash, row_uid, pushed) VALUES (?, ?, ?, ?, ?, 0)"
+)
+# 원격에서 가져온 기록 중 row_uid가 있는 것: 같은 row_uid가 이미 있으면 건너뜁니다.
+MERGE_SQL = (
+    "INSERT OR IGNORE INTO chat_history (question, answer, create_at, question_hash, row_uid, pushed) "
+    "VALUES (?, ?, ?, ?, ?, 1)"
+)
+# row_uid가 없는 기록(마이그레이션 5 전에 저장된 것): 시각, 질문, 답변이 모두 같은 기록이 있으면 건너뜁니다.
+MERGE_LEGACY_SQL = (
+    "INSERT INTO chat_history (question, answer, create_at, question_hash, pushed) "
+    "SELECT ?, ?, ?, ?, 1 WHERE NOT EXISTS ("
+    "SELECT 1 FROM chat_history WHERE question_hash = ? AND create_at = ? AND answer = ?)"
+)
+
+
+# 로컬 기록의 question_hash를 계산한 정규화 버전 (sync_state)
+HASH_VERSION_KEY = "question_hash_version"
+
+
+def _timestamp(value):
+    """원격의 DATETIME(datetime 객체) 또는 문자열을 'YYYY-MM-DD HH:MM:SS' 문자열로 맞춥니다."""
+    if hasattr(value, "strftime"):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+class LocalChatReplica:
+    """
+    chat_history의 로컬 SQLite 복제본입니다. 여러 스레드(검색 워커, 동기화 스레드, GUI 스레드)가
+    커넥션 하나를 잠금으로 나눠 씁니다. (작업마다 1ms 안쪽, 동기화는 작은 배치로 나눠 잠금을 오래 잡지 않음)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for sql in SCHEMA_SQL:
+                self._conn.execute(sql)
+            self._upgrade_schema()
+            for sql in INDEX_SQL:
+                self._conn.execute(sql)
+        self._rehash_questions()
+        self.fts_tokenizer = self._create_fts()
+
+        self.hits = 0
+        self.lookups = 0
+
+    def _upgrade_schema(self):
+        """row_uid가 없던 이전 복제본 파일을 고칩니다. (같은 초의 같은 질문을 한 건으로 합치던 고유 인덱스 제거)"""
+        columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(chat_history)")]
+        if "row_uid" in columns:
+            return
+        self._conn.execute("ALTER TABLE chat_history ADD COLUMN row_uid TEXT")
+        self._conn.execute("DROP INDEX IF EXISTS idx_chat_history_row")
+        # 아직 올리지 않은 기록에는 고유 ID를 붙여 올립니다. (이미 올린 기록은 원격에도 ID가 없음)
+        ids = [row["id"] for row in self._conn.execute("SELECT id FROM chat_history WHERE pushed = 0")]
+        self._conn.executemany("UPDATE chat_history SET row_uid = ? WHERE id = ?", [(uuid.uuid4().hex, i) for i in ids])
+
+    def _rehash_questions(self):
+        """질문 정규화 규칙이 바뀌었으면(QUESTION_HASH_VERSION) 로컬 기록의 question_hash를 다시 계산합니다."""
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (HASH_VERSION_KEY,)).fetchone()
+        if row is not None and row["value"] == str(QUESTION_HASH_VERSION):
+            return
+        questions = [r["question"] for r in self._conn.execute("SELECT DISTINCT question FROM chat_history")]
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE chat_history SET question_hash = ? WHERE question = ?",
+                [(question_hash(q), q) for q in questions]
+            )
+            self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                               (HASH_VERSION_KEY, str(QUESTION_HASH_VERSION)))
+        if questions:
+            print(f"🔄 로컬 복제본 question_hash 다시 계산: 서로 다른 질문 {len(questions)}개")
+
+    def _create_fts(self):
+        """FTS5 인덱스를 만들고 사용한 토크나이저 이름을 반환합니다. FTS5를 쓸 수 없으면 None (LIKE 검색)"""
+        existing = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'chat_history_fts'"
+        ).fetchone()
+        if existing is not None:
+            return next((t for t in FTS_TOKENIZERS if f"'{t}'" in existing["sql"]), FTS_TOKENIZERS[-1])
+        for tokenizer in FTS_TOKENIZERS:
+            try:
+                with self._conn:
+                    for sql in FTS_SCHEMA_SQL:
+                        self._conn.execute(sql.format(tokenizer=tokenizer))
+                    # 이미 있던 기록(인덱스를 만들기 전의 기록)도 색인합니다.
+                    self._conn.execute("INSERT INTO chat_history_fts (chat_history_fts) VALUES ('rebuild')")
+                return tokenizer
+            except sqlite3.OperationalError as e:
+                print(f"⚠️ 로컬 복제본 전문 검색 인덱스({tokenizer}) 생성 실패: {e}")
+        print("⚠️ SQLite에 FTS5가 없어 로컬 검색은 LIKE를 사용합니다.")
+        return None
+
+    # ----- 검색 (mygemini_db의 같은 이름 함수와 같은 결과 형식: dict 목록) -----
+    def find_answer_by_hash(self, qhash):
+        """같은 질문(정규화 해시 일치)의 가장 최근 기록을 반환합니다. 없으면 None"""
+        with self._lock:
+            row = self._conn.execute(FIND_ANSWER_BY_HASH_SQL, (qhash,)).fetchone()
+            self.lookups += 1
+            if row is not None:
+                self.hits += 1
+        return dict(row) if row is not None else None
+
+    def search(self, search_term, limit=HISTORY_SEARCH_LIMIT):
+        """검색어가 포함된 기록을 최대 limit건 반환합니다. (전문 검색은 관련도순, LIKE는 최신순)"""
+        phrase = search_term.strip()
+        min_length = TRIGRAM_SIZE if self.fts_tokenizer == "trigram" else 1
+        with self._lock:
+            if self.fts_tokenizer is not None and len(phrase) >= min_length:
+                query = '"' + phrase.replace('"', '""') + '"'
+                rows = self._conn.execute(SEARCH_FTS_SQL, (query, limit)).fetchall()
+            else:
+                pattern = f"%{search_term}%"
+                rows = self._conn.execute(SEARCH_LIKE_SQL, (pattern, pattern, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    # ----- 저장 -----
+    def save(self, question, answer, created_at=None):
+        """
+        기록 한 건을 로컬에 저장하고(원격에는 동기화 스레드가 올림) 저장한 시각 문자열을 반환합니다.
+        같은 초에 같은 질문을 다시 해도 항상 새 기록으로 저장합니다. (기록마다 고유 ID)
+        """
+        created_at = created_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock, self._conn:
+            self._conn.execute(INSERT_SQL, (question, answer, created_at, question_hash(question), uuid.uuid4().hex))
+        return created_at
+
+    def merge(self, rows):
+        """원격에서 가져온 기록을 넣습니다. 이미 있는 기록은 건너뛰며, 새로 넣은 개수를 반환합니다."""
+        with_uid, legacy = [], []
+        for row in rows:
+            question, answer, created_at = row["question"], row["answer"], _timestamp(row["create_at"])
+            qhash = question_hash(question)
+            if row.get("row_uid"):
+                with_uid.append((question, answer, created_at, qhash, row["row_uid"]))
+            else:
+                legacy.append((question, answer, created_at, qhash, qhash, created_at, answer))
+        inserted = 0
+        with self._lock, self._conn:
+            if with_uid:
+                inserted += self._conn.executemany(MERGE_SQL, with_uid).rowcount
+            if legacy:
+                inserted += self._conn.executemany(MERGE_LEGACY_SQL, legacy).rowcount
+        return inserted
+
+    def unpushed(self, limit):
+        """원격에 아직 올리지 않은 기록 [(id, (question, answer, create_at, question_hash, row_uid))]"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, question, answer, create_at, question_hash, row_uid FROM chat_history "
+                "WHERE pushed = 0 ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            (row["id"], (row["question"], row["answer"], row["create_at"], row["question_hash"], row["row_uid"]))
+            for row in rows
+        ]
+
+    def mark_pushed(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE chat_history SET pushed = 1 WHERE id = ?", [(i,) for i in ids])
+
+    # ----- 동기화 상태 -----
+    def get_state(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row is not None else default
+
+    def set_state(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def stats(self):
+        with self._lock:
+            rows, pending = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pushed = 0), 0) FROM chat_history"
+            ).fetchone()
+        return {
+            "rows": rows,
+            "unpushed": pending,
+            "lookups": self.lookups,
+            "exact_hits": self.hits,
+            "fts": self.fts_tokenizer,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# =================================================================
+# 3. 백그라운드 동기화 (로컬 → 원격 올리기, 원격 → 로컬 증분 가져오기)
+# =================================================================
+
+# 원격에서 가져온 마지막 기록의 create_at (다음 동기화는 이 시각부터)
+PULL_WATERMARK_KEY = "pulled_until"
+# 다른 PC의 시계가 조금 느리거나 저널에서 늦게 저장된 기록을 놓치지 않도록 마지막 시각보다 조금 앞에서부터 다시 읽습니다.
+# (이미 있는 기록은 merge에서 걸러짐)
+PULL_OVERLAP_SECONDS = 300
+
+
+class ReplicaSync:
+    """
+    로컬 복제본과 원격 MySQL을 맞추는 백그라운드 스레드입니다.
+
+    - 동기화 한 번: 올리지 않은 로컬 기록을 batch_size개씩 insert_chat_rows로 저장한 뒤,
+      원격에서 pulled_until 이후의 기록을 batch_size개씩 가져와 로컬에 넣습니다.
+    - interval초마다 동기화하고, notify()(로컬 저장 직후)가 오면 push_delay초 동안 더 모은 뒤 바로 동기화합니다.
+    - 원격에 닿지 않으면 로컬 기록은 그대로 두고 다음 주기에 다시 시도합니다. (오류는 상태가 바뀔 때만 출력)
+    """
+
+    def __init__(self, replica, pool, interval=30.0, push_delay=2.0, batch_size=200):
+        self.replica = replica
+        self.pool = pool
+        self.interval = interval
+        self.push_delay = push_delay
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ReplicaSync", daemon=True)
+
+        self.online = None          # 마지막 동기화 성공 여부 (아직 시도 전이면 None)
+        self.pushed = 0
+        self.pulled = 0
+        self.syncs = 0
+        self.failures = 0
+        self.last_sync_ms = None
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def notify(self):
+        """로컬에 새 기록을 저장했음을 알립니다. (곧 원격에 올림)"""
+        self._wake.set()
+
+    def close(self, timeout=10.0):
+        """
+        동기화 스레드를 멈춥니다. 원격에 연결되어 있으면 남은 로컬 기록을 마지막으로 올립니다.
+        timeout 안에 스레드가 끝났으면 True를 반환합니다. (False면 스레드가 아직 복제본을 쓰는 중)
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def stats(self):
+        return {
+            "online": self.online,
+            "syncs": self.syncs,
+            "failures": self.failures,
+            "pushed": self.pushed,
+            "pulled": self.pulled,
+            "last_sync_ms": self.last_sync_ms,
+        }
+
+    def _run(self):
+        while True:
+            self.sync_once()
+            self._wake.wait(self.interval)
+            if self._stop.is_set():
+                break
+            if self._wake.is_set():
+                # 연달아 저장되는 기록을 한 배치로 모읍니다. (종료 요청이 오면 바로 진행)
+                self._stop.wait(self.push_delay)
+                self._wake.clear()
+            if self._stop.is_set():
+                break
+        # 종료: 원격이 살아 있을 때만 남은 기록을 올립니다. (끊겨 있으면 로컬에 남겨 두고 다음 실행 때 올림)
+        if self.online:
+            self._push()
+
+    def sync_once(self):
+        """올리기와 가져오기를 한 번씩 실행하고 성공 여부를 반환합니다."""
+        started_at = time.monotonic()
+        try:
+            pushed = self._push()
+            pulled = self._pull()
+        except Exception as e:
+            self.failures += 1
+            if self.online is not False:
+                print(f"⚠️ 로컬 복제본 동기화 실패 (로컬 기록으로 계속하고 {self.interval:g}초 뒤 다시 시도합니다): {e}")
+            self.online = False
+            return False
+
+        if self.online is False:
+            print("✅ 원격 DB 연결이 복구되어 로컬 복제본 동기화를 다시 시작합니다.")
+        self.online = True
+        self.syncs += 1
+        self.last_sync_ms = round((time.monotonic() - started_at) * 1000)
+        if pushed or pulled:
+            print(f"🔄 로컬 복제본 동기화: 올림 {pushed}건, 가져옴 {pulled}건 ({self.last_sync_ms}ms)")
+        return True
+
+    def _push(self):
+        total = 0
+        while True:
+            batch = self.replica.unpushed(self.batch_size)
+            if not batch:
+                return total
+            with self.pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    insert_chat_rows(self.pool, cursor, [row for _, row in batch])
+                conn.commit()
+            self.replica.mark_pushed([row_id for row_id, _ in batch])
+            self.pushed += len(batch)
+            total += len(batch)
+
+    def _pull(self):
+        total = 0
+        watermark = self.replica.get_state(PULL_WATERMARK_KEY)
+        since = "1970-01-01 00:00:00"
+        if watermark:
+            since = _timestamp(datetime.strptime(watermark, '%Y-%m-%d %H:%M:%S') - timedelta(seconds=PULL_OVERLAP_SECONDS))
+        newest = watermark
+        while True:
+            rows = fetch_chat_history_since(self.pool, since, self.batch_size)
+            if rows:
+                total += self.replica.merge(rows)
+                newest = max(newest or "", _timestamp(rows[-1]["create_at"]))
+            if len(rows) < self.batch_size:
+                break
+            last = _timestamp(rows[-1]["create_at"])
+            if last == since:
+                # 한 배치 전체가 같은 초의 기록이면 since를 더 옮길 수 없습니다. (매우 드묾)
+                print(f"⚠️ {since}에 기록이 {self.batch_size}건 이상이어서 일부를 가져오지 못했습니다. (REPLICA_BATCH_SIZE를 늘려 주세요)")
+                break
+            since = last
+        if newest and newest != watermark:
+            self.replica.set_state(PULL_WATERMARK_KEY, newest)
+        self.pulled += total
+        return total
+
+
+# =================================================================
+# 4. asyncio 엔진용 래퍼
+# =================================================================
+
+class ReplicaChatStore:
+    """
+    asyncio 엔진의 chat_store 자리에 쓰는 로컬 복제본입니다. (AsyncChatStore와 같은 메서드)
+    SQLite 작업은 짧지만 동기화 중에는 잠금을 기다릴 수 있으므로 이벤트 루프 대신 스레드에서 실행합니다.
+    """
+
+    def __init__(self, replica, sync=None):
+        self.replica = replica
+        self.sync = sync
+
+    async def find_answer_by_hash(self, qhash):
+        return await asyncio.to_thread(self.replica.find_answer_by_hash, qhash)
+
+    async def search(self, search_term, limit=HISTORY_SEARCH_LIMIT):
+        return await asyncio.to_thread(self.replica.search, search_term, limit)
+
+    async def save(self, question, answer, created_at=None):
+        created_at = await asyncio.to_thread(self.replica.save, question, answer, created_at)
+        if self.sync is not None:
+            self.sync.notify()
+        return created_at
+
+    async def close(self):
+        pass  # 복제본과 동기화 스레드는 만든 쪽에서 닫습니다.
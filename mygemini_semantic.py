@@ -0,0 +1,278 @@
+"""
+Mygemini 의미 유사 답변 캐시 모듈
+
+질문을 임베딩 벡터로 바꿔 NumPy 배열 인덱스에 보관하고, 표현이 달라도 뜻이 같은 질문
+(코사인 유사도가 임계값 이상)이면 저장된 답변을 돌려줍니다.
+
+- 임베더는 교체할 수 있습니다: GeminiEmbedder(네트워크), HashingEmbedder(로컬, 결정적)
+- 인덱스는 <경로>.npy(벡터)와 <경로>.json(질문/답변 메타데이터)로 저장되며,
+  불러올 때는 벡터 파일을 메모리 매핑(mmap)으로 엽니다.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from mygemini_cache import normalize_question, question_hash
+
+
+# =================================================================
+# 1. 설정
+# =================================================================
+
+def semantic_config_from_env():
+    """환경 변수에서 의미 캐시 설정(사용 여부, 임베더 종류, 인덱스 경로, 유사도 임계값)을 읽습니다."""
+    return {
+        "enabled": os.environ.get("SEMANTIC_CACHE", "1") != "0",
+        "embedder": os.environ.get("SEMANTIC_EMBEDDER", "gemini"),
+        "path": os.environ.get("SEMANTIC_CACHE_PATH", os.path.join("semantic_cache", "index")),
+        "threshold": float(os.environ.get("SEMANTIC_THRESHOLD", "0.92")),
+    }
+
+
+# =================================================================
+# 2. 임베더 (교체 가능)
+# =================================================================
+
+class HashingEmbedder:
+    """
+    네트워크 없이 동작하는 결정적 임베더입니다. (테스트/오프라인용)
+    정규화한 질문의 글자 n-gram을 해시해 고정 길이 벡터에 누적합니다.
+    """
+
+    def __init__(self, dim=256, ngram=2):
+        self.dim = dim
+        self.ngram = ngram
+        self.name = f"hashing-{dim}-{ngram}"
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            normalized = normalize_question(text).replace(" ", "")
+            grams = [normalized[i:i + self.ngram] for i in range(max(1, len(normalized) - self.ngram + 1))]
+            for gram in grams:
+                digest = hashlib.md5(gram.encode("utf-8")).digest()
+                index = int.from_bytes(digest[:4], "little") % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, index] += sign
+        return _normalize_rows(vectors)
+
+
+class GeminiEmbedder:
+    """Gemini 임베딩 API(client.models.embed_content)를 사용하는 임베더입니다."""
+
+    def __init__(self, client, model="gemini-embedding-001", dim=768):
+        self.client = client
+        self.model = model
+        self.dim = dim
+        self.name = f"gemini-{model}-{dim}"
+
+    def embed(self, texts):
+        from google.genai import types
+
+        result = self.client.models.embed_content(
+            model=self.model,
+            contents=list(texts),
+            config=types.EmbedContentConfig(output_dimensionality=self.dim, task_type="SEMANTIC_SIMILARITY")
+        )
+        vectors = np.asarray([e.values for e in result.embeddings], dtype=np.float32)
+        return _normalize_rows(vectors)
+
+
+def create_embedder(kind, client=None):
+    """설정 문자열("gemini" 또는 "local")에 맞는 임베더를 만듭니다."""
+    if kind == "local":
+        return HashingEmbedder()
+    if kind == "gemini":
+        return GeminiEmbedder(client, model=os.environ.get("SEMANTIC_EMBED_MODEL", "gemini-embedding-001"))
+    raise ValueError(f"알 수 없는 임베더 종류: {kind}")
+
+
+def _normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+# =================================================================
+# 3. 의미 유사 캐시 (NumPy 인덱스 + 디스크 저장)
+# =================================================================
+
+class SemanticCache:
+    """
+    질문 임베딩 → 답변 캐시입니다.
+
+    - path: 인덱스 파일 경로(확장자 제외). <path>.npy, <path>.json 두 파일을 사용합니다.
+    - threshold: 이 값 이상의 코사인 유사도일 때만 캐시 적중으로 봅니다.
+    - autosave_every: 새 항목이 이만큼 쌓일 때마다 디스크에 저장합니다. (0이면 save()를 직접 호출)
+    """
+
+    def __init__(self, path, embedder, threshold=0.92, autosave_every=20):
+        self.path = path
+        self.embedder = embedder
+        self.threshold = threshold
+        self.autosave_every = autosave_every
+        self._lock = threading.Lock()
+
+        self._vectors = self._empty_vectors()   # 디스크에서 읽은(mmap) 벡터
+        self._pending = self._empty_vectors()   # 아직 저장하지 않은 새 벡터 (작은 별도 배열)
+        self._entries = []          # [{"question", "answer", "question_hash"}], 벡터와 같은 순서
+        self._known = set()         # 이미 들어 있는 question_hash (중복 방지)
+
+        self.hits = 0
+        self.misses = 0
+
+        self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _empty_vectors(self):
+        return np.zeros((0, self.embedder.dim), dtype=np.float32)
+
+    # ---------------------------------------------------------------
+    # 조회 / 추가
+    # ---------------------------------------------------------------
+    def lookup(self, question):
+        """
+        가장 비슷한 저장 질문을 찾아 (답변, 유사도, 저장된 질문)을 반환합니다. 임계값 미만이면 None.
+        디스크 인덱스(mmap)와 아직 저장하지 않은 벡터를 따로 계산합니다. (합치면 조회마다 인덱스 전체를 복사함)
+        """
+        with self._lock:
+            if not self._entries:
+                self.misses += 1
+                return None
+
+        query = self.embedder.embed([question])[0]
+        with self._lock:
+            best, score = None, -np.inf
+            for offset, vectors in ((0, self._vectors), (len(self._vectors), self._pending)):
+                if not len(vectors):
+                    continue
+                scores = vectors @ query
+                index = int(np.argmax(scores))
+                if scores[index] > score:
+                    best, score = offset + index, float(scores[index])
+
+            if best is None or score < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry = self._entries[best]
+        return entry["answer"], score, entry["question"]
+
+    def add(self, question, answer):
+        """질문/답변 한 건을 임베딩해서 추가합니다. 같은 질문(정규화 해시 일치)이 있으면 무시합니다."""
+        self.add_many([(question, answer)])
+
+    def add_many(self, pairs):
+        """(질문, 답변) 목록을 한 번의 임베딩 호출로 추가하고, 실제로 추가한 건수를 반환합니다."""
+        new_pairs = []
+        seen = set()
+        with self._lock:
+            for question, answer in pairs:
+                qhash = question_hash(question)
+                if qhash in self._known or qhash in seen:
+                    continue
+                seen.add(qhash)
+                new_pairs.append((question, answer, qhash))
+        if not new_pairs:
+            return 0
+
+        vectors = self.embedder.embed([question for question, _, _ in new_pairs])
+        with self._lock:
+            # 임베딩하는 동안 다른 스레드가 같은 질문을 넣었을 수 있으므로 다시 확인합니다.
+            added = []
+            for (question, answer, qhash), vector in zip(new_pairs, vectors):
+                if qhash in self._known:
+                    continue
+                self._known.add(qhash)
+                self._entries.append({"question": question, "answer": answer, "question_hash": qhash})
+                added.append(vector)
+            if added:
+                self._pending = np.vstack([self._pending, np.asarray(added, dtype=np.float32)])
+            pending_count = len(self._pending)
+
+        if self.autosave_every and pending_count >= self.autosave_every:
+            self.save()
+        return len(added)
+
+    # ---------------------------------------------------------------
+    # 디스크 저장 / 불러오기
+    # ---------------------------------------------------------------
+    def load(self):
+        """디스크의 인덱스를 불러옵니다. 벡터는 메모리 매핑으로 열어 필요한 부분만 읽습니다."""
+        vectors_path, meta_path = self.path + ".npy", self.path + ".json"
+        if not (os.path.exists(vectors_path) and os.path.exists(meta_path)):
+            return
+
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("embedder") != self.embedder.name:
+            print(f"⚠️ 의미 캐시 임베더가 달라 기존 인덱스를 사용하지 않습니다: {meta.get('embedder')} → {self.embedder.name}")
+            return
+
+        vectors = np.load(vectors_path, mmap_mode="r")
+        if vectors.shape[0] != len(meta["entries"]):
+            print("⚠️ 의미 캐시 인덱스와 메타데이터 개수가 달라 무시합니다.")
+            return
+
+        with self._lock:
+            self._vectors = vectors
+            self._entries = meta["entries"]
+            self._known = {entry["question_hash"] for entry in self._entries}
+            self._pending = self._empty_vectors()
+        print(f"✅ 의미 캐시 인덱스 로드: {len(self._entries)}건 ({vectors_path})")
+
+    def save(self):
+        """새 항목이 있으면 인덱스를 디스크에 저장합니다. (임시 파일에 쓴 뒤 교체)"""
+        with self._lock:
+            if not len(self._pending):
+                return
+            vectors = np.concatenate([self._vectors, self._pending]).astype(np.float32)
+            entries = list(self._entries)
+            # Windows에서는 메모리 매핑된 파일을 교체할 수 없으므로 먼저 매핑을 놓습니다.
+            self._vectors = vectors
+            self._pending = self._empty_vectors()
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_vectors, tmp_meta = self.path + ".npy.tmp", self.path + ".json.tmp"
+            with open(tmp_vectors, "wb") as f:
+                np.save(f, vectors)
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                json.dump({"embedder": self.embedder.name, "dim": self.embedder.dim, "entries": entries},
+                          f, ensure_ascii=False)
+            os.replace(tmp_vectors, self.path + ".npy")
+            os.replace(tmp_meta, self.path + ".json")
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# =================================================================
+# 4. 기존 chat_history 일괄 임베딩 (backfill)
+# =================================================================
+
+def backfill_from_rows(cache, rows, batch_size=64):
+    """(question, answer) 행 목록(또는 이터레이터)을 batch_size씩 임베딩해 캐시에 넣고 저장합니다."""
+    added = 0
+    batch = []
+    for question, answer in rows:
+        batch.append((question, answer))
+        if len(batch) >= batch_size:
+            added += cache.add_many(batch)
+            batch = []
+    if batch:
+        added += cache.add_many(batch)
+    cache.save()
+    return added
@@ -0,0 +1,297 @@
+"""
+Mygemini 대화 기록(트랜스크립트) 뷰 모듈
+
+QTextEdit 하나에 모든 메시지를 append하면 대화가 길어질수록 문서 전체의 레이아웃/스크롤이 느려지고 메모리가 계속 늘어납니다.
+여기서는 메시지 목록 모델(MessageListModel) + QListView(TranscriptView)로 대신합니다.
+- 메시지 하나가 한 행입니다. 스트리밍 응답은 그 행의 텍스트만 바꿉니다. (문서 전체를 커서로 오가지 않음)
+- 델리게이트는 화면에 보이는 행만 그리고, 행 높이는 메시지의 (텍스트 판, 너비)별로 캐시합니다.
+- 뷰에는 최근 메시지 몇 페이지만 행으로 올려 두고, 맨 위까지 스크롤하면 이전 메시지를 한 페이지씩 다시 올립니다.
+- 메모리에는 최대 max_messages개만 보관하고 가장 오래된 것부터 버립니다. (대화 기록은 DB에 남아 있음)
+
+append/setText/toPlainText는 QTextEdit와 같게 쓸 수 있어 lblAnswer 자리에 그대로 놓습니다.
+"""
+import os
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+
+# 메시지 객체(Message)를 꺼낼 때 쓰는 역할
+MESSAGE_ROLE = QtCore.Qt.ItemDataRole.UserRole
+TEXT_FLAGS = QtCore.Qt.AlignmentFlag.AlignLeft | QtCore.Qt.AlignmentFlag.AlignTop | QtCore.Qt.TextFlag.TextWordWrap
+
+
+def transcript_config_from_env():
+    """환경 변수에서 대화 기록 뷰 설정(메모리에 보관할 메시지 수, 한 페이지의 메시지 수)을 읽습니다."""
+    return {
+        "max_messages": int(os.environ.get("TRANSCRIPT_MAX_MESSAGES", "5000")),
+        "page_size": int(os.environ.get("TRANSCRIPT_PAGE_SIZE", "100")),
+    }
+
+
+# =================================================================
+# 1. 메시지 목록 모델
+# =================================================================
+
+class Message:
+    """대화 기록의 메시지 하나입니다. 텍스트가 바뀌면 revision이 올라가 캐시된 높이를 다시 계산합니다."""
+
+    __slots__ = ("seq", "text", "revision", "height_key", "height")
+
+    def __init__(self, seq, text):
+        self.seq = seq              # 추가된 순서 (행 번호 계산용, 버려진 메시지도 번호는 그대로)
+        self.text = text
+        self.revision = 0
+        self.height_key = None      # (revision, 너비) - height를 계산한 조건
+        self.height = 0
+
+
+class MessageListModel(QtCore.QAbstractListModel):
+    """
+    메시지 목록입니다. 보관 중인 메시지 중 앞쪽 hidden개는 행으로 내놓지 않습니다. (화면 밖의 오래된 기록)
+    trim()으로 앞쪽 행을 숨기고 fetch_older()로 한 페이지씩 다시 내놓습니다.
+
+    Qt의 canFetchMore/fetchMore는 목록 끝(아래쪽)에 행을 더 붙이는 용도라 자동으로 불리는 시점이 맞지 않아,
+    위쪽(이전 기록) 페이지는 뷰가 맨 위에 닿았을 때 fetch_older()를 직접 부릅니다.
+    """
+
+    def __init__(self, max_messages=5000, page_size=100, parent=None):
+        super().__init__(parent)
+        self.max_messages = max(1, max_messages)
+        self.page_size = max(1, page_size)
+        self._messages = []
+        self._first_seq = 0     # _messages[0]의 seq
+        self._next_seq = 0
+        self.hidden = 0         # 행으로 내놓지 않은 앞쪽 메시지 수
+        self.evicted = 0        # 보관 한도를 넘어 버린 메시지 수
+
+    # ----- QAbstractListModel -----
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._messages) - self.hidden
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        message = self._messages[self.hidden + index.row()]
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            return message.text
+        if role == MESSAGE_ROLE:
+            return message
+        return None
+
+    # ----- 메시지 추가/변경 -----
+    def append(self, text):
+        """메시지를 맨 아래에 추가하고 반환합니다. 보관 한도를 넘으면 가장 오래된 메시지부터 버립니다."""
+        message = Message(self._next_seq, text)
+        self._next_seq += 1
+        row = self.rowCount()
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self._messages.append(message)
+        self.endInsertRows()
+        self._evict()
+        return message
+
+    def set_text(self, message, text):
+        message.text = text
+        message.revision += 1
+        self._changed(message)
+
+    def append_text(self, message, text):
+        message.text += text
+        message.revision += 1
+        self._changed(message)
+
+    def clear(self):
+        self.beginResetModel()
+        self._messages.clear()
+        self._first_seq = self._next_seq
+        self.hidden = 0
+        self.endResetModel()
+
+    def messages(self):
+        """보관 중인 메시지 전체 (숨긴 것 포함, 오래된 순)"""
+        return list(self._messages)
+
+    def row_of(self, message):
+        """메시지의 현재 행 번호. 숨겼거나 버린 메시지면 None"""
+        row = message.seq - self._first_seq - self.hidden
+        if 0 <= row < self.rowCount():
+            return row
+        return None
+
+    def _changed(self, message):
+        row = self.row_of(message)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+    # ----- 페이지 -----
+    def trim(self, keep):
+        """행이 keep개보다 많으면 앞쪽(오래된) 행을 숨깁니다. 메시지는 계속 보관합니다."""
+        count = self.rowCount() - keep
+        if count <= 0:
+            return
+        self.beginRemoveRows(QtCore.QModelIndex(), 0, count - 1)
+        self.hidden += count
+        self.endRemoveRows()
+
+    def can_fetch_older(self):
+        return self.hidden > 0
+
+    def fetch_older(self):
+        """숨긴 메시지 중 가장 최근 한 페이지를 다시 행으로 내놓고 그 수를 반환합니다."""
+        count = min(self.page_size, self.hidden)
+        if count:
+            self.beginInsertRows(QtCore.QModelIndex(), 0, count - 1)
+            self.hidden -= count
+            self.endInsertRows()
+        return count
+
+    def _evict(self):
+        overflow = len(self._messages) - self.max_messages
+        if overflow <= 0:
+            return
+        # 숨기지 않은(행으로 보이는) 메시지까지 버려야 하면 그 행을 먼저 제거합니다.
+        visible = overflow - self.hidden
+        if visible > 0:
+            self.beginRemoveRows(QtCore.QModelIndex(), 0, visible - 1)
+        del self._messages[:overflow]
+        self._first_seq += overflow
+        self.hidden = max(0, self.hidden - overflow)
+        self.evicted += overflow
+        if visible > 0:
+            self.endRemoveRows()
+
+
+# =================================================================
+# 2. 델리게이트 / 뷰
+# =================================================================
+
+class MessageDelegate(QtWidgets.QStyledItemDelegate):
+    """메시지를 줄바꿈해 그립니다. 높이는 메시지에 (revision, 너비)와 함께 캐시해 다시 계산하지 않습니다."""
+
+    PADDING = 4
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+
+    def text_width(self):
+        return max(50, self.view.viewport().width() - 2 * self.PADDING)
+
+    def sizeHint(self, option, index):
+        message = index.data(MESSAGE_ROLE)
+        width = self.text_width()
+        key = (message.revision, width)
+        if message.height_key != key:
+            metrics = option.fontMetrics
+            rect = metrics.boundingRect(QtCore.QRect(0, 0, width, 1 << 24), TEXT_FLAGS, message.text)
+            message.height = max(rect.height(), metrics.height()) + 2 * self.PADDING
+            message.height_key = key
+        return QtCore.QSize(width + 2 * self.PADDING, message.height)
+
+    def paint(self, painter, option, index):
+        # 배경(선택 표시)은 스타일이 그리고, 텍스트는 줄바꿈해 직접 그립니다. (화면에 보이는 행만 불림)
+        option = QtWidgets.QStyleOptionViewItem(option)
+        self.initStyleOption(option, index)
+        text, option.text = option.text, ""
+        style = option.widget.style() if option.widget else QtWidgets.QApplication.style()
+        style.drawControl(QtWidgets.QStyle.ControlElement.CE_ItemViewItem, option, painter, option.widget)
+
+        selected = option.state & QtWidgets.QStyle.StateFlag.State_Selected
+        role = QtGui.QPalette.ColorRole.HighlightedText if selected else QtGui.QPalette.ColorRole.Text
+        painter.save()
+        painter.setPen(option.palette.color(role))
+        padding = self.PADDING
+        painter.drawText(option.rect.adjusted(padding, padding, -padding, -padding), TEXT_FLAGS, text)
+        painter.restore()
+
+
+class TranscriptView(QtWidgets.QListView):
+    """
+    대화 기록 뷰입니다. 맨 아래를 보고 있으면 새 메시지를 따라 내려가며 오래된 행을 숨기고(페이지 2개 분량 유지),
+    맨 위에 닿으면 이전 메시지를 한 페이지 더 올리면서 보던 위치를 유지합니다.
+    """
+
+    def __init__(self, max_messages=5000, page_size=100, parent=None):
+        super().__init__(parent)
+        self.transcript = MessageListModel(max_messages, page_size, self)
+        self.delegate = MessageDelegate(self)
+        self.setModel(self.transcript)
+        self.setItemDelegate(self.delegate)
+        # 한 메시지가 화면보다 길 수 있으므로 픽셀 단위로 스크롤합니다.
+        self.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setResizeMode(QtWidgets.QListView.ResizeMode.Adjust)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+
+        self.follow = True          # 맨 아래를 보고 있는지 (새 메시지를 따라 내려감)
+        self._anchor = None         # 이전 페이지를 올린 뒤 유지할 위치 (아래 끝에서의 거리)
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.valueChanged.connect(self._scrolled)
+        scroll_bar.rangeChanged.connect(self._range_changed)
+        # 텍스트가 바뀐 행은 높이가 달라질 수 있으므로 레이아웃을 다시 잡게 합니다. (높이는 그 행만 다시 계산)
+        self.transcript.dataChanged.connect(lambda top, bottom, roles=(): self.delegate.sizeHintChanged.emit(top))
+
+    # ----- QTextEdit와 같은 사용법 -----
+    def append(self, text):
+        """메시지를 추가하고 반환합니다. (반환값으로 나중에 set_text/append_text)"""
+        message = self.transcript.append(text)
+        if self.follow and self.transcript.rowCount() > 2 * self.transcript.page_size:
+            self.transcript.trim(self.transcript.page_size)
+        return message
+
+    def setText(self, text):
+        self.transcript.clear()
+        self.append(text)
+
+    def toPlainText(self):
+        return "\n".join(message.text for message in self.transcript.messages())
+
+    def set_text(self, message, text):
+        self.transcript.set_text(message, text)
+
+    def append_text(self, message, text):
+        self.transcript.append_text(message, text)
+
+    # ----- 스크롤 -----
+    def _scrolled(self, value):
+        scroll_bar = self.verticalScrollBar()
+        self.follow = value >= scroll_bar.maximum()
+        if value == scroll_bar.minimum() and not self.follow and self.transcript.can_fetch_older():
+            self._anchor = scroll_bar.maximum() - value
+            self.transcript.fetch_older()
+
+    def _range_changed(self, minimum, maximum):
+        scroll_bar = self.verticalScrollBar()
+        if self._anchor is not None:
+            anchor, self._anchor = self._anchor, None
+            scroll_bar.setValue(maximum - anchor)
+        elif self.follow:
+            scroll_bar.setValue(maximum)
+
+    def keyPressEvent(self, event):
+        # 선택한 메시지들을 복사합니다. (QTextEdit처럼 Ctrl+C)
+        if event.matches(QtGui.QKeySequence.StandardKey.Copy):
+            rows = sorted(index.row() for index in self.selectedIndexes())
+            text = "\n".join(self.transcript.index(row).data() for row in rows)
+            QtWidgets.QApplication.clipboard().setText(text)
+            return
+        super().keyPressEvent(event)
+
+
+def install_transcript(text_edit, config):
+    """UI 파일의 QTextEdit(lblAnswer) 자리에 같은 크기/이름의 TranscriptView를 놓고 반환합니다."""
+    view = TranscriptView(config["max_messages"], config["page_size"], text_edit.parentWidget())
+    view.setObjectName(text_edit.objectName())
+    view.setGeometry(text_edit.geometry())
+    view.setFont(text_edit.font())
+    layout = text_edit.parentWidget().layout()
+    if layout is not None:
+        layout.replaceWidget(text_edit, view)
+    text_edit.hide()
+    text_edit.deleteLater()
+    view.show()
+    return view
@@ -0,0 +1,809 @@
+"""
+Mygemini 음성 출력(TTS) 모듈
+
+- 음성 캐시: (텍스트, 언어) 해시를 키로 gTTS가 만든 mp3를 디스크에 보관합니다.
+  같은 문장(오류 메시지, 저장된 답변 등)은 다시 합성하지 않고 바로 재생합니다.
+- 캐시 용량을 넘으면 가장 오래 쓰지 않은 파일부터 지우고(LRU), 파일은 임시 파일에 쓴 뒤 교체합니다.
+- 문장 파이프라인: 긴 답변을 문장 단위로 나눠 여러 스레드에서 동시에 합성하고,
+  첫 문장이 준비되는 즉시 순서대로 재생합니다. (답변 길이와 관계없이 첫 소리까지의 시간이 짧음)
+- 합성 결과는 메모리(write_to_fp)로 받아 바로 디코딩/재생하며, 현재 폴더에 임시 mp3를 만들지 않습니다.
+- 재생은 계속 열어 둔 출력 스트림(sounddevice)에 PCM을 큐로 넣어 처리하며, 새 답변이 오면 즉시 끊을 수 있습니다.
+- 발화 스케줄러: 전용 스레드와 우선순위 큐로 발화 순서/선점/취소를 관리하므로 GUI 스레드는 기다리지 않습니다.
+- 미리 합성: asyncio 엔진에서는 답변이 스트리밍되는 동안 완성된 청크를 미리 합성해 캐시에 넣습니다.
+"""
+import asyncio
+import atexit
+import hashlib
+import heapq
+import io
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# =================================================================
+# 1. 설정
+# =================================================================
+
+def tts_config_from_env():
+    """환경 변수에서 음성 설정(음성 출력/캐시 사용 여부, 저장 폴더, 최대 용량(MB), 합성 스레드 수, 문장 묶음 길이, 재생기 종류)를 읽습니다."""
+    return {
+        "speak": os.environ.get("TTS_ENABLED", "1") != "0",
+        "enabled": os.environ.get("TTS_CACHE", "1") != "0",
+        "directory": os.environ.get("TTS_CACHE_DIR", "tts_cache"),
+        "max_bytes": int(float(os.environ.get("TTS_CACHE_MAX_MB", "200")) * 1024 * 1024),
+        "workers": int(os.environ.get("TTS_WORKERS", "3")),
+        "chunk_chars": int(os.environ.get("TTS_CHUNK_CHARS", "200")),
+        "player": os.environ.get("TTS_PLAYER", "auto"),
+    }
+
+
+# =================================================================
+# 2. 음성 합성 (gTTS)
+# =================================================================
+
+def synthesize_mp3(text, lang="ko"):
+    """gTTS로 텍스트를 합성해 mp3 바이트를 반환합니다. (네트워크 왕복)"""
+    from gtts import gTTS
+
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=lang).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+def speech_key(text, lang="ko"):
+    """음성 캐시 키: 언어와 텍스트의 SHA-256 해시(16진수 64자)"""
+    return hashlib.sha256(f"{lang}\0{text}".encode("utf-8")).hexdigest()
+
+
+# =================================================================
+# 3. 디스크 음성 캐시 (LRU + 용량 제한)
+# =================================================================
+
+class SpeechCache:
+    """
+    speech_key(text, lang) → mp3 파일을 보관하는 디스크 캐시입니다.
+
+    - directory: mp3 파일을 저장할 폴더 (없으면 만듭니다)
+    - max_bytes: 캐시 폴더의 최대 용량. 넘으면 가장 오래 재생하지 않은 파일부터 지웁니다.
+    - 최근 사용 순서는 파일 수정 시각(mtime)으로 기록하므로 다음 실행에도 유지됩니다.
+    """
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = {}          # key -> [크기, 마지막 사용 시각]
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0        # 캐시 적중으로 다시 받지 않은 mp3 크기 합계
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """폴더의 기존 mp3 파일을 읽어 크기와 사용 시각을 기록하고, 남은 임시 파일을 지웁니다."""
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(".mp3"):
+                continue
+            stat = os.stat(path)
+            self._entries[name[:-4]] = [stat.st_size, stat.st_mtime]
+            self._total_bytes += stat.st_size
+        self._evict()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + ".mp3")
+
+    def get(self, text, lang="ko"):
+        """캐시된 mp3 파일 경로를 반환합니다. 없으면 None을 반환합니다."""
+        key = speech_key(text, lang)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            path = self.path_for(key)
+            try:
+                os.utime(path)  # LRU 순서 갱신
+            except OSError:
+                # 밖에서 파일이 지워졌으면 미스로 처리합니다.
+                self._total_bytes -= entry[0]
+                del self._entries[key]
+                self.misses += 1
+                return None
+            entry[1] = time.time()
+            self.hits += 1
+            self.bytes_saved += entry[0]
+            return path
+
+    def put(self, text, lang, data):
+        """mp3 바이트를 캐시에 저장하고 파일 경로를 반환합니다. (임시 파일에 쓴 뒤 교체)"""
+        key = speech_key(text, lang)
+        path = self.path_for(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                self._total_bytes -= old[0]
+            self._entries[key] = [len(data), time.time()]
+            self._total_bytes += len(data)
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep=None):
+        """용량을 넘으면 마지막 사용 시각이 오래된 파일부터 지웁니다. 방금 넣은 파일(keep)은 남깁니다."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+            del self._entries[key]
+            self._total_bytes -= size
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "files": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "bytes_saved": self.bytes_saved,
+            }
+
+
+def cached_speech(cache, text, lang="ko"):
+    """캐시에서 음성을 찾고, 없으면 합성해서 캐시에 넣습니다. (mp3 바이트, 캐시 파일 경로)를 반환합니다."""
+    path = cache.get(text, lang)
+    if path is not None:
+        try:
+            with open(path, "rb") as f:
+                return f.read(), path
+        except OSError:
+            pass  # 읽기 직전에 용량 정리로 지워졌으면 다시 합성합니다.
+    data = synthesize_mp3(text, lang)
+    return data, cache.put(text, lang, data)
+
+# =================================================================
+# 4. 문장 분리
+# =================================================================
+
+# 문장부호(. ! ? … 등, 뒤따르는 따옴표/괄호 포함) 뒤에 공백이 오거나 줄이 바뀌면 문장이 끝난 것으로 봅니다.
+# "3.14"처럼 문장부호 바로 뒤에 글자가 붙어 있으면 나누지 않습니다.
+_SENTENCE_RE = re.compile(r'.+?(?:[.!?…。！？]+["\'”’)\]]*(?=\s|$)|\n|$)', re.S)
+
+
+def split_sentences(text, max_chars=200):
+    """
+    텍스트를 한국어/영어 문장 경계에서 나눠 합성 단위(청크) 목록을 만듭니다.
+
+    - 첫 청크는 첫 문장 하나만 담아 최대한 빨리 재생을 시작할 수 있게 합니다.
+    - 이후 청크는 max_chars를 넘지 않는 범위에서 문장을 묶어 합성 호출 수를 줄입니다.
+    - max_chars보다 긴 문장은 쉼표나 공백에서 한 번 더 나눕니다.
+    """
+    sentences = []
+    for match in _SENTENCE_RE.finditer(text):
+        sentences.extend(_sentence_pieces(match.group(), max_chars))
+
+    if not sentences:
+        return []
+    chunks = [sentences[0]]
+    current = ""
+    for sentence in sentences[1:]:
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _sentence_pieces(sentence, max_chars):
+    """문장 하나의 공백을 정리하고, max_chars보다 길면 쉼표나 공백에서 나눈 조각 목록을 반환합니다."""
+    sentence = " ".join(sentence.split())
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = max(sentence.rfind(", ", 0, max_chars), sentence.rfind(" ", 0, max_chars))
+        cut = cut + 1 if cut > 0 else max_chars
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+
+# =================================================================
+# 5. 재생기 (메모리 재생 / 임시 파일 대체 재생)
+# =================================================================
+
+def decode_mp3(data):
+    """mp3 바이트를 메모리에서 PCM으로 디코딩해 (PCM 바이트, 채널 수, 샘플 크기(바이트), 샘플링 레이트)를 반환합니다."""
+    from pydub import AudioSegment
+
+    segment = AudioSegment.from_file(io.BytesIO(data), format="mp3")
+    return segment.raw_data, segment.channels, segment.sample_width, segment.frame_rate
+
+
+class MemoryPlayer:
+    """mp3를 메모리에서 디코딩해 simpleaudio로 재생합니다. 디스크에 파일을 만들지 않습니다. (pydub + ffmpeg 필요)"""
+    name = "memory"
+
+    def __init__(self):
+        import simpleaudio
+        from pydub.utils import which
+
+        if not (which("ffmpeg") or which("avconv")):
+            raise RuntimeError("mp3 디코딩에 필요한 ffmpeg를 찾을 수 없습니다.")
+        self._simpleaudio = simpleaudio
+
+        self._current = None
+
+    def play(self, data, path=None):
+        pcm, channels, sample_width, frame_rate = decode_mp3(data)
+        self._current = self._simpleaudio.play_buffer(pcm, channels, sample_width, frame_rate)
+        self._current.wait_done()
+
+    def interrupt(self):
+        current = self._current
+        if current is not None:
+            current.stop()
+
+    def close(self):
+        pass
+
+
+class TempFilePlayer:
+    """
+    파일 경로만 받는 playsound용 대체 재생기입니다.
+    캐시 파일은 그대로 재생하고, 그 밖의 음성은 이 프로세스 전용 임시 폴더에 잠깐 써서 재생한 뒤 지웁니다.
+    """
+    name = "file"
+
+    def __init__(self):
+        from playsound import playsound
+
+        self._playsound = playsound
+        self._directory = None
+
+    def play(self, data, path=None):
+        if path is not None:
+            self._playsound(path)
+            return
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="mygemini_tts_")
+            atexit.register(self.close)
+        path = os.path.join(self._directory, f"{uuid.uuid4().hex}.mp3")
+        with open(path, "wb") as f:
+            f.write(data)
+        try:
+            self._playsound(path)
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def interrupt(self):
+        pass  # playsound는 재생 중 멈출 수 없습니다.
+
+    def close(self):
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+
+def create_player(kind="auto"):
+    """
+    재생기를 만듭니다. auto는 출력 스트림 엔진 → 메모리 재생 → 임시 파일 재생 순서로
+    사용할 수 있는 것을 고릅니다.
+    """
+    if kind in ("auto", "stream"):
+        try:
+            return AudioOutputEngine()
+        except Exception as e:
+            if kind == "stream":
+                raise
+            print(f"⚠️ 오디오 출력 스트림을 열 수 없어 다른 재생 방식을 사용합니다: {e}")
+    if kind in ("auto", "memory"):
+        try:
+            return MemoryPlayer()
+        except Exception as e:
+            if kind == "memory":
+                raise
+            print(f"⚠️ 메모리 음성 재생을 사용할 수 없어 임시 파일 재생으로 대체합니다: {e}")
+    if kind in ("auto", "file"):
+        return TempFilePlayer()
+    raise ValueError(f"알 수 없는 재생기 종류: {kind}")
+
+
+# =================================================================
+# 6. 오디오 출력 엔진 (계속 열어 두는 출력 스트림)
+# =================================================================
+
+def decode_pcm(data, frame_rate, channels):
+    """mp3 바이트를 출력 스트림 형식(16비트, frame_rate, channels)의 PCM 배열(프레임 x 채널)로 디코딩합니다."""
+    import numpy as np
+    from pydub import AudioSegment
+
+    segment = AudioSegment.from_file(io.BytesIO(data), format="mp3")
+    segment = segment.set_frame_rate(frame_rate).set_channels(channels).set_sample_width(2)
+    return np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, channels)
+
+
+class _Playback:
+    """재생 큐의 항목 하나 (디코딩된 PCM과 재생 위치, 완료 이벤트)"""
+
+    def __init__(self, pcm, decoded_at, measure):
+        self.pcm = pcm
+        self.position = 0
+        self.decoded_at = decoded_at
+        self.measure = measure      # 엔진이 쉬고 있을 때 들어온 항목만 지연 시간을 잽니다.
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+
+class AudioOutputEngine:
+    """
+    sounddevice 출력 스트림 하나를 프로그램이 끝날 때까지 열어 두고, 디코딩한 PCM을 재생 큐에 넣어
+    오디오 콜백에서 이어서 재생합니다. 발화마다 플레이어를 새로 띄우지 않으므로 시작 지연이 짧습니다.
+
+    - submit(mp3 바이트): 디코딩해서 큐에 넣고 바로 반환합니다. (다음 청크를 미리 버퍼링)
+    - play(mp3 바이트): submit 후 그 항목의 재생이 끝날 때까지 기다립니다.
+    - cancel(항목) / interrupt(): 항목 하나 또는 재생 중인 소리와 큐 전체를 즉시 멈춥니다. (새 답변이 왔을 때)
+    - 디코딩 시간과 디코딩 완료 → 첫 샘플 출력까지의 지연 시간을 최근 recent개까지 기록합니다. (stats())
+    """
+    name = "stream"
+
+    def __init__(self, frame_rate=24000, channels=1, blocksize=1024, latency="low", recent=1024):
+        import sounddevice
+        from pydub.utils import which
+
+        if not (which("ffmpeg") or which("avconv")):
+            raise RuntimeError("mp3 디코딩에 필요한 ffmpeg를 찾을 수 없습니다.")
+
+        self.frame_rate = frame_rate    # gTTS mp3는 24kHz 모노입니다.
+        self.channels = channels
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._current = None
+
+        self.decode_ms = deque(maxlen=recent)
+        self.first_sample_ms = deque(maxlen=recent)
+        self.played = 0
+        self.interrupted = 0
+
+        self._stream = sounddevice.OutputStream(
+            samplerate=frame_rate,
+            channels=channels,
+            dtype="int16",
+            blocksize=blocksize,
+            latency=latency,
+            callback=self._callback
+        )
+        self._stream.start()
+
+    def submit(self, data, path=None):
+        started_at = time.monotonic()
+        pcm = decode_pcm(data, self.frame_rate, self.channels)
+        decoded_at = time.monotonic()
+        self.decode_ms.append((decoded_at - started_at) * 1000)
+
+        with self._lock:
+            item = _Playback(pcm, decoded_at, measure=self._current is None and not self._queue)
+            self._queue.append(item)
+        return item
+
+    def play(self, data, path=None):
+        self.submit(data, path).wait()
+
+    def cancel(self, item):
+        """submit으로 넣은 항목 하나만 큐에서 빼거나 재생을 멈춥니다."""
+        with self._lock:
+            if self._current is item:
+                self._current = None
+            elif item in self._queue:
+                self._queue.remove(item)
+        item.done.set()
+
+    def interrupt(self):
+        with self._lock:
+            items = list(self._queue)
+            if self._current is not None:
+                items.append(self._current)
+            self._queue.clear()
+            self._current = None
+        for item in items:
+            item.done.set()
+        if items:
+            self.interrupted += 1
+
+    def _callback(self, outdata, frames, time_info, status):
+        """오디오 스레드에서 호출됩니다. 큐의 PCM을 순서대로 채우고, 비어 있으면 무음을 채웁니다."""
+        filled = 0
+        finished = []
+        with self._lock:
+            while filled < frames:
+                if self._current is None:
+                    if not self._queue:
+                        break
+                    self._current = self._queue.popleft()
+                    if self._current.measure:
+                        # 콜백이 채운 샘플은 출력 지연(stream.latency)만큼 뒤에 스피커로 나갑니다.
+                        first_sample_at = time.monotonic() + self._stream.latency
+                        self.first_sample_ms.append((first_sample_at - self._current.decoded_at) * 1000)
+                item = self._current
+                count = min(frames - filled, len(item.pcm) - item.position)
+                outdata[filled:filled + count] = item.pcm[item.position:item.position + count]
+                item.position += count
+                filled += count
+                if item.position >= len(item.pcm):
+                    finished.append(item)
+                    self._current = None
+            self.played += len(finished)
+        if filled < frames:
+            outdata[filled:] = 0
+        for item in finished:
+            item.done.set()
+
+    def close(self):
+        self.interrupt()
+        self._stream.stop()
+        self._stream.close()
+
+    def stats(self):
+        return {
+            "played": self.played,
+            "interrupted": self.interrupted,
+            "decode_ms_p50": _percentile(self.decode_ms, 0.5),
+            "first_sample_ms_p50": _percentile(self.first_sample_ms, 0.5),
+            "first_sample_ms_p95": _percentile(self.first_sample_ms, 0.95),
+        }
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 1)
+
+
+# =================================================================
+# 7. 문장 파이프라인 (합성과 재생을 겹쳐서 실행)
+# =================================================================
+
+class SpeechPipeline:
+    """
+    텍스트를 청크로 나눠 스레드 풀에서 동시에 합성하고, 준비된 순서대로(원문 순서 유지) 재생합니다.
+    청크 N이 재생되는 동안 청크 N+1 이후가 합성됩니다. 합성한 음성은 메모리(bytes)로만 주고받습니다.
+
+    - tts_cache: SpeechCache (None이면 매번 합성)
+    - player: play(mp3 바이트, 캐시 파일 경로 또는 None)로 재생이 끝날 때까지 블로킹하는 재생기 (기본값 create_player())
+      submit()이 있는 재생기(AudioOutputEngine)는 준비된 청크를 미리 큐에 넣어 청크 사이 공백 없이 재생합니다.
+    - workers: 동시에 합성할 최대 청크 수
+    """
+
+    def __init__(self, tts_cache=None, lang="ko", workers=3, chunk_chars=200, player=None):
+        self.tts_cache = tts_cache
+        self.lang = lang
+        self.chunk_chars = chunk_chars
+        self.player = player if player is not None else create_player()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="SpeechSynth")
+        self._generation = 0    # interrupt()할 때마다 증가합니다. 시작할 때와 다르면 그 발화는 중단된 것입니다.
+
+    def _synthesize(self, text):
+        """청크 하나를 합성해 (mp3 바이트, 캐시 파일 경로 또는 None)을 반환합니다."""
+        if self.tts_cache is not None:
+            return cached_speech(self.tts_cache, text, self.lang)
+        return synthesize_mp3(text, self.lang), None
+
+    def speak(self, text, token=None):
+        """
+        텍스트를 청크 단위로 합성/재생합니다. 모든 청크의 재생이 끝나거나 interrupt()되면 반환합니다.
+        token(CancelToken)이 취소되면 다음 청크부터 재생하지 않습니다.
+        """
+        chunks = split_sentences(text, self.chunk_chars)
+        if not chunks:
+            return
+        generation = self._generation
+        # 🌟 턴 측정(TurnTrace): 첫 음성 준비까지, 재생이 끝날 때까지
+        trace = token.trace if token is not None else None
+
+        def stopped():
+            return generation != self._generation or (token is not None and token.cancelled)
+
+        started_at = time.monotonic()
+        futures = [self._executor.submit(self._synthesize, chunk) for chunk in chunks]
+        queued = None
+        try:
+            for index, future in enumerate(futures):
+                data, path = future.result()
+                if stopped():
+                    return
+                if index == 0:
+                    print(f"🔊 첫 음성까지 {(time.monotonic() - started_at) * 1000:.0f}ms (청크 {len(chunks)}개)")
+                    if trace is not None:
+                        trace.record("tts_first_audio", time.monotonic() - started_at, chunks=len(chunks))
+                if hasattr(self.player, "submit"):
+                    queued = self.player.submit(data, path)
+                    if stopped():
+                        # 디코딩하는 사이에 중단되었으면 방금 넣은 청크도 뺍니다.
+                        self.player.cancel(queued)
+                        return
+                else:
+                    self.player.play(data, path)
+            if queued is not None:
+                queued.wait()
+            if trace is not None and not stopped():
+                trace.record("tts_playback", time.monotonic() - started_at)
+        finally:
+            # 중단되었거나 재생 도중 오류가 나면 아직 시작하지 않은 합성은 취소합니다.
+            for future in futures:
+                future.cancel()
+
+    def interrupt(self):
+        """재생 중이거나 합성/대기 중인 발화를 모두 멈춥니다. (새 답변이 왔을 때)"""
+        self._generation += 1
+        self.player.interrupt()
+
+    def stats(self):
+        """재생기의 지연 시간 통계 (출력 스트림 엔진만 제공)"""
+        return self.player.stats() if hasattr(self.player, "stats") else None
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.player.close()
+
+
+# =================================================================
+# 8. 발화 스케줄러 (전용 스레드 + 우선순위 큐)
+# =================================================================
+
+# 발화 정책
+POLICY_QUEUE = "queue"              # 앞의 발화가 끝난 뒤 순서대로 재생
+POLICY_REPLACE = "replace"          # 재생 중이거나 대기 중인 발화를 모두 취소하고 바로 재생
+POLICY_DROP_STALE = "drop-stale"    # 순서대로 재생하되, max_age초 넘게 기다렸으면 재생하지 않고 버림
+
+# 우선순위 (숫자가 작을수록 먼저 재생, 같으면 들어온 순서)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+
+class CancelToken:
+    """발화 하나의 취소 표시입니다. say()가 반환하며, cancel()하면 대기 중이면 건너뛰고 재생 중이면 멈춥니다."""
+
+    def __init__(self, text, trace=None):
+        self.text = text
+        self.trace = trace              # 턴 측정(TurnTrace, 없으면 None)
+        self.queued_at = time.monotonic()
+        self.cancelled = False
+        self.done = threading.Event()   # 재생을 마쳤거나 취소/폐기되면 설정됩니다.
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class SpeechScheduler:
+    """
+    SpeechPipeline을 전용 스레드 하나에서 실행하는 발화 스케줄러입니다.
+    say()는 큐에 넣고 바로 반환하므로 GUI 스레드에서 호출해도 멈추지 않습니다.
+
+    - max_age: POLICY_DROP_STALE 발화가 큐에서 기다릴 수 있는 최대 시간(초)
+    """
+
+    def __init__(self, pipeline, max_age=30.0):
+        self.pipeline = pipeline
+        self.max_age = max_age
+        self._heap = []
+        self._seq = 0
+        self._current = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="SpeechScheduler", daemon=True)
+
+        self.spoken = 0
+        self.cancelled = 0
+        self.dropped = 0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def say(self, text, policy=POLICY_QUEUE, priority=PRIORITY_NORMAL, max_age=None, trace=None):
+        """발화를 예약하고 CancelToken을 반환합니다. trace(TurnTrace)를 주면 대기/합성/재생 시간을 그 턴에 기록합니다."""
+        token = CancelToken(text, trace)
+        deadline = None
+        if policy == POLICY_DROP_STALE:
+            deadline = time.monotonic() + (self.max_age if max_age is None else max_age)
+        elif policy != POLICY_QUEUE and policy != POLICY_REPLACE:
+            raise ValueError(f"알 수 없는 발화 정책: {policy}")
+
+        with self._condition:
+            if self._closed:
+                token.done.set()
+                return token
+            if policy == POLICY_REPLACE:
+                self._cancel_all_locked()
+            self._seq += 1
+            heapq.heappush(self._heap, (priority, self._seq, token, deadline))
+            self._condition.notify()
+        return token
+
+    def cancel(self, token):
+        """발화 하나를 취소합니다. 재생 중이면 즉시 멈춥니다."""
+        with self._condition:
+            token.cancel()
+            if token is self._current:
+                self.pipeline.interrupt()
+
+    def cancel_all(self):
+        """재생 중이거나 대기 중인 발화를 모두 취소합니다."""
+        with self._condition:
+            self._cancel_all_locked()
+
+    def _cancel_all_locked(self):
+        for _, _, token, _ in self._heap:
+            token.cancel()
+        if self._current is not None:
+            self._current.cancel()
+            self.pipeline.interrupt()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                _, _, token, deadline = heapq.heappop(self._heap)
+                if token.cancelled:
+                    self.cancelled += 1
+                    token.done.set()
+                    continue
+                if deadline is not None and time.monotonic() > deadline:
+                    self.dropped += 1
+                    print(f"⏱️ 오래 기다린 발화는 건너뜁니다: {token.text[:30]}")
+                    token.done.set()
+                    continue
+                self._current = token
+
+            if token.trace is not None:
+                token.trace.record("tts_queue", time.monotonic() - token.queued_at)
+            try:
+                self.pipeline.speak(token.text, token)
+            except Exception as e:
+                print(f"음성 출력 오류 (SpeechScheduler 스레드): {e}")
+            finally:
+                with self._condition:
+                    self._current = None
+                    if token.cancelled:
+                        self.cancelled += 1
+                    else:
+                        self.spoken += 1
+                token.done.set()
+
+    def close(self, timeout=2.0):
+        """대기 중인 발화를 버리고 재생을 멈춘 뒤 스레드를 끝냅니다."""
+        with self._condition:
+            self._cancel_all_locked()
+            self._closed = True
+            self._condition.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        for _, _, token, _ in self._heap:
+            token.done.set()
+        self._heap.clear()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "queued": len(self._heap),
+                "spoken": self.spoken,
+                "cancelled": self.cancelled,
+                "dropped": self.dropped,
+            }
+
+
+# =================================================================
+# 9. 음성 미리 합성 (asyncio 엔진, 스트리밍과 겹쳐서 실행)
+# =================================================================
+
+class SpeechPrefetcher:
+    """
+    스트리밍 중인 답변에서 완성된 청크를 미리 합성해 음성 캐시에 넣습니다. (asyncio 이벤트 루프에서 사용)
+    답변이 끝나 발화를 시작할 때는 앞 청크가 이미 캐시에 있어 첫 소리가 빨리 나옵니다.
+
+    - chunk_chars: SpeechPipeline과 같은 값이어야 같은 청크로 나뉘어 캐시에 적중합니다.
+    - timeout: 청크 하나를 합성하는 최대 시간(초). 넘으면 포기하고 재생 시점에 다시 합성합니다.
+
+    feed()는 새로 받은 부분만 나눕니다. 끝난 문장은 split_sentences와 같은 규칙으로 바로 청크에 묶고,
+    아직 덜 받았을 수 있는 마지막 문장만 남겨 두므로 답변이 길어져도 청크마다 전체를 다시 나누지 않습니다.
+    """
+
+    def __init__(self, cache, lang="ko", chunk_chars=200, timeout=20.0):
+        self.cache = cache
+        self.lang = lang
+        self.chunk_chars = chunk_chars
+        self.timeout = timeout
+        self._tasks = []
+        self._scheduled = 0     # 이미 예약한 청크 수 (앞에서부터)
+        self._tail = ""         # 아직 끝나지 않은 문장 (+ 새로 받은 텍스트)
+        self._group = ""        # 끝난 문장을 모으는 중인 청크 (다음 문장이 안 들어가면 예약)
+        self.fetched = 0
+
+    def feed(self, text):
+        """스트리밍으로 새로 받은 텍스트를 넣고, 끝난 문장으로 완성된 청크를 미리 합성합니다."""
+        self._tail += text
+        matches = list(_SENTENCE_RE.finditer(self._tail))
+        if len(matches) < 2:
+            return
+        # 마지막 문장은 아직 덜 받았을 수 있으므로 다음 feed까지 남겨 둡니다.
+        for match in matches[:-1]:
+            for piece in _sentence_pieces(match.group(), self.chunk_chars):
+                self._add_piece(piece)
+        self._tail = self._tail[matches[-1].start():]
+
+    def finish(self, text):
+        """답변이 끝났으면 남은 청크를 모두 미리 합성합니다. (text는 전체 답변)"""
+        for chunk in split_sentences(text, self.chunk_chars)[self._scheduled:]:
+            self._schedule(chunk)
+
+    def _add_piece(self, piece):
+        # split_sentences와 같은 규칙: 첫 문장은 혼자 한 청크, 이후는 chunk_chars 안에서 묶습니다.
+        if not self._scheduled:
+            self._schedule(piece)
+        elif self._group and len(self._group) + 1 + len(piece) > self.chunk_chars:
+            self._schedule(self._group)
+            self._group = piece
+        else:
+            self._group = f"{self._group} {piece}" if self._group else piece
+
+    def _schedule(self, chunk):
+        self._tasks.append(asyncio.ensure_future(self._fetch(chunk)))
+        self._scheduled += 1
+
+    async def _fetch(self, chunk):
+        try:
+            await asyncio.wait_for(asyncio.to_thread(cached_speech, self.cache, chunk, self.lang), self.timeout)
+            self.fetched += 1
+        except asyncio.TimeoutError:
+            print(f"⚠️ 음성 미리 합성 시간 초과 ({self.timeout:.0f}초): {chunk[:20]}")
+        except Exception as e:
+            print(f"⚠️ 음성 미리 합성 실패: {e}")
+
+    async def wait(self):
+        """예약한 미리 합성이 모두 끝날 때까지 기다립니다."""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
@@ -0,0 +1,68 @@
+"""
+Mygemini UI 로딩 모듈
+
+실행할 때마다 .ui(XML) 파일을 해석(uic.loadUi)하지 않고, 한 번 파이썬 코드로 변환(uic.compileUi)해
+ui_cache 폴더에 보관해 두고 가져옵니다. .ui 파일 내용이 바뀌면(SHA-256 비교) 자동으로 다시 변환합니다.
+변환된 모듈을 쓸 수 없으면 기존처럼 uic.loadUi로 읽습니다.
+"""
+import hashlib
+import importlib.util
+import os
+
+
+# 변환된 파일 첫 줄에 원본 .ui의 해시를 적어 두고, 다음 실행 때 비교합니다.
+SOURCE_HASH_PREFIX = "# source-sha256: "
+
+
+def ui_config_from_env():
+    """환경 변수에서 UI 로딩 설정(미리 변환한 UI 사용 여부, 변환 파일 폴더)을 읽습니다."""
+    return {
+        "precompiled": os.environ.get("UI_PRECOMPILED", "1") != "0",
+        "cache_dir": os.environ.get("UI_CACHE_DIR", "ui_cache"),
+    }
+
+
+def compile_ui(ui_path, cache_dir="ui_cache"):
+    """
+    .ui 파일을 변환한 파이썬 모듈 경로를 반환합니다. 변환 파일이 없거나 .ui 내용이 바뀌었으면 다시 변환합니다.
+    .ui 파일이 없으면 FileNotFoundError가 발생합니다.
+    """
+    with open(ui_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    stem = os.path.splitext(os.path.basename(ui_path))[0]
+    target = os.path.join(cache_dir, f"{stem}_ui.py")
+
+    try:
+        with open(target, encoding="utf-8") as f:
+            if f.readline().strip() == SOURCE_HASH_PREFIX + digest:
+                return target
+    except OSError:
+        pass
+
+    from PyQt6 import uic
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = target + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(SOURCE_HASH_PREFIX + digest + "\n")
+        uic.compileUi(ui_path, f)
+    os.replace(tmp_path, target)
+    print(f"🛠️ UI 변환: {ui_path} → {target}")
+    return target
+
+
+def load_ui(ui_path, widget, cache_dir="ui_cache"):
+    """widget에 UI를 구성합니다. 미리 변환한 모듈(Ui_* 클래스의 setupUi)을 쓰고, 실패하면 uic.loadUi로 대체합니다."""
+    path = compile_ui(ui_path, cache_dir)
+    try:
+        spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0], path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        ui_class = next(value for name, value in vars(module).items() if name.startswith("Ui_"))
+        ui_class().setupUi(widget)
+        return
+    except Exception as e:
+        print(f"⚠️ 변환된 UI를 사용할 수 없어 .ui 파일을 직접 읽습니다: {e}")
+
+    from PyQt6 import uic
+    uic.loadUi(ui_path, widget)
@@ -0,0 +1,195 @@
+"""
+Mygemini GUI 멈춤 감시 / 프로파일링 모듈
+
+- StallWatchdog: GUI 스레드가 주기적으로 beat()를 호출하고(QTimer), 감시 스레드가 마지막 beat 이후 경과 시간을 봅니다.
+  threshold를 넘으면 멈춘 그 순간의 GUI 스레드 스택을 감시 스레드에서 잡아 로그 파일에 남기고,
+  GUI 스레드가 돌아오면 멈춘 전체 시간을 기록합니다. ("응답 없음"의 원인이 된 코드 위치를 찾기 위함)
+- SessionProfiler: GUI 스레드를 cProfile로 감싸고, 멈추면 .pstats 파일과 정렬된 텍스트 요약을 남깁니다.
+  (PROFILE=1이면 실행 전체, 또는 창에서 Ctrl+Shift+P로 켜고 끔)
+
+PyQt에 의존하지 않습니다. (타이머 연결은 Mygemini5.py에서 합니다)
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+
+# =================================================================
+# 1. 설정
+# =================================================================
+
+def watchdog_config_from_env():
+    """환경 변수에서 GUI 멈춤 감시/프로파일링 설정을 읽습니다."""
+    return {
+        "enabled": os.environ.get("STALL_WATCHDOG", "1") != "0",
+        "heartbeat_ms": int(os.environ.get("STALL_HEARTBEAT_MS", "50")),
+        "threshold_ms": int(os.environ.get("STALL_THRESHOLD_MS", "250")),
+        "log_path": os.environ.get("STALL_LOG", os.path.join("metrics", "stalls.log")),
+        "profile": os.environ.get("PROFILE", "0") != "0",
+        "profile_path": os.environ.get("PROFILE_OUTPUT", os.path.join("metrics", "profile.pstats")),
+        "profile_sort": os.environ.get("PROFILE_SORT", "cumulative"),
+        "profile_top": int(os.environ.get("PROFILE_TOP", "40")),
+    }
+
+
+def _ensure_parent(path):
+    if path and os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+# =================================================================
+# 2. GUI 멈춤 감시
+# =================================================================
+
+class StallWatchdog:
+    """
+    GUI 스레드 하트비트 감시입니다.
+
+    - beat(): GUI 스레드의 타이머에서 heartbeat_ms마다 호출합니다. 간격이 늦어진 만큼(지연)이 threshold를 넘으면 멈춤으로 기록합니다.
+    - 감시 스레드는 마지막 beat 이후 threshold가 지나도 다음 beat가 없으면 GUI 스레드의 스택을 한 번 잡아 log_path에 씁니다.
+    - store(MetricsStore)를 주면 멈춘 시간을 gui_stall 히스토그램에 넣습니다.
+    """
+
+    def __init__(self, heartbeat_ms=50, threshold_ms=250, log_path=None, store=None, thread_id=None):
+        self.interval = heartbeat_ms / 1000.0
+        self.threshold = threshold_ms / 1000.0
+        self.log_path = log_path or None
+        self.store = store
+        # 감시할 스레드 (기본값: start()를 호출한 스레드 = GUI 스레드)
+        self.thread_id = thread_id
+        self._last_beat = None
+        self._captured_beat = None      # 스택을 이미 잡은 멈춤 (그 멈춤 직전 beat 시각)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="StallWatchdog", daemon=True)
+
+        self.stalls = 0
+        self.stall_seconds = 0.0
+        self.max_stall = 0.0
+        self.captures = 0
+
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        _ensure_parent(self.log_path)
+        self._last_beat = time.monotonic()
+        self._thread.start()
+        return self
+
+    def beat(self):
+        now = time.monotonic()
+        with self._lock:
+            lag = now - self._last_beat - self.interval
+            captured = self._captured_beat == self._last_beat
+            self._last_beat = now
+        if lag < self.threshold:
+            return
+
+        self.stalls += 1
+        self.stall_seconds += lag
+        self.max_stall = max(self.max_stall, lag)
+        if self.store is not None:
+            self.store.observe("gui_stall", lag)
+        print(f"⚠️ GUI 스레드가 {lag * 1000:.0f}ms 동안 멈췄습니다." + (f" (스택: {self.log_path})" if captured else ""))
+        if captured:
+            self._write(f"--- 멈춤 종료: 총 {lag * 1000:.0f}ms\n\n")
+
+    def close(self, timeout=1.0):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "stalls": self.stalls,
+            "stall_ms_total": round(self.stall_seconds * 1000, 1),
+            "stall_ms_max": round(self.max_stall * 1000, 1),
+            "stack_captures": self.captures,
+        }
+
+    def _run(self):
+        # 멈춤을 threshold의 1/4 안에 알아챌 수 있는 주기로 확인합니다.
+        poll = max(0.01, self.threshold / 4)
+        while not self._stop.wait(poll):
+            with self._lock:
+                last_beat = self._last_beat
+                elapsed = time.monotonic() - last_beat - self.interval
+                if elapsed < self.threshold or self._captured_beat == last_beat:
+                    continue
+                self._captured_beat = last_beat
+            self._capture(elapsed)
+
+    def _capture(self, elapsed):
+        """멈춰 있는 GUI 스레드의 현재 스택을 기록합니다. (감시 스레드에서 실행)"""
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame))
+        del frame
+        self.captures += 1
+        stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        self._write(f"=== {stamp} GUI 스레드 {elapsed * 1000:.0f}ms 이상 멈춤, 현재 스택:\n{stack}")
+
+    def _write(self, text):
+        if self.log_path is None:
+            return
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            print(f"❌ GUI 멈춤 기록 실패: {e}")
+
+
+# =================================================================
+# 3. 프로파일러
+# =================================================================
+
+class SessionProfiler:
+    """
+    cProfile로 start()~stop() 구간을 프로파일링합니다. cProfile은 start()를 호출한 스레드(GUI 스레드)만 측정합니다.
+    stop()하면 output_path(.pstats, snakeviz 등으로 열 수 있음)와 output_path + '.txt'(정렬된 상위 top개)를 씁니다.
+    """
+
+    def __init__(self, output_path, sort="cumulative", top=40):
+        self.output_path = output_path
+        self.sort = sort
+        self.top = top
+        self._profile = None
+        self._started_at = None
+
+    @property
+    def running(self):
+        return self._profile is not None
+
+    def start(self):
+        if self._profile is not None:
+            return
+        self._profile = cProfile.Profile()
+        self._started_at = time.monotonic()
+        self._profile.enable()
+        print("⏺️ 프로파일링 시작")
+
+    def stop(self):
+        """프로파일링을 멈추고 결과 파일 경로를 반환합니다. 실행 중이 아니면 None."""
+        profile, self._profile = self._profile, None
+        if profile is None:
+            return None
+        profile.disable()
+        elapsed = time.monotonic() - self._started_at
+
+        _ensure_parent(self.output_path)
+        profile.dump_stats(self.output_path)
+        report = io.StringIO()
+        stats = pstats.Stats(profile, stream=report)
+        stats.strip_dirs().sort_stats(self.sort).print_stats(self.top)
+        with open(self.output_path + ".txt", "w", encoding="utf-8") as f:
+            f.write(f"# {datetime.now():%Y-%m-%d %H:%M:%S} 프로파일링 {elapsed:.1f}초, 정렬: {self.sort}\n")
+            f.write(report.getvalue())
+        print(f"⏹️ 프로파일링 종료 ({elapsed:.1f}초): {self.output_path} (요약: {self.output_path}.txt)")
+        return self.output_path
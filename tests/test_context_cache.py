@@ -0,0 +1,139 @@
+"""
+컨텍스트 캐시 수명 테스트: 가짜 client.caches로 예산을 넘는 긴 대화를 흉내 내고
+캐시를 몇 번 만들고 지우는지 셉니다. (네트워크 없음)
+"""
+import time
+import unittest
+from types import SimpleNamespace
+
+from google.genai.errors import APIError
+
+from mygemini_context import ContextCacheManager, ConversationContext
+from mygemini_gemini import GeminiRequest
+
+
+class FakeCaches:
+    def __init__(self):
+        self.created = []
+        self.deleted = []
+        self.updated = []
+
+    def create(self, model, config):
+        name = f"cachedContents/{len(self.created) + 1}"
+        self.created.append((name, len(config.contents)))
+        return SimpleNamespace(name=name)
+
+    def update(self, name, config):
+        self.updated.append(name)
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+
+class ContextCacheLifecycleTest(unittest.TestCase):
+    TURNS = 120
+
+    def setUp(self):
+        self.summaries = 0
+        self.caches = FakeCaches()
+        self.context = ConversationContext(token_budget=8000, pin_first=1, summarize=self.summarize)
+        self.manager = ContextCacheManager(
+            SimpleNamespace(caches=self.caches), "fake-model", "시스템 지시문",
+            min_tokens=100, stable_prefix=self.context.stable_length
+        )
+
+    def summarize(self, previous, turns):
+        self.summaries += 1
+        return f"요약 {self.summaries}: " + "x" * 400
+
+    def wait_summary(self):
+        deadline = time.monotonic() + 5
+        while self.context._summarizing and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def run_turns(self):
+        self.context.add_exchange("첫 질문: 주제를 정합니다. " + "p" * 400, "알겠습니다. " + "q" * 400)
+        for i in range(self.TURNS):
+            self.wait_summary()
+            self.context.add_user(f"질문 {i} " + "a" * 200)
+            contents = self.context.contents()
+            sent, name = self.manager.prepare(contents)
+            if name is not None:
+                # 캐시한 앞부분을 뺀 나머지만 보내야 합니다.
+                cached = dict(self.caches.created)[name]
+                self.assertEqual(sent, contents[cached:])
+            self.context.add_model(f"답변 {i} " + "b" * 600)
+        self.wait_summary()
+
+    def test_cache_survives_eviction(self):
+        self.run_turns()
+        stats = self.manager.stats()
+        self.assertGreater(self.context.stats()["evicted"], 0)
+        # 캐시는 요약이 바뀔 때만 다시 만들어집니다. (처음 1번 + 요약 갱신마다)
+        self.assertLessEqual(stats["created"], self.summaries + 1)
+        self.assertLess(stats["created"], self.TURNS // 4)
+        self.assertGreater(stats["reused"], self.TURNS // 2)
+        self.assertEqual(len(self.caches.deleted), stats["created"] - 1)
+
+    def test_close_deletes_cache(self):
+        self.run_turns()
+        self.manager.close()
+        self.assertEqual(len(self.caches.deleted), len(self.caches.created))
+        self.assertFalse(self.manager.stats()["active"])
+
+
+class FailingModels:
+    """캐시를 쓴 요청은 code로 실패하고, 캐시 없는 요청은 성공합니다."""
+
+    def __init__(self, code):
+        self.code = code
+        self.calls = []
+
+    def generate_content(self, model, contents, config):
+        self.calls.append(config.cached_content)
+        if config.cached_content:
+            raise APIError(self.code, {"error": {"code": self.code, "message": "fake", "status": "FAKE"}})
+        return SimpleNamespace(text="답변", usage_metadata=None)
+
+
+class CacheFallbackTest(unittest.TestCase):
+    def make_request(self, code):
+        self.caches = FakeCaches()
+        self.models = FailingModels(code)
+        client = SimpleNamespace(caches=self.caches, models=self.models)
+        self.manager = ContextCacheManager(client, "fake-model", "시스템 지시문", min_tokens=10)
+        contents = [
+            {"role": "user", "parts": [{"text": "첫 질문 " + "p" * 200}]},
+            {"role": "model", "parts": [{"text": "첫 답변 " + "q" * 200}]},
+            {"role": "user", "parts": [{"text": "두번째 질문"}]},
+        ]
+        return GeminiRequest(client, "fake-model", contents, context_cache=self.manager)
+
+    def test_missing_cache_falls_back(self):
+        request = self.make_request(404)
+        self.assertEqual(request.generate(), "답변")
+        self.assertEqual(self.models.calls, ["cachedContents/1", None])
+        self.assertEqual(self.caches.deleted, ["cachedContents/1"])
+        self.assertFalse(self.manager.stats()["active"])
+
+    def test_transient_error_keeps_cache(self):
+        # 429/5xx는 캐시를 지우지 않고 스케줄러가 재시도하도록 그대로 올립니다.
+        for code in (429, 503):
+            request = self.make_request(code)
+            with self.assertRaises(APIError):
+                request.generate()
+            self.assertEqual(self.models.calls, ["cachedContents/1"])
+            self.assertEqual(self.caches.deleted, [])
+            self.assertTrue(self.manager.stats()["active"])
+
+    def test_invalidate_keeps_newer_cache(self):
+        request = self.make_request(404)
+        self.manager.prepare(request.contents)
+        self.manager.invalidate("cachedContents/0")
+        self.assertTrue(self.manager.stats()["active"])
+        self.manager.invalidate("cachedContents/1")
+        self.assertFalse(self.manager.stats()["active"])
+
+
+if __name__ == "__main__":
+    unittest.main()
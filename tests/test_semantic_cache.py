@@ -0,0 +1,84 @@
+"""
+의미 캐시 테스트: 로컬 결정적 임베더(HashingEmbedder)로 임계값 적중/미스, 저장/불러오기, 중복 방지를 확인합니다.
+"""
+import os
+import tempfile
+import unittest
+
+from mygemini_semantic import HashingEmbedder, SemanticCache
+
+QUESTION = "파이썬에서 리스트를 정렬하는 방법"
+ANSWER = "sorted(리스트) 또는 리스트.sort()를 사용합니다."
+
+
+class SemanticCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "index")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_cache(self, embedder=None, threshold=0.92):
+        return SemanticCache(self.path, embedder or HashingEmbedder(), threshold=threshold, autosave_every=0)
+
+    def test_threshold_hit_and_miss(self):
+        cache = self.make_cache()
+        self.assertIsNone(cache.lookup(QUESTION))
+        cache.add(QUESTION, ANSWER)
+
+        answer, score, stored = cache.lookup("파이썬에서 리스트를 정렬하는 방법은")
+        self.assertEqual((answer, stored), (ANSWER, QUESTION))
+        self.assertGreaterEqual(score, 0.92)
+        self.assertIsNone(cache.lookup("오늘 서울 날씨 어때"))
+        self.assertIsNone(cache.lookup("파이썬 리스트 정렬 방법"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 3)
+
+    def test_save_load_round_trip(self):
+        cache = self.make_cache()
+        cache.add(QUESTION, ANSWER)
+        cache.save()
+
+        loaded = self.make_cache()
+        self.assertEqual(len(loaded), 1)
+        self.assertEqual(loaded.lookup(QUESTION)[0], ANSWER)
+
+        # 불러온(mmap) 벡터와 아직 저장하지 않은 벡터를 함께 찾습니다.
+        loaded.add("오늘 서울 날씨 어때", "맑습니다.")
+        self.assertEqual(loaded.lookup("오늘 서울 날씨 어때?")[0], "맑습니다.")
+        self.assertEqual(loaded.lookup(QUESTION)[0], ANSWER)
+        loaded.save()
+        self.assertEqual(len(self.make_cache()), 2)
+
+    def test_other_embedder_ignores_index(self):
+        cache = self.make_cache()
+        cache.add(QUESTION, ANSWER)
+        cache.save()
+        self.assertEqual(len(self.make_cache(HashingEmbedder(dim=128))), 0)
+
+    def test_dedup(self):
+        cache = self.make_cache()
+        added = cache.add_many([(QUESTION, ANSWER), ("파이썬에서 리스트를 정렬하는 방법?", "다른 답변"), ("다른 질문", "답변")])
+        self.assertEqual(added, 2)
+        self.assertEqual(cache.add_many([(QUESTION, ANSWER)]), 0)
+        self.assertEqual(len(cache), 2)
+
+    def test_dedup_while_embedding(self):
+        # 임베딩하는 동안 다른 스레드가 같은 질문을 먼저 넣은 경우, 실제로 넣은 건수만 셉니다.
+        embedder = HashingEmbedder()
+        cache = self.make_cache(embedder)
+        embed = embedder.embed
+
+        def racing_embed(texts):
+            embedder.embed = embed
+            cache.add(QUESTION, ANSWER)
+            return embed(texts)
+
+        embedder.embed = racing_embed
+        self.assertEqual(cache.add_many([(QUESTION, ANSWER), ("다른 질문", "답변")]), 1)
+        self.assertEqual(len(cache), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+스트리밍 미리 합성 청크 테스트: 조금씩 받은 답변을 feed()로 나눈 청크가
+완성된 답변을 split_sentences로 나눈 청크(재생할 때의 청크)와 같은지 확인합니다. (같아야 캐시에 적중)
+"""
+import random
+import unittest
+
+from mygemini_tts import SpeechPrefetcher, split_sentences
+
+ANSWER = (
+    "안녕하세요! 파이썬에서 리스트를 정렬하려면 sorted()를 씁니다. 원본을 바꾸려면 list.sort()를 쓰세요.\n"
+    "예를 들어 3.14처럼 소수점이 있는 숫자도 그대로 정렬됩니다… 정말요? 네, 그렇습니다.\n"
+    + "아주 긴 문장은 쉼표, 공백에서 나뉘므로 " * 12 + "끝납니다. 마지막 문장"
+)
+
+
+class RecordingPrefetcher(SpeechPrefetcher):
+    def __init__(self, chunk_chars):
+        super().__init__(cache=None, chunk_chars=chunk_chars)
+        self.chunks = []
+
+    def _schedule(self, chunk):
+        self.chunks.append(chunk)
+        self._scheduled += 1
+
+
+class SpeechPrefetcherTest(unittest.TestCase):
+    def test_incremental_chunks_match_full_split(self):
+        rng = random.Random(0)
+        for chunk_chars in (40, 80, 200):
+            expected = split_sentences(ANSWER, chunk_chars)
+            for _ in range(50):
+                prefetcher = RecordingPrefetcher(chunk_chars)
+                received = 0
+                while received < len(ANSWER):
+                    step = rng.randint(1, 12)
+                    prefetcher.feed(ANSWER[received:received + step])
+                    received += step
+                    # 스트리밍 중에 예약한 청크는 최종 청크의 앞부분이어야 합니다.
+                    self.assertEqual(prefetcher.chunks, expected[:len(prefetcher.chunks)])
+                self.assertLess(len(prefetcher.chunks), len(expected))
+                prefetcher.finish(ANSWER)
+                self.assertEqual(prefetcher.chunks, expected)
+
+    def test_tail_stays_small(self):
+        prefetcher = RecordingPrefetcher(200)
+        for i in range(500):
+            prefetcher.feed(f"{i}번째 문장입니다. ")
+        self.assertLess(len(prefetcher._tail), 40)
+
+
+if __name__ == "__main__":
+    unittest.main()